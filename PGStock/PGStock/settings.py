@@ -174,6 +174,10 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Fichiers privés (rapports PDF, classeurs importés) : hors de MEDIA_ROOT,
+# jamais servis directement, seulement par les vues qui vérifient les droits
+PRIVATE_MEDIA_ROOT = BASE_DIR / 'private_media'
+
 # Authentication settings
 LOGIN_URL = 'inventory:login'
 LOGIN_REDIRECT_URL = 'inventory:dashboard'
@@ -4,7 +4,7 @@ def company_settings(request):
     """
     Context processor to make company settings available in all templates.
     """
-    settings = Settings.objects.first()
+    settings = Settings.get_current()
     if not settings:
         # Return default values if no settings exist
         return {
@@ -1,98 +1,194 @@
 import sys
+import tempfile
 from datetime import datetime
-from django.http import HttpResponse
+from itertools import chain, islice
+from django.http import StreamingHttpResponse
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 
+# Colors (Metronic style)
+PRIMARY_BLUE = "009EF7"
+WHITE = "FFFFFF"
+LIGHT_GRAY = "F5F8FA"
+BORDER_COLOR = "E4E6EF"
+
+CURRENCY_KEYWORDS = ['prix', 'total', 'montant', 'solde', 'valeur', 'bénéfice', 'intérêt', 'coût', 'remise', 'dépense', 'marge']
+
+# Rows buffered before writing, used to size the columns.
+# Write-only sheets need the widths before the first row, so only this
+# many rows are ever held in memory.
+WIDTH_SAMPLE_ROWS = 500
+MAX_COLUMN_WIDTH = 50
+
+# Size of the chunks sent to the client
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Rows fetched from the database per round trip when exporting a queryset
+EXPORT_CHUNK_SIZE = 2000
+
+
+def queryset_rows(queryset, fields, build_rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield export rows from a queryset without loading model instances.
+
+    Only the given columns are fetched (values_list) through a database
+    iterator. build_rows receives a whole chunk of tuples and returns the
+    finished rows, so derived columns are computed once per chunk and peak
+    memory is proportional to chunk_size.
+
+    Args:
+        queryset: Filtered queryset
+        fields: Column names passed to values_list
+        build_rows: Callable(list of tuples) -> list of rows
+        chunk_size: Rows per database fetch
+    """
+    values = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(values, chunk_size))
+        if not chunk:
+            break
+        yield from build_rows(chunk)
+
+
+def choice_labels(model, field_name):
+    """Display labels of a choices field (values_list equivalent of get_FOO_display)"""
+    return dict(model._meta.get_field(field_name).flatchoices)
+
+
+def _named_styles():
+    """
+    Shared named styles: each cell references a style by name instead of
+    carrying its own PatternFill / Alignment objects.
+    """
+    thin = Side(style='thin', color=BORDER_COLOR)
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    stripe = PatternFill(start_color=LIGHT_GRAY, end_color=LIGHT_GRAY, fill_type="solid")
+
+    header = NamedStyle(name='export_header')
+    header.fill = PatternFill(start_color=PRIMARY_BLUE, end_color=PRIMARY_BLUE, fill_type="solid")
+    header.font = Font(bold=True, color=WHITE, size=11)
+    header.alignment = Alignment(horizontal="center", vertical="center")
+    header.border = border
+
+    styles = [header]
+    for name, horizontal, number_format in (
+        ('export_text', 'left', 'General'),
+        ('export_currency', 'right', '#,##0 "GNF"'),
+    ):
+        for suffix, fill in (('', None), ('_stripe', stripe)):
+            style = NamedStyle(name=name + suffix)
+            style.alignment = Alignment(horizontal=horizontal, vertical="center")
+            style.border = border
+            style.number_format = number_format
+            if fill:
+                style.fill = fill
+            styles.append(style)
+    return styles
+
+
+def _column_widths(headers, rows):
+    """Width of each column from the header and the sampled rows (capped)"""
+    widths = [len(str(header)) for header in headers]
+    for row in rows:
+        for col_index, value in enumerate(row[:len(widths)]):
+            length = len(str(value)) if value is not None else 0
+            if length > widths[col_index]:
+                widths[col_index] = length
+    return [min(width + 2, MAX_COLUMN_WIDTH) for width in widths]
+
+
+def write_excel_stream(headers, rows, title, output):
+    """
+    Write rows to an xlsx file with a write-only (streamed) workbook.
+
+    Args:
+        headers: Column titles
+        rows: Iterable of row sequences (list, generator, queryset iterator)
+        title: Sheet title
+        output: Path or binary file object
+
+    Returns:
+        Number of data rows written
+    """
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+    ws = wb.create_sheet(title=title[:30])  # Excel sheet title limit
+
+    currency_cols = {
+        col_index for col_index, header in enumerate(headers)
+        if any(keyword in header.lower() for keyword in CURRENCY_KEYWORDS)
+    }
+    styles = [
+        'export_currency' if col_index in currency_cols else 'export_text'
+        for col_index in range(len(headers))
+    ]
+    stripe_styles = [style + '_stripe' for style in styles]
+
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+    for col_num, width in enumerate(_column_widths(headers, sample), 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+
+    # Freeze Panes (first row)
+    ws.freeze_panes = "A2"
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = 'export_header'
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    count = 0
+    for row_num, row_data in enumerate(chain(sample, rows), 2):
+        # Alternate row coloring
+        row_styles = stripe_styles if row_num % 2 == 0 else styles
+        cells = []
+        for col_index, value in enumerate(row_data):
+            cell = WriteOnlyCell(ws, value=value)
+            if col_index < len(row_styles):
+                cell.style = row_styles[col_index]
+            cells.append(cell)
+        ws.append(cells)
+        count += 1
+
+    wb.save(output)
+    return count
+
+
 def export_to_excel(headers, data, title, filename_prefix="Export"):
     """
     Standardized utility for premium Excel exports.
+
+    data may be any iterable of rows: it is consumed once and written with a
+    write-only workbook to a temporary file, which is then streamed to the
+    client. Memory use does not grow with the number of rows.
     """
     # Hack: Bypass broken lxml on some Windows/Python 3.12 environments
     lxml_backup = sys.modules.get('lxml')
     sys.modules['lxml'] = None
-    
-    try:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = title[:30] # Excel sheet title limit
-
-        # Colors (Metronic style)
-        PRIMARY_BLUE = "009EF7"
-        WHITE = "FFFFFF"
-        LIGHT_GRAY = "F5F8FA"
-        BORDER_COLOR = "E4E6EF"
-
-        # Styles
-        header_fill = PatternFill(start_color=PRIMARY_BLUE, end_color=PRIMARY_BLUE, fill_type="solid")
-        header_font = Font(bold=True, color=WHITE, size=11)
-        center_alignment = Alignment(horizontal="center", vertical="center")
-        left_alignment = Alignment(horizontal="left", vertical="center")
-        thin_border = Border(
-            left=Side(style='thin', color=BORDER_COLOR),
-            right=Side(style='thin', color=BORDER_COLOR),
-            top=Side(style='thin', color=BORDER_COLOR),
-            bottom=Side(style='thin', color=BORDER_COLOR)
-        )
 
-        # Write Headers
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-            cell.border = thin_border
-
-        # Detection of currency columns
-        currency_keywords = ['prix', 'total', 'montant', 'solde', 'valeur', 'bénéfice', 'intérêt', 'coût', 'remise', 'dépense', 'marge']
-        currency_cols = []
-        for col_num, header in enumerate(headers, 1):
-            if any(keyword in header.lower() for keyword in currency_keywords):
-                currency_cols.append(col_num)
-
-        # Write Data
-        for row_num, row_data in enumerate(data, 2):
-            for col_num, cell_value in enumerate(row_data, 1):
-                cell = ws.cell(row=row_num, column=col_num, value=cell_value)
-                cell.border = thin_border
-                
-                if col_num in currency_cols:
-                    cell.alignment = Alignment(horizontal="right", vertical="center")
-                    # GNF format with thousands separator
-                    cell.number_format = '#,##0 "GNF"'
-                else:
-                    cell.alignment = left_alignment
-                
-                # Alternate row coloring
-                if row_num % 2 == 0:
-                    cell.fill = PatternFill(start_color=LIGHT_GRAY, end_color=LIGHT_GRAY, fill_type="solid")
-
-        # Column widths auto-adjustment (basic)
-        for col_num, header in enumerate(headers, 1):
-            column_letter = get_column_letter(col_num)
-            # Find max length in this column
-            max_length = len(str(header))
-            for row in ws.iter_rows(min_row=2, max_row=len(data)+1, min_col=col_num, max_col=col_num):
-                for cell in row:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column_letter].width = min(adjusted_width, 50) # Cap at 50
-
-        # Freeze Panes (first row)
-        ws.freeze_panes = "A2"
+    try:
+        output = tempfile.TemporaryFile()
+        try:
+            write_excel_stream(headers, data, title, output)
+            size = output.tell()
+            output.seek(0)
+        except Exception:
+            output.close()
+            raise
 
         # Prepare Response
         filename = f"{filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-        response = HttpResponse(
+        response = StreamingHttpResponse(
+            _stream_file(output),
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
         response['Content-Disposition'] = f'attachment; filename={filename}'
-        wb.save(response)
+        response['Content-Length'] = str(size)
         return response
 
     finally:
@@ -102,3 +198,15 @@ def export_to_excel(headers, data, title, filename_prefix="Export"):
         else:
             if 'lxml' in sys.modules:
                 del sys.modules['lxml']
+
+
+def _stream_file(file_obj):
+    """Yield a file in chunks, then close it"""
+    try:
+        while True:
+            chunk = file_obj.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file_obj.close()
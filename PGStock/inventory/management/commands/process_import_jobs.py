@@ -0,0 +1,49 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from inventory.services import ImportJobService
+
+
+class Command(BaseCommand):
+    help = 'Runs queued product imports (run continuously, or with --once from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process pending jobs then exit')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this many jobs (0 = no limit)')
+        parser.add_argument('--requeue-after', type=int, default=10,
+                            help='Minutes without progress after which a running job is considered abandoned')
+
+    def handle(self, *args, **options):
+        service = ImportJobService()
+        requeue_after = timedelta(minutes=options['requeue_after'])
+        max_jobs = options['max_jobs']
+        processed = 0
+
+        while not max_jobs or processed < max_jobs:
+            service.requeue_stale(requeue_after)
+            job = service.claim_next()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            job = service.run(job)
+            processed += 1
+            if job.status == 'done':
+                self.stdout.write(
+                    f"Importation #{job.pk} ({job.original_name}) : {job.created_count} créé(s), "
+                    f"{job.updated_count} mis à jour, {job.error_count} erreur(s)"
+                )
+            elif job.status == 'failed':
+                self.stderr.write(self.style.ERROR(
+                    f"Importation #{job.pk} ({job.original_name}) en échec à la ligne {job.last_line} : {job.error}"
+                ))
+            else:
+                self.stderr.write(self.style.WARNING(
+                    f"Importation #{job.pk} ({job.original_name}) reprise par un autre worker"
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f'{processed} importation(s) traitée(s)'))
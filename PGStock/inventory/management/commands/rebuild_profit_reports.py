@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import ExtractMonth, ExtractYear
+from inventory.models import Invoice, Expense
+from inventory.services import FinanceService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds monthly profit reports from scratch (reports are otherwise maintained incrementally)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=int, help='Month to rebuild (1-12)')
+        parser.add_argument('--year', type=int, help='Year to rebuild')
+
+    def handle(self, *args, **options):
+        month = options.get('month')
+        year = options.get('year')
+
+        if month and year:
+            periods = [(month, year)]
+        else:
+            # Every month that has invoices or expenses (optionally limited to one year)
+            invoices = Invoice.objects.annotate(m=ExtractMonth('date_issued'), y=ExtractYear('date_issued'))
+            expenses = Expense.objects.annotate(m=ExtractMonth('date'), y=ExtractYear('date'))
+            if year:
+                invoices = invoices.filter(y=year)
+                expenses = expenses.filter(y=year)
+            periods = sorted(
+                set(invoices.values_list('m', 'y').distinct()) | set(expenses.values_list('m', 'y').distinct()),
+                key=lambda period: (period[1], period[0])
+            )
+
+        for period_month, period_year in periods:
+            reports = FinanceService.update_all_reports_for_month(period_month, period_year)
+            self.stdout.write(f"{period_month:02d}/{period_year}: {len(reports)} rapport(s) reconstruit(s)")
+
+        self.stdout.write(self.style.SUCCESS(f'{len(periods)} mois reconstruit(s)'))
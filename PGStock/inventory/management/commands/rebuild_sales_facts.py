@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from inventory.services import SalesFactService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily sales fact table (otherwise maintained incrementally from invoices)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options.get('start') else None
+            end = date.fromisoformat(options['end']) if options.get('end') else None
+        except ValueError as e:
+            raise CommandError(f"Date invalide : {e}")
+
+        written = SalesFactService.rebuild(start, end)
+        period = f"du {start or 'début'} au {end or 'dernier jour'}"
+        self.stdout.write(self.style.SUCCESS(f'{written} fait(s) de vente reconstruit(s) {period}'))
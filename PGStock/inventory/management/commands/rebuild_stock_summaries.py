@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from inventory.models import Product
+from inventory.services import StockLedger
+
+
+class Command(BaseCommand):
+    help = 'Recomputes per-product stock summaries (they are otherwise maintained by the stock ledger)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Products per grouped query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+
+        for start in range(0, len(product_ids), batch_size):
+            StockLedger.refresh_summaries(product_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f'{len(product_ids)} résumé(s) de stock reconstruit(s)'))
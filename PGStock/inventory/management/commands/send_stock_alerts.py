@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from inventory.services import StockAlertService
+
+
+class Command(BaseCommand):
+    help = 'Mails queued low-stock alerts as a digest (run continuously, or with --once from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Send one digest then exit')
+        parser.add_argument('--interval', type=float, default=300.0,
+                            help='Seconds between digests (alerts detected meanwhile are grouped)')
+        parser.add_argument('--requeue-after', type=int, default=30,
+                            help='Minutes after which an alert being sent is considered abandoned')
+
+    def handle(self, *args, **options):
+        service = StockAlertService()
+        requeue_after = timedelta(minutes=options['requeue_after'])
+        total = 0
+
+        while True:
+            service.requeue_stale(requeue_after)
+            sent = service.send_digest()
+            total += sent
+            if sent:
+                self.stdout.write(f"Récapitulatif envoyé : {sent} alerte(s)")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'{total} alerte(s) envoyée(s)'))
@@ -5,6 +5,7 @@ from inventory.models import (
     Category, Product, PointOfSale, Inventory, StockMovement, 
     Invoice, InvoiceItem, Receipt, ReceiptItem, Client, Supplier
 )
+from inventory.services import StockLedger
 from decimal import Decimal
 import sys
 
@@ -58,6 +59,7 @@ class Command(BaseCommand):
         Inventory.objects.get_or_create(product=self.product, point_of_sale=self.warehouse, defaults={'quantity': 0})
         Inventory.objects.get_or_create(product=self.product, point_of_sale=self.shop, defaults={'quantity': 0})
         Inventory.objects.filter(product=self.product).update(quantity=0)
+        StockLedger.refresh_summaries([self.product.pk])
         
         self.stdout.write(self.style.SUCCESS('   Data setup complete.'))
 
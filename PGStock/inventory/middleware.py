@@ -8,7 +8,7 @@ class CompanySettingsMiddleware:
     def __call__(self, request):
         # Get settings
         try:
-            settings = Settings.objects.first()
+            settings = Settings.get_current()
             if settings and settings.language:
                 translation.activate(settings.language)
                 request.LANGUAGE_CODE = translation.get_language()
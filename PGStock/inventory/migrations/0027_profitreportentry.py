@@ -0,0 +1,87 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:52
+
+import django.db.models.deletion
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_profit_report_entries(apps, schema_editor):
+    """Create the per-invoice contributions and rebuild the affected reports from them"""
+    Invoice = apps.get_model('inventory', 'Invoice')
+    Expense = apps.get_model('inventory', 'Expense')
+    MonthlyProfitReport = apps.get_model('inventory', 'MonthlyProfitReport')
+    ProfitReportEntry = apps.get_model('inventory', 'ProfitReportEntry')
+    fields = ['total_sales_brut', 'total_discounts', 'total_cost_of_goods', 'gross_profit']
+
+    invoices = Invoice.objects.filter(
+        status__in=['paid', 'sent'],
+        point_of_sale__isnull=False
+    ).prefetch_related('invoiceitem_set')
+
+    reports = {}
+    for invoice in invoices:
+        key = (invoice.date_issued.month, invoice.date_issued.year, invoice.point_of_sale_id)
+        if key not in reports:
+            report, _ = MonthlyProfitReport.objects.get_or_create(
+                month=key[0], year=key[1], point_of_sale_id=key[2]
+            )
+            for field in fields:
+                setattr(report, field, Decimal('0.00'))
+            reports[key] = report
+        report = reports[key]
+
+        brut = Decimal('0.00')
+        discounts = Decimal(str(invoice.discount_amount or 0))
+        cogs = Decimal('0.00')
+        for item in invoice.invoiceitem_set.all():
+            brut_line = item.quantity * item.unit_price
+            brut += brut_line
+            cogs += item.quantity * item.purchase_price
+            if item.discount:
+                discounts += brut_line * (item.discount / Decimal('100'))
+
+        entry = ProfitReportEntry.objects.create(
+            invoice=invoice,
+            report=report,
+            total_sales_brut=brut,
+            total_discounts=discounts.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            total_cost_of_goods=cogs,
+            gross_profit=invoice.total_profit,
+        )
+        for field in fields:
+            setattr(report, field, getattr(report, field) + getattr(entry, field))
+
+    for (month, year, pos_id), report in reports.items():
+        report.total_expenses = Expense.objects.filter(
+            date__month=month, date__year=year, point_of_sale_id=pos_id
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        report.net_interest = report.gross_profit - report.total_expenses
+        report.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0026_invoice_total_profit_invoiceitem_margin_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfitReportEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sales_brut', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Ventes Brutes')),
+                ('total_discounts', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Remises')),
+                ('total_cost_of_goods', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name="Coût d'Achat (COGS)")),
+                ('gross_profit', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Bénéfice')),
+                ('invoice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profit_report_entry', to='inventory.invoice', verbose_name='Facture')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='inventory.monthlyprofitreport', verbose_name='Rapport')),
+            ],
+            options={
+                'verbose_name': 'Contribution au rapport de profit',
+                'verbose_name_plural': 'Contributions aux rapports de profit',
+            },
+        ),
+        migrations.RunPython(build_profit_report_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0027_profitreportentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlyprofitreport',
+            name='is_stale',
+            field=models.BooleanField(default=False, verbose_name='À recalculer'),
+        ),
+        migrations.AddField(
+            model_name='profitreportentry',
+            name='is_stale',
+            field=models.BooleanField(default=False, verbose_name='À recalculer'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0028_profit_report_staleness'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(max_length=50, verbose_name='Type de rapport')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Filtres')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminé'), ('failed', 'Échec')], db_index=True, default='pending', max_length=20, verbose_name='Statut')),
+                ('file', models.FileField(blank=True, upload_to='reports/%Y/%m/', verbose_name='Fichier')),
+                ('filename', models.CharField(blank=True, max_length=255, verbose_name='Nom du fichier')),
+                ('error', models.TextField(blank=True, verbose_name='Erreur')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de demande')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Début')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Demandé par')),
+            ],
+            options={
+                'verbose_name': 'Rapport PDF en arrière-plan',
+                'verbose_name_plural': 'Rapports PDF en arrière-plan',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='inventory_r_status_6a8568_idx')],
+            },
+        ),
+    ]
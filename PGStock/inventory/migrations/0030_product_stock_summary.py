@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Q, Sum
+
+
+def build_stock_summaries(apps, schema_editor):
+    """Compute the summary of every product from its inventory rows"""
+    Product = apps.get_model('inventory', 'Product')
+    Inventory = apps.get_model('inventory', 'Inventory')
+    ProductStockSummary = apps.get_model('inventory', 'ProductStockSummary')
+
+    totals = {
+        row['product_id']: row
+        for row in Inventory.objects.order_by().values('product_id').annotate(
+            total_quantity=Sum('quantity'),
+            pos_count=Count('id'),
+            min_reorder_level=Min('reorder_level'),
+            low_stock_count=Count('id', filter=Q(quantity__gt=0, quantity__lte=F('reorder_level'))),
+            in_stock_count=Count('id', filter=Q(quantity__gt=F('reorder_level'))),
+        )
+    }
+
+    summaries = []
+    for product_id in Product.objects.values_list('id', flat=True).iterator():
+        row = totals.get(product_id, {})
+        total_quantity = row.get('total_quantity') or 0
+        reorder_level = row.get('min_reorder_level')
+        if reorder_level is None:
+            reorder_level = 10
+        if total_quantity == 0:
+            status = 'out_of_stock'
+        elif total_quantity <= reorder_level:
+            status = 'low_stock'
+        else:
+            status = 'in_stock'
+        summaries.append(ProductStockSummary(
+            product_id=product_id,
+            total_quantity=total_quantity,
+            pos_count=row.get('pos_count', 0),
+            min_reorder_level=reorder_level,
+            low_stock_count=row.get('low_stock_count', 0),
+            in_stock_count=row.get('in_stock_count', 0),
+            status=status,
+        ))
+    ProductStockSummary.objects.bulk_create(summaries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0029_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStockSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_summary', serialize=False, to='inventory.product', verbose_name='Produit')),
+                ('total_quantity', models.IntegerField(default=0, verbose_name='Quantité totale')),
+                ('pos_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de points de vente')),
+                ('min_reorder_level', models.IntegerField(default=10, verbose_name='Seuil minimal')),
+                ('low_stock_count', models.PositiveIntegerField(default=0, verbose_name='Inventaires en stock faible')),
+                ('in_stock_count', models.PositiveIntegerField(default=0, verbose_name='Inventaires au-dessus du seuil')),
+                ('status', models.CharField(choices=[('in_stock', 'En stock'), ('low_stock', 'Stock faible'), ('out_of_stock', 'Rupture de stock')], default='out_of_stock', max_length=20, verbose_name='Statut')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Résumé du stock produit',
+                'verbose_name_plural': 'Résumés du stock produit',
+                'indexes': [models.Index(fields=['status', 'total_quantity'], name='inventory_p_status_9ad72c_idx'), models.Index(fields=['total_quantity'], name='inventory_p_total_q_7bb62f_idx')],
+            },
+        ),
+        migrations.RunPython(build_stock_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+# Index de recherche produits (POS) propres à chaque moteur :
+# - SQLite : index NOCASE, utilisables par LIKE 'abc%' (istartswith / iexact)
+# - PostgreSQL : index trigrammes sur UPPER(col::text), l'expression générée
+#   par Django pour icontains / istartswith
+SEARCH_INDEXES = {
+    'sqlite': [
+        ('inventory_product_name_nocase', 'CREATE INDEX IF NOT EXISTS {name} ON inventory_product (name COLLATE NOCASE)'),
+        ('inventory_product_sku_nocase', 'CREATE INDEX IF NOT EXISTS {name} ON inventory_product (sku COLLATE NOCASE)'),
+    ],
+    'postgresql': [
+        ('inventory_product_name_trgm', 'CREATE INDEX IF NOT EXISTS {name} ON inventory_product USING gin (UPPER(name::text) gin_trgm_ops)'),
+        ('inventory_product_sku_trgm', 'CREATE INDEX IF NOT EXISTS {name} ON inventory_product USING gin (UPPER(sku::text) gin_trgm_ops)'),
+    ],
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, sql in SEARCH_INDEXES.get(vendor, []):
+        schema_editor.execute(sql.format(name=name))
+
+
+def drop_search_indexes(apps, schema_editor):
+    for name, sql in SEARCH_INDEXES.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0030_product_stock_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0031_product_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_type', models.CharField(choices=[('invoice', 'Facture'), ('receipt', 'Bon de réception'), ('quote', 'Devis'), ('order', 'Commande')], max_length=20, verbose_name='Type de document')),
+                ('year', models.PositiveIntegerField(verbose_name='Année')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Dernier numéro attribué')),
+                ('point_of_sale', models.ForeignKey(blank=True, help_text='Vide : numérotation commune à tous les points de vente', null=True, on_delete=django.db.models.deletion.CASCADE, to='inventory.pointofsale', verbose_name='Point de vente')),
+            ],
+            options={
+                'verbose_name': 'Séquence de numérotation',
+                'verbose_name_plural': 'Séquences de numérotation',
+                'constraints': [models.UniqueConstraint(fields=('document_type', 'year', 'point_of_sale'), name='unique_document_sequence_per_pos'), models.UniqueConstraint(condition=models.Q(('point_of_sale__isnull', True)), fields=('document_type', 'year'), name='unique_document_sequence_global')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0032_document_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkuSequence',
+            fields=[
+                ('prefix', models.CharField(max_length=10, primary_key=True, serialize=False, verbose_name='Préfixe')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Dernier numéro réservé')),
+            ],
+            options={
+                'verbose_name': 'Compteur de SKU',
+                'verbose_name_plural': 'Compteurs de SKU',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0033_sku_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_file', models.FileField(upload_to='imports/%Y/%m/', verbose_name='Fichier')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='Nom du fichier')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminé'), ('failed', 'Échec')], db_index=True, default='pending', max_length=20, verbose_name='Statut')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='Lignes (estimation)')),
+                ('rows_done', models.PositiveIntegerField(default=0, verbose_name='Lignes traitées')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='Produits créés')),
+                ('updated_count', models.PositiveIntegerField(default=0, verbose_name='Produits mis à jour')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Erreurs')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Messages')),
+                ('last_line', models.PositiveIntegerField(default=0, verbose_name='Dernière ligne validée')),
+                ('error', models.TextField(blank=True, verbose_name='Erreur')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de demande')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Début')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière progression')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Demandé par')),
+            ],
+            options={
+                'verbose_name': 'Importation de produits',
+                'verbose_name_plural': 'Importations de produits',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='inventory_i_status_67e2fa_idx')],
+            },
+        ),
+    ]
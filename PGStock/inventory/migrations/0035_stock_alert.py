@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0034_import_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='Stock détecté')),
+                ('reorder_level', models.IntegerField(verbose_name='Seuil de réapprovisionnement')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('sending', "En cours d'envoi"), ('sent', 'Envoyée'), ('resolved', 'Stock rétabli avant envoi'), ('failed', 'Échec')], db_index=True, default='pending', max_length=20, verbose_name='Statut')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('error', models.TextField(blank=True, verbose_name='Erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de détection')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name="Date d'envoi")),
+                ('point_of_sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='inventory.pointofsale', verbose_name='Point de vente')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='inventory.product', verbose_name='Produit')),
+            ],
+            options={
+                'verbose_name': 'Alerte de stock faible',
+                'verbose_name_plural': 'Alertes de stock faible',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['product', 'point_of_sale', 'created_at'], name='inventory_s_product_6e2110_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('product', 'point_of_sale'), name='unique_pending_stock_alert')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0035_stock_alert'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'point_of_sale', 'date_issued'], name='inventory_i_status_2078bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['status', 'point_of_sale', 'date_received'], name='inventory_r_status_7a85f2_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+
+
+def build_daily_sales_facts(apps, schema_editor):
+    """Aggregate the lines of every paid invoice by (day, POS, product, wholesale)"""
+    InvoiceItem = apps.get_model('inventory', 'InvoiceItem')
+    DailySalesFact = apps.get_model('inventory', 'DailySalesFact')
+    amount = DecimalField(max_digits=20, decimal_places=2)
+
+    rows = (
+        InvoiceItem.objects.filter(invoice__status='paid')
+        .order_by()
+        .values('invoice__date_issued', 'invoice__point_of_sale_id', 'product_id', 'is_wholesale')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            total_gross=Sum(F('quantity') * F('unit_price'), output_field=amount),
+            total_net=Sum('total'),
+            total_cost=Sum(F('quantity') * F('purchase_price'), output_field=amount),
+            total_margin=Sum('margin'),
+        )
+    )
+    facts = (
+        DailySalesFact(
+            date=row['invoice__date_issued'],
+            point_of_sale_id=row['invoice__point_of_sale_id'],
+            product_id=row['product_id'],
+            is_wholesale=row['is_wholesale'],
+            quantity=row['total_quantity'] or 0,
+            gross=row['total_gross'] or 0,
+            discount=(row['total_gross'] or 0) - (row['total_net'] or 0),
+            cost_of_goods=row['total_cost'] or 0,
+            margin=row['total_margin'] or 0,
+        )
+        for row in rows.iterator(chunk_size=2000)
+    )
+    DailySalesFact.objects.bulk_create(facts, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0036_report_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Jour')),
+                ('is_wholesale', models.BooleanField(default=False, verbose_name='En gros lot')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Quantité vendue')),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Ventes brutes (avant remises)')),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Remises de ligne')),
+                ('cost_of_goods', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name="Coût d'achat (COGS)")),
+                ('margin', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Marge')),
+                ('point_of_sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.pointofsale', verbose_name='Point de vente')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.product', verbose_name='Produit')),
+            ],
+            options={
+                'verbose_name': 'Ventes journalières',
+                'verbose_name_plural': 'Ventes journalières',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['product', 'date'], name='inventory_d_product_763c0d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'point_of_sale', 'product', 'is_wholesale'), name='unique_daily_sales_fact')],
+            },
+        ),
+        migrations.RunPython(build_daily_sales_facts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:25
+
+import inventory.storage
+from django.db import migrations, models
+
+
+def move_report_files(apps, schema_editor):
+    """Les PDF déjà générés quittent MEDIA_ROOT (servi publiquement)"""
+    ReportJob = apps.get_model('inventory', 'ReportJob')
+    for name in ReportJob.objects.exclude(file='').values_list('file', flat=True).iterator():
+        inventory.storage.move_to_private_storage(name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0037_daily_sales_fact'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='file',
+            field=models.FileField(blank=True, storage=inventory.storage.PrivateFileSystemStorage(), upload_to=inventory.storage.report_upload_to, verbose_name='Fichier'),
+        ),
+        migrations.RunPython(move_report_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:28
+
+import inventory.storage
+from django.db import migrations, models
+
+
+def move_import_files(apps, schema_editor):
+    """Les classeurs déjà importés quittent MEDIA_ROOT (servi publiquement)"""
+    ImportJob = apps.get_model('inventory', 'ImportJob')
+    for name in ImportJob.objects.exclude(source_file='').values_list('source_file', flat=True).iterator():
+        inventory.storage.move_to_private_storage(name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0038_private_report_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='worker_token',
+            field=models.CharField(blank=True, max_length=32, verbose_name='Jeton du worker'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='source_file',
+            field=models.FileField(storage=inventory.storage.PrivateFileSystemStorage(), upload_to=inventory.storage.import_upload_to, verbose_name='Fichier'),
+        ),
+        migrations.RunPython(move_import_files, migrations.RunPython.noop),
+    ]
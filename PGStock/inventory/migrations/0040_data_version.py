@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0039_private_import_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Jeu de données')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Version')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière écriture')),
+            ],
+            options={
+                'verbose_name': 'Version des données',
+                'verbose_name_plural': 'Versions des données',
+            },
+        ),
+    ]
@@ -1,7 +1,31 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.core.exceptions import ObjectDoesNotExist
 from decimal import Decimal
+from .storage import private_storage, report_upload_to, import_upload_to
+
+
+def stock_analysis(quantity, units_per_box):
+    """
+    Décompose une quantité en colis et unités.
+
+    Utilisé par les modèles et par les exports (à partir de values_list,
+    sans charger les objets).
+    """
+    if units_per_box > 1:
+        colis = quantity // units_per_box
+        unites = quantity % units_per_box
+        analysis = f"{colis} Colis, {unites} Unité(s)"
+    else:
+        colis = 0
+        unites = quantity
+        analysis = f"{quantity} Unité(s)"
+    return {
+        'colis': colis,
+        'unites': unites,
+        'analysis': analysis
+    }
 
 
 class Category(models.Model):
@@ -160,31 +184,50 @@ class Product(models.Model):
         """Génère un SKU unique basé sur la catégorie"""
         if not self.category:
             return None
-            
-        # 1. Extraire le préfixe (3 premières lettres de la catégorie, nettoyées)
+        return Product.allocate_skus(self.category, 1)[0]
+
+    @staticmethod
+    def sku_prefix(category):
+        """Préfixe SKU d'une catégorie : 3 premières lettres du nom, nettoyées"""
         import re
-        prefix = re.sub(r'[^A-Z]', '', self.category.name.upper())[:3]
+        prefix = re.sub(r'[^A-Z]', '', category.name.upper())[:3]
         if len(prefix) < 3:
             # Compléter si le nom est trop court ou sans lettres
             prefix = (prefix + "PRD")[:3]
-            
-        # 2. Trouver le prochain numéro séquentiel
-        # On compte les produits existants dans cette catégorie pour avoir une base
-        base_count = Product.objects.filter(category=self.category).count()
-        sequence = base_count + 1
-        
-        while True:
-            new_sku = f"{prefix}-{sequence:04d}"
-            # Vérifier l'unicité
-            if not Product.objects.filter(sku=new_sku).exists():
-                return new_sku
-            sequence += 1
+        return prefix
+
+    @staticmethod
+    def allocate_skus(category, count):
+        """
+        Réserve `count` SKU libres pour une catégorie (ex. import en masse).
+
+        Les numéros viennent du compteur du préfixe (SkuSequence) : une
+        réservation coûte le même nombre de requêtes pour 1 ou 10 000 SKU.
+        Si des SKU pré-numérotés occupent déjà certains numéros, le compteur
+        est avancé après le plus grand existant.
+
+        Returns:
+            Liste de SKU au format PRE-0001
+        """
+        prefix = Product.sku_prefix(category)
+        skus = []
+        while len(skus) < count:
+            candidates = [f"{prefix}-{number:04d}" for number in SkuSequence.reserve(prefix, count - len(skus))]
+            taken = set(Product.objects.filter(sku__in=candidates).values_list('sku', flat=True))
+            skus.extend(sku for sku in candidates if sku not in taken)
+            if taken:
+                SkuSequence.skip_to(prefix, SkuSequence.last_used(prefix))
+        return skus
 
     def save(self, *args, **kwargs):
         # Génération automatique du SKU si vide
         if not self.sku:
             self.sku = self.generate_unique_sku()
-            
+        self.compute_prices()
+        super().save(*args, **kwargs)
+
+    def compute_prices(self):
+        """Calcule marges et prix de gros dérivés (aussi utilisé avant un bulk_create/bulk_update)"""
         # Logique de calcul automatique des prix (Bidirectionnel)
         from decimal import Decimal
         
@@ -215,11 +258,25 @@ class Product(models.Model):
                 self.wholesale_margin = (self.wholesale_selling_price - w_pp).quantize(Decimal('0.01'))
         
         self.wholesale_purchase_price = w_pp
-        
-        super().save(*args, **kwargs)
+
+    def get_stock_summary(self):
+        """
+        Résumé de stock maintenu par le registre (None s'il n'a pas encore été calculé).
+
+        Relu à chaque appel, sauf s'il a été chargé avec select_related('stock_summary').
+        """
+        if Product.stock_summary.is_cached(self):
+            try:
+                return self.stock_summary
+            except ObjectDoesNotExist:
+                return None
+        return ProductStockSummary.objects.filter(product_id=self.pk).first()
 
     def get_total_stock_quantity(self):
         """Retourne la quantité totale en stock sur tous les points de vente"""
+        summary = self.get_stock_summary()
+        if summary is not None:
+            return summary.total_quantity
         from django.db.models import Sum
         total = self.inventory_set.aggregate(total=Sum('quantity'))['total']
         return total or 0
@@ -239,37 +296,80 @@ class Product(models.Model):
         return self.inventory_set.first()
 
     def get_stock_status(self):
-        """Retourne le statut du stock global"""
-        total_quantity = self.get_total_stock_quantity()
-        
-        # On prend le seuil de réapprovisionnement du premier inventaire trouvé comme référence
-        # ou une valeur par défaut si aucun inventaire n'existe
-        first_inventory = self.inventory_set.first()
-        reorder_level = first_inventory.reorder_level if first_inventory else 10
-        
-        if total_quantity == 0:
-            return 'out_of_stock'
-        elif total_quantity <= reorder_level:
-            return 'low_stock'
-        else:
-            return 'in_stock'
+        """Retourne le statut du stock global (seuil : le plus bas des inventaires)"""
+        summary = self.get_stock_summary()
+        if summary is not None:
+            return summary.status
+        from django.db.models import Sum, Min
+        totals = self.inventory_set.aggregate(total=Sum('quantity'), reorder_level=Min('reorder_level'))
+        return ProductStockSummary.compute_status(
+            totals['total'] or 0,
+            ProductStockSummary.DEFAULT_REORDER_LEVEL if totals['reorder_level'] is None else totals['reorder_level']
+        )
 
     def get_analysis_data(self):
         """Retourne les données d'analyse (Colis, Unités, Analyse) pour le stock global"""
-        total_quantity = self.get_total_stock_quantity()
-        if self.units_per_box > 1:
-            colis = total_quantity // self.units_per_box
-            unites = total_quantity % self.units_per_box
-            analysis = f"{colis} Colis, {unites} Unité(s)"
-        else:
-            colis = 0
-            unites = total_quantity
-            analysis = f"{total_quantity} Unité(s)"
-        return {
-            'colis': colis,
-            'unites': unites,
-            'analysis': analysis
-        }
+        return stock_analysis(self.get_total_stock_quantity(), self.units_per_box)
+
+
+class SkuSequence(models.Model):
+    """
+    Compteur des SKU générés automatiquement, par préfixe de catégorie.
+
+    La réservation d'un ou plusieurs numéros est un seul UPDATE
+    (last_value = last_value + n) suivi d'une lecture.
+    """
+    prefix = models.CharField(max_length=10, primary_key=True, verbose_name="Préfixe")
+    last_value = models.PositiveIntegerField(default=0, verbose_name="Dernier numéro réservé")
+
+    class Meta:
+        verbose_name = "Compteur de SKU"
+        verbose_name_plural = "Compteurs de SKU"
+
+    def __str__(self):
+        return f"{self.prefix} : {self.last_value}"
+
+    @staticmethod
+    def last_used(prefix):
+        """Plus grand numéro présent dans les SKU PRE-<nombre> existants"""
+        from django.db.models.functions import Length
+        last = (
+            Product.objects.filter(sku__regex=rf'^{prefix}-[0-9]+$')
+            .order_by(Length('sku').desc(), '-sku')
+            .values_list('sku', flat=True)
+            .first()
+        )
+        return int(last.rsplit('-', 1)[-1]) if last else 0
+
+    @classmethod
+    def reserve(cls, prefix, count=1):
+        """
+        Réserve `count` numéros consécutifs pour le préfixe.
+
+        Returns:
+            range des numéros réservés
+        """
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+
+        sequence = cls.objects.filter(prefix=prefix)
+        with transaction.atomic(savepoint=False):
+            if not sequence.update(last_value=F('last_value') + count):
+                try:
+                    with transaction.atomic():
+                        # Première utilisation : reprendre après les SKU existants
+                        last_value = cls.objects.create(prefix=prefix, last_value=cls.last_used(prefix) + count).last_value
+                    return range(last_value - count + 1, last_value + 1)
+                except IntegrityError:
+                    sequence.update(last_value=F('last_value') + count)
+            last_value = sequence.values_list('last_value', flat=True).get()
+        return range(last_value - count + 1, last_value + 1)
+
+    @classmethod
+    def skip_to(cls, prefix, value):
+        """Avance le compteur jusqu'à `value` (jamais en arrière)"""
+        from django.db.models.functions import Greatest
+        cls.objects.filter(prefix=prefix).update(last_value=Greatest('last_value', value))
 
 
 class PointOfSale(models.Model):
@@ -393,19 +493,58 @@ class Inventory(models.Model):
 
     def get_analysis_data(self):
         """Retourne les données d'analyse (Colis, Unités, Analyse) pour cet inventaire"""
-        if self.product.units_per_box > 1:
-            colis = self.quantity // self.product.units_per_box
-            unites = self.quantity % self.product.units_per_box
-            analysis = f"{colis} Colis, {unites} Unité(s)"
-        else:
-            colis = 0
-            unites = self.quantity
-            analysis = f"{self.quantity} Unité(s)"
-        return {
-            'colis': colis,
-            'unites': unites,
-            'analysis': analysis
-        }
+        return stock_analysis(self.quantity, self.product.units_per_box)
+
+
+class ProductStockSummary(models.Model):
+    """
+    Totaux de stock d'un produit, tous points de vente confondus.
+
+    Table dénormalisée tenue à jour par le registre de stock
+    (StockLedger.refresh_summaries) : les listes et filtres par statut la
+    lisent directement, sans regrouper Inventory à chaque requête.
+    """
+    STATUS_CHOICES = [
+        ('in_stock', 'En stock'),
+        ('low_stock', 'Stock faible'),
+        ('out_of_stock', 'Rupture de stock'),
+    ]
+
+    # Seuil utilisé quand le produit n'a encore aucun inventaire
+    DEFAULT_REORDER_LEVEL = 10
+
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True,
+        related_name='stock_summary', verbose_name="Produit"
+    )
+    total_quantity = models.IntegerField(default=0, verbose_name="Quantité totale")
+    pos_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de points de vente")
+    min_reorder_level = models.IntegerField(default=DEFAULT_REORDER_LEVEL, verbose_name="Seuil minimal")
+    # Inventaires en stock faible / au-dessus du seuil (filtres de la liste d'inventaire)
+    low_stock_count = models.PositiveIntegerField(default=0, verbose_name="Inventaires en stock faible")
+    in_stock_count = models.PositiveIntegerField(default=0, verbose_name="Inventaires au-dessus du seuil")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='out_of_stock', verbose_name="Statut")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
+
+    class Meta:
+        verbose_name = "Résumé du stock produit"
+        verbose_name_plural = "Résumés du stock produit"
+        indexes = [
+            models.Index(fields=['status', 'total_quantity']),
+            models.Index(fields=['total_quantity']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.total_quantity} unités ({self.status})"
+
+    @classmethod
+    def compute_status(cls, total_quantity, reorder_level):
+        """Même règle que Inventory.get_status(), appliquée au stock global"""
+        if total_quantity == 0:
+            return 'out_of_stock'
+        elif total_quantity <= reorder_level:
+            return 'low_stock'
+        return 'in_stock'
 
 
 
@@ -423,6 +562,9 @@ class StockMovement(models.Model):
         ('return', 'Retour'),
         ('defective', 'Défectueux'),
     ]
+    
+    # Types de mouvements qui retirent du stock au point de vente source
+    STOCK_CHECK_TYPES = ['exit', 'transfer', 'defective']
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Produit")
     movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES, verbose_name="Type de mouvement")
@@ -468,65 +610,76 @@ class StockMovement(models.Model):
     
     def clean(self):
         """Validation des mouvements de stock multi-points de vente"""
-        from django.core.exceptions import ValidationError
-        
         # Vérifier que les champs requis sont présents
         # Note: On utilise product_id pour éviter RelatedObjectDoesNotExist si le produit n'est pas encore défini
         if not hasattr(self, 'product_id') or not self.product_id or not self.movement_type or self.quantity is None or not self.from_point_of_sale_id:
             return  # Laisser Django gérer la validation des champs requis
         
+        inventory = None
+        if self.movement_type in self.STOCK_CHECK_TYPES:
+            inventory = Inventory.objects.filter(
+                product_id=self.product_id,
+                point_of_sale_id=self.from_point_of_sale_id
+            ).first()
+        self.validate_against(inventory)
+
+    def validate_against(self, inventory):
+        """
+        Valide le mouvement par rapport à l'inventaire source.
+        
+        `inventory` est la ligne d'inventaire du point de vente source
+        (ou None si elle n'existe pas). Utilisé par clean() et par les
+        traitements en lot qui valident sur un instantané verrouillé.
+        """
+        from django.core.exceptions import ValidationError
+        
         # Pour les transferts, vérifier que to_point_of_sale est défini
         if self.movement_type == 'transfer':
-            if not self.to_point_of_sale:
+            if not self.to_point_of_sale_id:
                 raise ValidationError("Un point de vente de destination est requis pour les transferts.")
-            if self.from_point_of_sale == self.to_point_of_sale:
+            if self.from_point_of_sale_id == self.to_point_of_sale_id:
                 raise ValidationError("Impossible de transférer vers le même point de vente.")
         
         # Pour les sorties, vérifier le stock minimum par point de vente
-        if self.movement_type in ['exit', 'transfer', 'defective']:
-            try:
-                inventory = Inventory.objects.get(
-                    product=self.product,
-                    point_of_sale=self.from_point_of_sale
-                )
-                
-                # Gérer le cas où quantity ou reorder_level pourrait être None
-                current_quantity = inventory.quantity if inventory.quantity is not None else 0
-                min_quantity = inventory.reorder_level if inventory.reorder_level is not None else 0
-                
-                stock_after_movement = current_quantity - self.quantity
-                
-                # [FIX] Autoriser les corrections/annulations même si en dessous du stock minimum
-                is_correction = self.notes and ("Correction" in self.notes or "Annulation" in self.notes)
-                
-                if stock_after_movement < min_quantity and not is_correction:
-                    # Formatter les stocks pour l'affichage
-                    def format_qty(qty, product):
-                        if product.units_per_box > 1:
-                            colis = qty // product.units_per_box
-                            unites = qty % product.units_per_box
-                            return f"{colis} Colis, {unites} Unité(s) ({qty} total)"
-                        return f"{qty} Unité(s)"
-
-                    raise ValidationError(
-                        f"❌ Opération refusée au {self.from_point_of_sale.code}: "
-                        f"Cette sortie ramènerait le stock à {format_qty(stock_after_movement, self.product)}, "
-                        f"en dessous du stock minimum requis de {format_qty(min_quantity, self.product)}. "
-                        f"Stock actuel : {format_qty(current_quantity, self.product)}. "
-                        f"Quantité maximum autorisée à sortir : {format_qty(max(0, current_quantity - min_quantity), self.product)}."
-                    )
-            except Inventory.DoesNotExist:
+        if self.movement_type in self.STOCK_CHECK_TYPES:
+            if inventory is None:
                 raise ValidationError(
                     f"❌ Impossible de faire une sortie : aucun inventaire existant pour "
                     f"le produit '{self.product.name}' au point de vente '{self.from_point_of_sale.code}'."
                 )
+            
+            # Gérer le cas où quantity ou reorder_level pourrait être None
+            current_quantity = inventory.quantity if inventory.quantity is not None else 0
+            min_quantity = inventory.reorder_level if inventory.reorder_level is not None else 0
+            
+            stock_after_movement = current_quantity - self.quantity
+            
+            # [FIX] Autoriser les corrections/annulations même si en dessous du stock minimum
+            is_correction = self.notes and ("Correction" in self.notes or "Annulation" in self.notes)
+            
+            if stock_after_movement < min_quantity and not is_correction:
+                # Formatter les stocks pour l'affichage
+                def format_qty(qty, product):
+                    if product.units_per_box > 1:
+                        colis = qty // product.units_per_box
+                        unites = qty % product.units_per_box
+                        return f"{colis} Colis, {unites} Unité(s) ({qty} total)"
+                    return f"{qty} Unité(s)"
+
+                raise ValidationError(
+                    f"❌ Opération refusée au {self.from_point_of_sale.code}: "
+                    f"Cette sortie ramènerait le stock à {format_qty(stock_after_movement, self.product)}, "
+                    f"en dessous du stock minimum requis de {format_qty(min_quantity, self.product)}. "
+                    f"Stock actuel : {format_qty(current_quantity, self.product)}. "
+                    f"Quantité maximum autorisée à sortir : {format_qty(max(0, current_quantity - min_quantity), self.product)}."
+                )
 
     def save(self, *args, **kwargs):
         """Mise à jour automatique de l'inventaire multi-points de vente"""
-        # Valider avant de sauvegarder
-        if not kwargs.pop('skip_validation', False):
-            self.clean()
-        
+        from django.db import transaction
+        from .services.stock_ledger import StockLedger
+
+        skip_validation = kwargs.pop('skip_validation', False)
         is_new = self.pk is None
         
         # Empêcher la modification des mouvements existants
@@ -535,64 +688,37 @@ class StockMovement(models.Model):
             # Mais pour la cohérence stricte, on bloque tout pour l'instant.
             # Sauf si on passe un flag spécial (pour les admins/devs si besoin urgent)
             if not kwargs.pop('force_update', False):
+                if not skip_validation:
+                    self.clean()
                 from django.core.exceptions import ValidationError
                 raise ValidationError("Les mouvements de stock ne peuvent pas être modifiés une fois créés. Créez un mouvement de correction à la place.")
         
-        # Force is_wholesale=True for entries as per user request
-        if is_new and self.movement_type == 'entry':
-            self.is_wholesale = True
+        with transaction.atomic():
+            # Valider avant de sauvegarder, sur les lignes d'inventaire verrouillées
+            # pour que deux ventes simultanées ne valident pas le même stock
+            if not skip_validation:
+                if is_new and self.product_id and self.from_point_of_sale_id:
+                    StockLedger.lock_inventories(StockLedger.movement_keys(self), create_missing=False)
+                self.clean()
+            
+            # Force is_wholesale=True for entries as per user request
+            if is_new and self.movement_type == 'entry':
+                self.is_wholesale = True
 
-        super().save(*args, **kwargs)
-        
-        if is_new:
-            # Mise à jour de l'inventaire au point de vente source
-            inventory_from, created = Inventory.objects.get_or_create(
-                product=self.product,
-                point_of_sale=self.from_point_of_sale,
-                defaults={'quantity': 0}
-            )
+            super().save(*args, **kwargs)
             
-            # Calculer la quantité réelle en unités
-            actual_move_qty = self.quantity
-            if self.is_wholesale:
-                actual_move_qty = self.quantity * self.product.units_per_box
-                
-            # Logique selon le type de mouvement
-            if self.movement_type == 'entry':
-                inventory_from.quantity += actual_move_qty
-                
-            elif self.movement_type in ['exit', 'defective']:
-                inventory_from.quantity = max(0, inventory_from.quantity - actual_move_qty)
-                
-            elif self.movement_type == 'transfer':
-                # Diminuer le stock du point de vente source
-                inventory_from.quantity = max(0, inventory_from.quantity - actual_move_qty)
-                
-                # Augmenter le stock du point de vente destination
-                if self.to_point_of_sale:
-                    inventory_to, created = Inventory.objects.get_or_create(
-                        product=self.product,
-                        point_of_sale=self.to_point_of_sale,
-                        defaults={'quantity': 0}
-                    )
-                    inventory_to.quantity += actual_move_qty
-                    inventory_to.save()
+            if is_new:
+                # Mise à jour de l'inventaire en base (UPDATE atomique sur lignes verrouillées)
+                inventories = StockLedger.apply_movement(self)
+                inventory_from = inventories[self.from_point_of_sale_id]
                 
-            elif self.movement_type == 'return':
-                inventory_from.quantity += actual_move_qty
-                
-            elif self.movement_type == 'adjustment':
-                inventory_from.quantity = actual_move_qty
-            
-            inventory_from.save()
-            
-            logger.info(
-                f"STOCK UPDATE: Product {self.product.name} ({self.product.sku}) "
-                f"Action {self.movement_type} Quantity {self.quantity} "
-                f"({'Gros' if self.is_wholesale else 'Détail'}) "
-                f"at {self.from_point_of_sale.name}. "
-                f"New Stock Level: {inventory_from.quantity}"
-            )
+                logger.info(
+                    f"STOCK UPDATE: Product {self.product.name} ({self.product.sku}) "
+                    f"Action {self.movement_type} Quantity {self.quantity} "
+                    f"({'Gros' if self.is_wholesale else 'Détail'}) "
+                    f"at {self.from_point_of_sale.name}. "
+                    f"New Stock Level: {inventory_from.quantity}"
+                )
 
 
     def delete(self, *args, **kwargs):
@@ -602,6 +728,188 @@ class StockMovement(models.Model):
         super().delete(*args, **kwargs)
 
 
+def last_document_number(queryset, field, prefix):
+    """
+    Plus grand numéro déjà attribué avec ce préfixe (ex. 'INV-2025-').
+    Sert à amorcer une séquence sur une base qui contient déjà des documents.
+    """
+    last = (
+        queryset.filter(**{f'{field}__startswith': prefix})
+        .order_by(f'-{field}')
+        .values_list(field, flat=True)
+        .first()
+    )
+    try:
+        return int(last.rsplit('-', 1)[-1]) if last else 0
+    except ValueError:
+        return 0
+
+
+class DocumentSequence(models.Model):
+    """
+    Compteur de numérotation des documents (factures, bons, devis, commandes).
+
+    Une ligne par (type, année, point de vente optionnel), incrémentée par un
+    seul UPDATE dans la transaction du document : la ligne reste verrouillée
+    jusqu'au commit, les numéros sont donc uniques et sans trou (un rollback
+    annule aussi l'incrément).
+    """
+    DOCUMENT_TYPES = [
+        ('invoice', 'Facture'),
+        ('receipt', 'Bon de réception'),
+        ('quote', 'Devis'),
+        ('order', 'Commande'),
+    ]
+
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES, verbose_name="Type de document")
+    year = models.PositiveIntegerField(verbose_name="Année")
+    point_of_sale = models.ForeignKey(
+        PointOfSale, on_delete=models.CASCADE, null=True, blank=True,
+        verbose_name="Point de vente", help_text="Vide : numérotation commune à tous les points de vente"
+    )
+    last_value = models.PositiveIntegerField(default=0, verbose_name="Dernier numéro attribué")
+
+    class Meta:
+        verbose_name = "Séquence de numérotation"
+        verbose_name_plural = "Séquences de numérotation"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['document_type', 'year', 'point_of_sale'],
+                name='unique_document_sequence_per_pos',
+            ),
+            # NULL n'est pas comparé par l'unicité ci-dessus
+            models.UniqueConstraint(
+                fields=['document_type', 'year'],
+                condition=models.Q(point_of_sale__isnull=True),
+                name='unique_document_sequence_global',
+            ),
+        ]
+
+    def __str__(self):
+        scope = f" - {self.point_of_sale_id}" if self.point_of_sale_id else ""
+        return f"{self.document_type} {self.year}{scope} : {self.last_value}"
+
+    @classmethod
+    def next_value(cls, document_type, year, point_of_sale=None, seed=None):
+        """
+        Réserve le numéro suivant de la séquence.
+
+        À appeler dans la transaction qui enregistre le document.
+
+        Args:
+            document_type: Type de document (voir DOCUMENT_TYPES)
+            year: Année de la séquence
+            point_of_sale: Point de vente (None : séquence commune)
+            seed: Fonction retournant le dernier numéro déjà utilisé,
+                appelée seulement à la création de la séquence
+
+        Returns:
+            int: Numéro réservé
+        """
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+
+        sequence = cls.objects.filter(document_type=document_type, year=year, point_of_sale=point_of_sale)
+        with transaction.atomic(savepoint=False):
+            if not sequence.update(last_value=F('last_value') + 1):
+                try:
+                    with transaction.atomic():
+                        created = cls.objects.create(
+                            document_type=document_type, year=year, point_of_sale=point_of_sale,
+                            last_value=(seed() if seed else 0) + 1
+                        )
+                    return created.last_value
+                except IntegrityError:
+                    # Créée entre-temps par une autre transaction
+                    sequence.update(last_value=F('last_value') + 1)
+            return sequence.values_list('last_value', flat=True).get()
+
+
+
+class DataVersion(models.Model):
+    """
+    Version d'un jeu de données, partagée par tous les processus.
+
+    Les caches de chaque processus (catalogue du POS, tableau de bord et
+    graphiques) sont rangés sous cette version et revalidés par elle (ETag,
+    Last-Modified) : le cache par défaut étant
+    local au processus, seule la base voit les écritures de tous les workers.
+    La version est incrémentée après le commit de chaque écriture.
+    """
+    CATALOGUE = 'catalogue'
+    DASHBOARD = 'dashboard'
+
+    name = models.CharField(max_length=50, unique=True, verbose_name="Jeu de données")
+    value = models.PositiveBigIntegerField(default=0, verbose_name="Version")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière écriture")
+
+    class Meta:
+        verbose_name = "Version des données"
+        verbose_name_plural = "Versions des données"
+
+    def __str__(self):
+        return f"{self.name} : {self.value}"
+
+    @classmethod
+    def get_value(cls, name):
+        """Version courante (0 tant que rien n'a été écrit)"""
+        return cls.get_state(name)[0]
+
+    @classmethod
+    def get_state(cls, name):
+        """(version, date de la dernière écriture), (0, None) tant que rien n'a été écrit"""
+        return cls.objects.filter(name=name).values_list('value', 'updated_at').first() or (0, None)
+
+    @classmethod
+    def next_value(cls, name):
+        """
+        Incrémente la version et la retourne.
+
+        Un seul UPDATE, relu dans la même transaction (voir DocumentSequence.next_value) :
+        la valeur retournée est celle de cet incrément.
+        """
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+        from django.utils import timezone
+
+        versions = cls.objects.filter(name=name)
+        with transaction.atomic(savepoint=False):
+            if not versions.update(value=F('value') + 1, updated_at=timezone.now()):
+                try:
+                    with transaction.atomic():
+                        return cls.objects.create(name=name, value=1).value
+                except IntegrityError:
+                    # Créée entre-temps par une autre transaction
+                    versions.update(value=F('value') + 1, updated_at=timezone.now())
+            return versions.values_list('value', flat=True).get()
+
+    @classmethod
+    def bump_on_commit(cls, name):
+        """
+        Incrémente la version après le commit de la transaction en cours.
+
+        L'UPDATE s'exécute hors de la transaction (la ligne n'est verrouillée
+        qu'un instant) et une seule fois pour tous les appels de la transaction ;
+        un rollback abandonne l'incrément.
+        """
+        from django.db import transaction
+
+        connection = transaction.get_connection()
+        state = connection.__dict__.setdefault('_data_version_bumps', {'queued': 0, 'bumped': {}})
+        state['queued'] += 1
+        queued = state['queued']
+
+        def bump_data_version():
+            # Un incrément postérieur à l'appel suffit
+            if state['bumped'].get(name, 0) > queued:
+                return
+            cls.next_value(name)
+            state['queued'] += 1
+            state['bumped'][name] = state['queued']
+
+        transaction.on_commit(bump_data_version, robust=True)
+
+
 class Invoice(models.Model):
     """Facture client"""
     STATUS_CHOICES = [
@@ -647,14 +955,22 @@ class Invoice(models.Model):
         verbose_name = "Facture"
         verbose_name_plural = "Factures"
         ordering = ['-date_issued']
+        indexes = [
+            # Ventes journalières par point de vente (rapports)
+            models.Index(fields=['status', 'point_of_sale', 'date_issued']),
+        ]
 
     def __str__(self):
         return f"Facture {self.invoice_number} - {self.client.name}"
 
     def calculate_totals(self):
         """Calcule les totaux de la facture"""
+        self.compute_totals(self.invoiceitem_set.all())
+        self.save()
+
+    def compute_totals(self, items):
+        """Calcule les totaux en mémoire à partir des lignes données (sans enregistrer)"""
         from decimal import Decimal, ROUND_HALF_UP
-        items = self.invoiceitem_set.all()
         # Calculer le sous-total et quantifier à 2 décimales
         self.subtotal = sum(item.get_total() for item in items)
         self.subtotal = Decimal(str(self.subtotal)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -676,20 +992,16 @@ class Invoice(models.Model):
         # S'assurer que le total n'est pas négatif
         if self.total_amount < Decimal('0.00'):
             self.total_amount = Decimal('0.00')
-            
-        self.save()
 
     def generate_invoice_number(self):
-        """Génère un numéro de facture unique"""
+        """Génère un numéro de facture unique (séquence annuelle, voir DocumentSequence)"""
         from datetime import datetime
         year = datetime.now().year
-        last_invoice = Invoice.objects.filter(invoice_number__startswith=f'INV-{year}').order_by('-invoice_number').first()
-        if last_invoice:
-            last_num = int(last_invoice.invoice_number.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        return f'INV-{year}-{new_num:05d}'
+        prefix = f'INV-{year}-'
+        new_num = DocumentSequence.next_value(
+            'invoice', year, seed=lambda: last_document_number(Invoice.objects, 'invoice_number', prefix)
+        )
+        return f'{prefix}{new_num:05d}'
 
     def get_amount_paid(self):
         """Retourne le montant total payé"""
@@ -723,7 +1035,7 @@ class Invoice(models.Model):
         
         # Récupérer la devise depuis les paramètres
         try:
-            settings = Settings.objects.first()
+            settings = Settings.get_current()
             currency = settings.currency if settings else 'GNF'
         except:
             currency = 'GNF'
@@ -765,10 +1077,11 @@ class Invoice(models.Model):
         if not self.point_of_sale:
             raise ValueError("Impossible de déduire le stock : aucun point de vente associé à cette facture.")
         
-        # Créer un mouvement de stock pour chaque item de la facture
-        items = self.invoiceitem_set.all()
-        for item in items:
-            StockMovement.objects.create(
+        # Créer les mouvements de stock de tous les items en un seul lot
+        from .services.stock_service import StockService
+        items = self.invoiceitem_set.select_related('product')
+        StockService().apply_movements([
+            StockMovement(
                 product=item.product,
                 movement_type='exit',
                 quantity=item.quantity,
@@ -778,6 +1091,8 @@ class Invoice(models.Model):
                 notes=f"Sortie automatique ({'Gros' if item.is_wholesale else 'Détail'}) pour facture {self.invoice_number}",
                 user=self.created_by
             )
+            for item in items
+        ])
         
         # Marquer comme déduit
         self.stock_deducted = True
@@ -793,10 +1108,11 @@ class Invoice(models.Model):
         if not self.point_of_sale:
             raise ValueError("Impossible de restaurer le stock : aucun point de vente associé à cette facture.")
         
-        # Créer un mouvement de retour pour chaque item de la facture
-        items = self.invoiceitem_set.all()
-        for item in items:
-            StockMovement.objects.create(
+        # Créer les mouvements de retour de tous les items en un seul lot
+        from .services.stock_service import StockService
+        items = self.invoiceitem_set.select_related('product')
+        StockService().apply_movements([
+            StockMovement(
                 product=item.product,
                 movement_type='return',
                 quantity=item.quantity,
@@ -806,6 +1122,8 @@ class Invoice(models.Model):
                 notes=f"Retour automatique ({'Gros' if item.is_wholesale else 'Détail'}) suite à annulation facture {self.invoice_number}",
                 user=self.created_by
             )
+            for item in items
+        ])
         
         # Marquer comme non déduit
         self.stock_deducted = False
@@ -846,6 +1164,11 @@ class InvoiceItem(models.Model):
         return Decimal(str(total)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
     def save(self, *args, **kwargs):
+        self.compute_amounts()
+        super().save(*args, **kwargs)
+
+    def compute_amounts(self):
+        """Calcule total, prix d'achat figé et marge (aussi utilisé avant un bulk_create)"""
         self.total = self.get_total()
         
         # Fixer le prix d'achat au moment de la vente pour l'historique
@@ -860,8 +1183,6 @@ class InvoiceItem(models.Model):
         from decimal import Decimal
         cost = Decimal(str(self.quantity)) * Decimal(str(self.purchase_price))
         self.margin = self.total - cost
-        
-        super().save(*args, **kwargs)
 
 
 class Receipt(models.Model):
@@ -897,6 +1218,10 @@ class Receipt(models.Model):
         verbose_name = "Bon de réception"
         verbose_name_plural = "Bons de réception"
         ordering = ['-date_received']
+        indexes = [
+            # Achats journaliers par point de vente (rapports)
+            models.Index(fields=['status', 'point_of_sale', 'date_received']),
+        ]
 
     def __str__(self):
         return f"Bon {self.receipt_number} - {self.supplier.name}"
@@ -911,16 +1236,14 @@ class Receipt(models.Model):
         self.save()
 
     def generate_receipt_number(self):
-        """Génère un numéro de bon unique"""
+        """Génère un numéro de bon unique (séquence annuelle, voir DocumentSequence)"""
         from datetime import datetime
         year = datetime.now().year
-        last_receipt = Receipt.objects.filter(receipt_number__startswith=f'REC-{year}').order_by('-receipt_number').first()
-        if last_receipt:
-            last_num = int(last_receipt.receipt_number.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        return f'REC-{year}-{new_num:05d}'
+        prefix = f'REC-{year}-'
+        new_num = DocumentSequence.next_value(
+            'receipt', year, seed=lambda: last_document_number(Receipt.objects, 'receipt_number', prefix)
+        )
+        return f'{prefix}{new_num:05d}'
     
     def distribute_delivery_costs(self):
         """
@@ -981,10 +1304,11 @@ class Receipt(models.Model):
         # Note: Idéalement on devrait le faire une seule fois.
         self.distribute_delivery_costs()
 
-        # Créer un mouvement de stock pour chaque item du bon
-        items = self.receiptitem_set.all()
-        for item in items:
-            StockMovement.objects.create(
+        # Créer les mouvements d'entrée de tous les items en un seul lot
+        from .services.stock_service import StockService
+        items = self.receiptitem_set.select_related('product')
+        StockService().apply_movements([
+            StockMovement(
                 product=item.product,
                 movement_type='entry',
                 quantity=item.quantity,
@@ -994,6 +1318,8 @@ class Receipt(models.Model):
                 notes=f"Entrée automatique ({'Gros' if item.is_wholesale else 'Détail'}) pour bon de réception {self.receipt_number}",
                 user=self.created_by
             )
+            for item in items
+        ])
         
         # Marquer comme ajouté
         self.stock_added = True
@@ -1011,9 +1337,10 @@ class Receipt(models.Model):
         
         # Créer un mouvement de correction (sortie/ajustement) pour chaque item
         # On utilise 'adjustment' ou 'exit' pour retirer le stock ajouté par erreur
-        items = self.receiptitem_set.all()
-        for item in items:
-            StockMovement.objects.create(
+        from .services.stock_service import StockService
+        items = self.receiptitem_set.select_related('product')
+        StockService().apply_movements([
+            StockMovement(
                 product=item.product,
                 movement_type='exit',
                 quantity=item.quantity,
@@ -1023,6 +1350,8 @@ class Receipt(models.Model):
                 notes=f"Correction automatique ({'Gros' if item.is_wholesale else 'Détail'}) suite à annulation bon {self.receipt_number}",
                 user=self.created_by
             )
+            for item in items
+        ])
         
         # Marquer comme non ajouté
         self.stock_added = False
@@ -1165,9 +1494,37 @@ class Settings(models.Model):
         verbose_name = "Paramètres"
         verbose_name_plural = "Paramètres"
 
+    # Clé du singleton dans le cache (vidée par les signaux post_save / post_delete)
+    CACHE_KEY = 'inventory:settings'
+    # Le cache est propre à chaque processus : l'invalidation par signal ne
+    # touche que le worker qui enregistre, les autres relisent au bout de ce délai
+    CACHE_TIMEOUT = 60
+    # Marqueur pour mémoriser l'absence de paramètres sans requête
+    _MISSING = 'missing'
+
     def __str__(self):
         return "Paramètres de l'application"
 
+    @classmethod
+    def get_current(cls):
+        """
+        Retourne le singleton des paramètres depuis le cache (None s'il n'existe pas).
+
+        Remplace Settings.objects.first() : au plus une requête par
+        CACHE_TIMEOUT secondes et par processus.
+        """
+        from django.core.cache import cache
+        cached = cache.get(cls.CACHE_KEY)
+        if cached is None:
+            cached = cls.objects.order_by('pk').first() or cls._MISSING
+            cache.set(cls.CACHE_KEY, cached, cls.CACHE_TIMEOUT)
+        return None if cached == cls._MISSING else cached
+
+    @classmethod
+    def clear_cache(cls):
+        from django.core.cache import cache
+        cache.delete(cls.CACHE_KEY)
+
     def save(self, *args, **kwargs):
         if not self.pk and Settings.objects.exists():
             # If you want to ensure only one instance, you can do it here
@@ -1228,16 +1585,14 @@ class Quote(models.Model):
         self.save()
 
     def generate_quote_number(self):
-        """Génère un numéro de devis unique"""
+        """Génère un numéro de devis unique (séquence annuelle, voir DocumentSequence)"""
         from datetime import datetime
         year = datetime.now().year
-        last_quote = Quote.objects.filter(quote_number__startswith=f'QUO-{year}').order_by('-quote_number').first()
-        if last_quote:
-            last_num = int(last_quote.quote_number.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        return f'QUO-{year}-{new_num:05d}'
+        prefix = f'QUO-{year}-'
+        new_num = DocumentSequence.next_value(
+            'quote', year, seed=lambda: last_document_number(Quote.objects, 'quote_number', prefix)
+        )
+        return f'{prefix}{new_num:05d}'
 
     def convert_to_invoice(self):
         """Convertit le devis en facture"""
@@ -1365,6 +1720,11 @@ class MonthlyProfitReport(models.Model):
     gross_profit = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Bénéfice Brut")
     net_interest = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Intérêt Net")
     
+    # Positionné par les écritures qui contournent la mise à jour incrémentale
+    # (chargement de fixtures, mises à jour en masse) : le rapport sera
+    # reconstruit à la prochaine lecture.
+    is_stale = models.BooleanField(default=False, verbose_name="À recalculer")
+    
     generated_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -1387,3 +1747,224 @@ class MonthlyProfitReport(models.Model):
         # We don't save here to avoid recursion if called from save
 
 
+
+
+class ProfitReportEntry(models.Model):
+    """
+    Contribution d'une facture à un rapport de profit mensuel.
+    
+    Conserve ce que la facture a déjà apporté au rapport, afin que chaque
+    modification de la facture ne réapplique que la différence (delta)
+    au lieu de recalculer tout le mois.
+    """
+    invoice = models.OneToOneField(Invoice, on_delete=models.CASCADE, related_name='profit_report_entry', verbose_name="Facture")
+    report = models.ForeignKey(MonthlyProfitReport, on_delete=models.CASCADE, related_name='entries', verbose_name="Rapport")
+    total_sales_brut = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Ventes Brutes")
+    total_discounts = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Remises")
+    total_cost_of_goods = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Coût d'Achat (COGS)")
+    gross_profit = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Bénéfice")
+    # Lignes de la facture modifiées depuis le dernier calcul de la contribution
+    is_stale = models.BooleanField(default=False, verbose_name="À recalculer")
+
+    class Meta:
+        verbose_name = "Contribution au rapport de profit"
+        verbose_name_plural = "Contributions aux rapports de profit"
+
+    def __str__(self):
+        return f"Facture #{self.invoice_id} - {self.report}"
+
+
+class ReportJob(models.Model):
+    """
+    Génération d'un rapport PDF en arrière-plan.
+
+    La vue enregistre la demande (type de rapport et filtres) ; la commande
+    process_report_jobs produit le fichier sous PRIVATE_MEDIA_ROOT/reports/,
+    avec un nom aléatoire. Ce dossier ne doit pas être servi par MEDIA_URL :
+    le PDF n'est téléchargé que par report_job_download, qui vérifie le demandeur.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminé'),
+        ('failed', 'Échec'),
+    ]
+
+    report_type = models.CharField(max_length=50, verbose_name="Type de rapport")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Filtres")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="Statut")
+    file = models.FileField(
+        upload_to=report_upload_to, storage=private_storage, blank=True, verbose_name="Fichier"
+    )
+    filename = models.CharField(max_length=255, blank=True, verbose_name="Nom du fichier")
+    error = models.TextField(blank=True, verbose_name="Erreur")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs', verbose_name="Demandé par")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de demande")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Début")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+
+    class Meta:
+        verbose_name = "Rapport PDF en arrière-plan"
+        verbose_name_plural = "Rapports PDF en arrière-plan"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+class ImportJob(models.Model):
+    """
+    Importation d'un fichier Excel de produits en arrière-plan.
+
+    La vue enregistre le fichier ; la commande process_import_jobs l'importe
+    par lots validés un à un. La progression (dernière ligne validée,
+    compteurs, erreurs) est enregistrée dans la transaction de chaque lot :
+    une importation interrompue reprend après le dernier lot validé.
+    """
+    STATUS_CHOICES = ReportJob.STATUS_CHOICES
+
+    # Messages conservés (le nombre total reste dans error_count)
+    MAX_STORED_ERRORS = 500
+
+    source_file = models.FileField(upload_to=import_upload_to, storage=private_storage, verbose_name="Fichier")
+    original_name = models.CharField(max_length=255, blank=True, verbose_name="Nom du fichier")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="Statut")
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name="Lignes (estimation)")
+    rows_done = models.PositiveIntegerField(default=0, verbose_name="Lignes traitées")
+    created_count = models.PositiveIntegerField(default=0, verbose_name="Produits créés")
+    updated_count = models.PositiveIntegerField(default=0, verbose_name="Produits mis à jour")
+    error_count = models.PositiveIntegerField(default=0, verbose_name="Erreurs")
+    errors = models.JSONField(default=list, blank=True, verbose_name="Messages")
+    last_line = models.PositiveIntegerField(default=0, verbose_name="Dernière ligne validée")
+    error = models.TextField(blank=True, verbose_name="Erreur")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    # Jeton du worker propriétaire (renouvelé à chaque prise en charge)
+    worker_token = models.CharField(max_length=32, blank=True, verbose_name="Jeton du worker")
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs', verbose_name="Demandé par")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de demande")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Début")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière progression")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+
+    class Meta:
+        verbose_name = "Importation de produits"
+        verbose_name_plural = "Importations de produits"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.original_name} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    @property
+    def progress_percent(self):
+        """Avancement estimé (le nombre de lignes du fichier est approximatif)"""
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.rows_done * 100 / self.total_rows))
+
+
+class StockAlert(models.Model):
+    """
+    Alerte de stock faible en attente d'envoi (boîte d'envoi).
+
+    Les alertes sont détectées après le commit des mouvements, par couple
+    (produit, point de vente), puis envoyées en un seul email récapitulatif
+    par la commande send_stock_alerts : une vente n'attend jamais le serveur
+    SMTP. Au plus une alerte en attente par couple.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('sending', 'En cours d\'envoi'),
+        ('sent', 'Envoyée'),
+        ('resolved', 'Stock rétabli avant envoi'),
+        ('failed', 'Échec'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_alerts', verbose_name="Produit")
+    point_of_sale = models.ForeignKey(PointOfSale, on_delete=models.CASCADE, related_name='stock_alerts', verbose_name="Point de vente")
+    quantity = models.IntegerField(verbose_name="Stock détecté")
+    reorder_level = models.IntegerField(verbose_name="Seuil de réapprovisionnement")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="Statut")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    error = models.TextField(blank=True, verbose_name="Erreur")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de détection")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Date d'envoi")
+
+    class Meta:
+        verbose_name = "Alerte de stock faible"
+        verbose_name_plural = "Alertes de stock faible"
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'point_of_sale'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_stock_alert',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'point_of_sale', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.product} @ {self.point_of_sale} ({self.get_status_display()})"
+
+
+class DailySalesFact(models.Model):
+    """
+    Ventes payées agrégées par (jour, point de vente, produit, gros/détail).
+
+    Tenue à jour après le commit de chaque écriture sur une facture ou ses
+    lignes (le couple jour / point de vente concerné est recalculé) et
+    reconstruite par la commande rebuild_sales_facts. Les rapports sur une
+    période lisent des jours au lieu des lignes de facture.
+    """
+    date = models.DateField(verbose_name="Jour")
+    point_of_sale = models.ForeignKey(
+        PointOfSale, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='daily_sales', verbose_name="Point de vente"
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales', verbose_name="Produit")
+    is_wholesale = models.BooleanField(default=False, verbose_name="En gros lot")
+    quantity = models.IntegerField(default=0, verbose_name="Quantité vendue")
+    gross = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Ventes brutes (avant remises)")
+    discount = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Remises de ligne")
+    cost_of_goods = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Coût d'achat (COGS)")
+    margin = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Marge")
+
+    class Meta:
+        verbose_name = "Ventes journalières"
+        verbose_name_plural = "Ventes journalières"
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'point_of_sale', 'product', 'is_wholesale'],
+                name='unique_daily_sales_fact',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.product} ({self.quantity})"
+
+    @property
+    def net_sales(self):
+        """Ventes après remises de ligne (somme des totaux de ligne)"""
+        return self.gross - self.discount
@@ -0,0 +1,435 @@
+"""
+Rapports PDF générés en arrière-plan.
+
+Chaque rapport est enregistré avec register_pdf_report() : une fonction qui
+construit le contexte du template à partir des filtres de la requête
+(request.GET) et de l'utilisateur qui a fait la demande. Les vues
+export_*_pdf ne font qu'enregistrer un ReportJob ; la commande
+process_report_jobs rend le template et produit le PDF hors requête, ce qui
+permet d'exporter toutes les lignes (plus de limite [:100] / [:500]).
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum, Count
+from django.utils import timezone
+
+from .models import (
+    Product, Inventory, StockMovement, Invoice, InvoiceItem, Receipt, Settings
+)
+from .permissions import filter_queryset_by_pos
+from .services.invoice_service import InvoiceService
+
+
+PDF_REPORTS = {}
+
+
+class PdfReport:
+    """Définition d'un rapport : template, préfixe du fichier et constructeur de contexte"""
+
+    def __init__(self, report_type, template, filename_prefix, build_context):
+        self.report_type = report_type
+        self.template = template
+        self.filename_prefix = filename_prefix
+        self.build_context = build_context
+
+    def filename(self):
+        return f"{self.filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf"
+
+
+def register_pdf_report(report_type, template, filename_prefix):
+    """Décorateur : enregistre un constructeur de contexte (params, user) -> dict"""
+    def decorator(build_context):
+        PDF_REPORTS[report_type] = PdfReport(report_type, template, filename_prefix, build_context)
+        return build_context
+    return decorator
+
+
+def get_pdf_report(report_type):
+    return PDF_REPORTS.get(report_type)
+
+
+def _date_range(params):
+    """start_date / end_date, remplacés par date si une date précise est demandée"""
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    specific_date = params.get('date')
+    if specific_date:
+        start_date = specific_date
+        end_date = specific_date
+    if start_date in ['', 'None']:
+        start_date = None
+    if end_date in ['', 'None']:
+        end_date = None
+    return start_date, end_date
+
+
+@register_pdf_report('inventory', 'inventory/reports_pdf/inventory_list_pdf.html', 'Inventaire')
+def inventory_context(params, user):
+    query = params.get('q', '')
+    status_filter = params.get('status', '')
+    category_id = params.get('category', '')
+    pos_id = params.get('pos', '')
+
+    inventories = Inventory.objects.select_related('product', 'product__category', 'point_of_sale').all()
+    inventories = filter_queryset_by_pos(inventories, user, 'point_of_sale')
+
+    if query:
+        inventories = inventories.filter(
+            Q(product__name__icontains=query) |
+            Q(product__sku__icontains=query) |
+            Q(location__icontains=query) |
+            Q(product__description__icontains=query) |
+            Q(product__category__name__icontains=query)
+        )
+    if status_filter:
+        if status_filter == 'low_stock':
+            inventories = inventories.filter(quantity__lte=F('reorder_level'), quantity__gt=0)
+        elif status_filter == 'out_of_stock':
+            inventories = inventories.filter(quantity=0)
+        elif status_filter == 'in_stock':
+            inventories = inventories.filter(quantity__gt=F('reorder_level'))
+    if category_id:
+        inventories = inventories.filter(product__category_id=category_id)
+    if pos_id:
+        inventories = inventories.filter(point_of_sale_id=pos_id)
+
+    return {
+        'report_title': "Rapport d'Inventaire",
+        'inventories': inventories,
+        'company_settings': Settings.get_current(),
+        'generated_at': timezone.now(),
+    }
+
+
+@register_pdf_report('reports', 'inventory/reports_pdf.html', 'Rapport_Stock')
+def reports_context(params, user):
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    if start_date in [None, '', 'None']:
+        start_date = None
+    if end_date in [None, '', 'None']:
+        end_date = None
+
+    # Format dates for display
+    formatted_start_date = start_date if start_date else "Début"
+    formatted_end_date = end_date if end_date else "Fin"
+
+    invoices_qs = Invoice.objects.select_related('client').all()
+    inventories_qs = Inventory.objects.select_related('product', 'product__category').all()
+
+    if start_date:
+        invoices_qs = invoices_qs.filter(date_issued__gte=start_date)
+    if end_date:
+        invoices_qs = invoices_qs.filter(date_issued__lte=end_date)
+
+    # Synthèse : aperçu de l'inventaire et des dernières factures
+    inventories_data = []
+    for inventory in inventories_qs[:50]:
+        unit_price = float(inventory.product.selling_price)
+        quantity = int(inventory.quantity)
+        total_value = unit_price * quantity
+
+        inventories_data.append({
+            'product_name': str(inventory.product.name),
+            'category_name': str(inventory.product.category.name) if inventory.product.category else '',
+            'quantity': quantity,
+            'unit_price': f"{unit_price:.2f}".replace('.', ','),
+            'total_value': f"{total_value:.2f}".replace('.', ','),
+        })
+
+    invoices_data = []
+    status_map = {
+        'paid': 'Payée',
+        'sent': 'Envoyée',
+        'cancelled': 'Annulée',
+        'draft': 'Brouillon',
+        'partial': 'Partielle'
+    }
+
+    for invoice in invoices_qs[:20]:
+        invoice_date = invoice.date_issued.strftime('%d/%m/%Y') if invoice.date_issued else ''
+        total_amount = float(invoice.total_amount)
+
+        invoices_data.append({
+            'invoice_date': invoice_date,
+            'invoice_number': str(invoice.invoice_number),
+            'client_name': str(invoice.client.name),
+            'total_amount': f"{total_amount:.2f}".replace('.', ','),
+            'status_display': status_map.get(invoice.status, invoice.status),
+        })
+
+    total_stock_value = float(Product.objects.aggregate(
+        total=Sum(F('selling_price') * F('inventory__quantity'))
+    )['total'] or Decimal('0.00'))
+
+    total_products = Product.objects.count()
+
+    invoice_stats = InvoiceService.get_statistics(invoices_qs)
+    total_sales = float(invoice_stats['paid']['total'])
+    pending_sales_amount = float(invoice_stats['sent']['total'])
+
+    return {
+        'start_date': formatted_start_date,
+        'end_date': formatted_end_date,
+        'generated_at': datetime.now().strftime('%d/%m/%Y %H:%M'),
+        'invoices': invoices_data,
+        'inventories': inventories_data,
+        'total_stock_value': f"{total_stock_value:.2f}".replace('.', ','),
+        'total_products': total_products,
+        'total_sales': f"{total_sales:.2f}".replace('.', ','),
+        'pending_sales_amount': f"{pending_sales_amount:.2f}".replace('.', ','),
+    }
+
+
+@register_pdf_report('sales_activities', 'inventory/reports_pdf/sales_activities_pdf.html', 'Activites_Ventes')
+def sales_activities_context(params, user):
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    sales_activities = InvoiceItem.objects.select_related('invoice', 'invoice__client', 'product').all()
+    if start_date:
+        sales_activities = sales_activities.filter(invoice__date_issued__gte=start_date)
+    if end_date:
+        sales_activities = sales_activities.filter(invoice__date_issued__lte=end_date)
+    sales_activities = sales_activities.order_by('-invoice__date_issued')
+
+    return {
+        'report_title': 'Activités Récentes des Ventes',
+        'sales_activities': sales_activities,
+        'start_date': start_date,
+        'end_date': end_date,
+        'company_settings': Settings.get_current(),
+        'generated_at': timezone.now(),
+    }
+
+
+@register_pdf_report('invoice_status', 'inventory/reports_pdf/invoice_status_pdf.html', 'Etat_Factures')
+def invoice_status_context(params, user):
+    start_date, end_date = _date_range(params)
+    query = params.get('q', '') or params.get('search', '')
+    status_filter = params.get('status', '')
+
+    invoices_qs = Invoice.objects.select_related('client').all()
+
+    # Filtrage par point de vente (Sécurité)
+    invoices_qs = filter_queryset_by_pos(invoices_qs, user, 'point_of_sale')
+
+    if query:
+        invoices_qs = invoices_qs.filter(
+            Q(invoice_number__icontains=query) |
+            Q(client__name__icontains=query)
+        )
+    if status_filter:
+        invoices_qs = invoices_qs.filter(status=status_filter)
+    if start_date:
+        invoices_qs = invoices_qs.filter(date_issued__gte=start_date)
+    if end_date:
+        invoices_qs = invoices_qs.filter(date_issued__lte=end_date)
+    invoices_qs = invoices_qs.order_by('-date_issued')
+
+    status_map = {
+        'paid': 'Payée',
+        'sent': 'Envoyée',
+        'cancelled': 'Annulée',
+        'draft': 'Brouillon',
+        'partial': 'Partielle'
+    }
+
+    invoices_data = []
+    total_amount_sum = 0
+    total_remaining_sum = 0
+
+    for invoice in invoices_qs:
+        total_amount = float(invoice.total_amount)
+        remaining = float(invoice.get_remaining_amount())
+
+        total_amount_sum += total_amount
+        total_remaining_sum += remaining
+
+        invoices_data.append({
+            'invoice_number': invoice.invoice_number,
+            'client_name': invoice.client.name,
+            'date_issued': invoice.date_issued,
+            'date_due': invoice.date_due,
+            'status_display': status_map.get(invoice.status, invoice.status),
+            'status': invoice.status,
+            'total_amount': total_amount,
+            'remaining_amount': remaining,
+        })
+
+    return {
+        'report_title': 'État des Factures',
+        'invoices': invoices_data,
+        'start_date': start_date,
+        'end_date': end_date,
+        'company_settings': Settings.get_current(),
+        'generated_at': datetime.now(),
+        'total_amount_sum': total_amount_sum,
+        'total_remaining_sum': total_remaining_sum,
+    }
+
+
+@register_pdf_report('stock_distribution', 'inventory/reports_pdf/stock_distribution_pdf.html', 'Repartition_Stock')
+def stock_distribution_context(params, user):
+    stock_by_pos = Inventory.objects.values(
+        'point_of_sale__name', 'point_of_sale__code'
+    ).annotate(
+        total_products=Count('product', distinct=True),
+        total_quantity=Sum('quantity'),
+        total_value=Sum(F('quantity') * F('product__purchase_price'))
+    ).order_by('point_of_sale__name')
+
+    company_settings = Settings.get_current()
+    # Pré-calculer/formatter les valeurs pour un rendu PDF fiable
+    stock_by_pos_list = []
+    for item in stock_by_pos:
+        total_products = item.get('total_products') or 0
+        total_quantity = item.get('total_quantity') or 0
+        total_value = float(item.get('total_value') or 0)
+        stock_by_pos_list.append({
+            'point_of_sale_name': item.get('point_of_sale__name') or '',
+            'point_of_sale_code': item.get('point_of_sale__code') or '',
+            'total_products': int(total_products),
+            'total_quantity': int(total_quantity),
+            'total_value': f"{total_value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.') + f" {getattr(company_settings, 'currency', 'GNF')}",
+        })
+
+    return {
+        'report_title': 'Répartition du Stock par Magasin',
+        'stock_by_pos': stock_by_pos_list,
+        'company_settings': company_settings,
+        'generated_at': timezone.now(),
+    }
+
+
+@register_pdf_report('low_stock', 'inventory/reports_pdf/low_stock_pdf.html', 'Stock_Faible')
+def low_stock_context(params, user):
+    low_stock = Inventory.objects.select_related('product', 'point_of_sale').filter(
+        quantity__lte=F('reorder_level')
+    ).order_by('quantity')
+
+    return {
+        'report_title': 'Produits en Stock Faible',
+        'low_stock_products': low_stock,
+        'company_settings': Settings.get_current(),
+        'generated_at': timezone.now(),
+    }
+
+
+@register_pdf_report('stock_movements', 'inventory/reports_pdf/movement_list_pdf.html', 'Mouvements_Stock')
+def stock_movements_context(params, user):
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    search_query = params.get('search', '')
+    movement_type = params.get('type', '')
+    user_id = params.get('user')
+    product_id = params.get('product')
+
+    movements = StockMovement.objects.select_related('product', 'from_point_of_sale', 'user').all()
+    movements = filter_queryset_by_pos(movements, user, 'from_point_of_sale')
+
+    if search_query:
+        movements = movements.filter(
+            Q(product__name__icontains=search_query) |
+            Q(product__sku__icontains=search_query) |
+            Q(reference__icontains=search_query) |
+            Q(notes__icontains=search_query)
+        ).distinct()
+
+    if movement_type:
+        movements = movements.filter(movement_type=movement_type)
+    if user_id:
+        movements = movements.filter(user_id=user_id)
+    if product_id:
+        movements = movements.filter(product_id=product_id)
+
+    if start_date:
+        try:
+            movements = movements.filter(created_at__gte=datetime.strptime(start_date, '%Y-%m-%d'))
+        except ValueError:
+            pass
+    if end_date:
+        try:
+            movements = movements.filter(created_at__lte=datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1))
+        except ValueError:
+            pass
+
+    return {
+        'movements': movements.order_by('-created_at'),
+        'company_settings': Settings.get_current(),
+        'report_title': "Mouvements de Stock",
+        'generated_at': timezone.now()
+    }
+
+
+@register_pdf_report('returned_products', 'inventory/reports_pdf/returned_products_pdf.html', 'Produits_Retournes')
+def returned_products_context(params, user):
+    start_date, end_date = _date_range(params)
+
+    returned = StockMovement.objects.select_related('product', 'from_point_of_sale', 'user').filter(
+        movement_type='return'
+    )
+    if start_date:
+        returned = returned.filter(created_at__date__gte=start_date)
+    if end_date:
+        returned = returned.filter(created_at__date__lte=end_date)
+
+    return {
+        'report_title': 'Produits Retournés',
+        'returned_products': returned.order_by('-created_at'),
+        'start_date': start_date,
+        'end_date': end_date,
+        'company_settings': Settings.get_current(),
+        'generated_at': timezone.now(),
+    }
+
+
+@register_pdf_report('products', 'inventory/reports_pdf/products_list_pdf.html', 'Liste_Produits')
+def products_context(params, user):
+    products = Product.objects.annotate(
+        total_stock=F('stock_summary__total_quantity')
+    ).select_related('category').order_by('name')
+
+    return {
+        'report_title': 'Liste des Produits',
+        'products': products,
+        'company_settings': Settings.get_current(),
+        'generated_at': timezone.now(),
+    }
+
+
+@register_pdf_report('receipts', 'inventory/reports_pdf/receipt_list_pdf.html', 'Liste_Receptions')
+def receipts_context(params, user):
+    query = params.get('q', '')
+    status_filter = params.get('status', '')
+    start_date, end_date = _date_range(params)
+
+    receipts = Receipt.objects.select_related('supplier', 'created_by').all().order_by('-date_received', '-created_at')
+
+    if query:
+        receipts = receipts.filter(
+            Q(receipt_number__icontains=query) |
+            Q(supplier__name__icontains=query) |
+            Q(supplier_reference__icontains=query)
+        )
+    if status_filter:
+        receipts = receipts.filter(status=status_filter)
+    if start_date:
+        receipts = receipts.filter(date_received__gte=start_date)
+    if end_date:
+        receipts = receipts.filter(date_received__lte=end_date)
+
+    return {
+        'receipts': receipts,
+        'company_settings': Settings.get_current(),
+        'generated_at': datetime.now(),
+        'report_title': 'Liste des Bons de Réception',
+        'query': query,
+        'status_filter': status_filter,
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_amount_sum': receipts.aggregate(Sum('total_amount'))['total_amount__sum'] or 0,
+    }
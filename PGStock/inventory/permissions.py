@@ -13,6 +13,94 @@ from django.contrib import messages
 from django.db.models import Q
 
 
+# ==================== RÉSOLUTION DU RÔLE (MÉMORISÉE PAR REQUÊTE) ====================
+
+ADMIN_GROUPS = ('Admin',)
+SUPERUSER_GROUPS = ('SUPERUSER',)
+STAFF_GROUPS = ('STAFF', 'Staff')
+
+
+class UserPermissions:
+    """
+    Rôle et point de vente résolus pour un utilisateur.
+
+    Calculé une seule fois par requête (mémorisé sur l'objet user), afin
+    que les décorateurs, template tags et filtres ne relancent pas de
+    requête sur les groupes. Pas de cache entre requêtes : un rôle retiré
+    doit prendre effet immédiatement sur tous les workers.
+    """
+
+    def __init__(self, role=None, point_of_sale_id=None):
+        self.role = role
+        self.point_of_sale_id = point_of_sale_id
+        self._point_of_sale = None
+
+    @property
+    def is_admin(self):
+        return self.role == 'ADMIN'
+
+    @property
+    def is_superuser_or_admin(self):
+        return self.role in ['ADMIN', 'SUPERUSER']
+
+    @property
+    def is_staff_or_above(self):
+        return self.role in ['ADMIN', 'SUPERUSER', 'STAFF']
+
+    @property
+    def can_view_finances(self):
+        return self.role in ['ADMIN', 'SUPERUSER']
+
+    @property
+    def point_of_sale(self):
+        """Point de vente assigné (chargé au premier accès seulement)"""
+        if self.point_of_sale_id and self._point_of_sale is None:
+            from .models import PointOfSale
+            self._point_of_sale = PointOfSale.objects.filter(pk=self.point_of_sale_id).first()
+        return self._point_of_sale
+
+
+def _resolve_user_permissions(user):
+    """Calcule le rôle et le POS de l'utilisateur (une requête pour les groupes, une pour le profil)"""
+    group_names = set(user.groups.values_list('name', flat=True))
+
+    if user.is_superuser or group_names & set(ADMIN_GROUPS):
+        role = 'ADMIN'
+    elif group_names & set(SUPERUSER_GROUPS):
+        role = 'SUPERUSER'
+    elif user.is_staff or group_names & set(STAFF_GROUPS):
+        role = 'STAFF'
+    else:
+        role = None
+
+    from .models import UserProfile
+    point_of_sale_id = (
+        UserProfile.objects.filter(user_id=user.pk).values_list('point_of_sale_id', flat=True).first()
+    )
+    return UserPermissions(role=role, point_of_sale_id=point_of_sale_id)
+
+
+def get_user_permissions(user):
+    """
+    Retourne les permissions résolues de l'utilisateur.
+
+    Mémorisées sur l'objet user : la base n'est lue qu'une fois par requête.
+
+    Returns:
+        UserPermissions
+    """
+    if not user.is_authenticated:
+        return UserPermissions()
+
+    permissions = getattr(user, '_inventory_permissions', None)
+    if permissions is not None:
+        return permissions
+
+    permissions = _resolve_user_permissions(user)
+    user._inventory_permissions = permissions
+    return permissions
+
+
 # ==================== FONCTIONS DE VÉRIFICATION DE RÔLE ====================
 
 def is_admin(user):
@@ -20,9 +108,7 @@ def is_admin(user):
     Vérifie si l'utilisateur est un administrateur.
     ADMIN = is_superuser=True OU membre du groupe 'Admin'
     """
-    if not user.is_authenticated:
-        return False
-    return user.is_superuser or user.groups.filter(name='Admin').exists()
+    return get_user_permissions(user).is_admin
 
 
 def is_superuser_or_admin(user):
@@ -31,9 +117,7 @@ def is_superuser_or_admin(user):
     SUPERUSER = membre du groupe 'SUPERUSER'
     ADMIN = is_superuser=True ou membre du groupe 'Admin'
     """
-    if not user.is_authenticated:
-        return False
-    return user.is_superuser or user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists()
+    return get_user_permissions(user).is_superuser_or_admin
 
 
 def is_staff_or_above(user):
@@ -41,13 +125,7 @@ def is_staff_or_above(user):
     Vérifie si l'utilisateur est STAFF, SUPERUSER ou ADMIN.
     STAFF = membre du groupe 'STAFF' ou 'Staff' ou is_staff=True
     """
-    if not user.is_authenticated:
-        return False
-    return (
-        user.is_superuser or 
-        user.is_staff or
-        user.groups.filter(name__in=['SUPERUSER', 'STAFF', 'Staff', 'Admin']).exists()
-    )
+    return get_user_permissions(user).is_staff_or_above
 
 
 def get_user_role(user):
@@ -57,19 +135,7 @@ def get_user_role(user):
     Returns:
         str: 'ADMIN', 'SUPERUSER', 'STAFF', ou None
     """
-    if not user.is_authenticated:
-        return None
-    
-    if user.is_superuser or user.groups.filter(name='Admin').exists():
-        return 'ADMIN'
-    
-    if user.groups.filter(name='SUPERUSER').exists():
-        return 'SUPERUSER'
-    
-    if user.is_staff or user.groups.filter(name__in=['STAFF', 'Staff']).exists():
-        return 'STAFF'
-    
-    return None
+    return get_user_permissions(user).role
 
 
 def get_user_pos(user):
@@ -79,13 +145,7 @@ def get_user_pos(user):
     Returns:
         PointOfSale ou None
     """
-    if not user.is_authenticated:
-        return None
-    
-    if hasattr(user, 'profile') and user.profile.point_of_sale:
-        return user.profile.point_of_sale
-    
-    return None
+    return get_user_permissions(user).point_of_sale
 
 
 # ==================== DÉCORATEURS DE PERMISSIONS ====================
@@ -235,10 +295,10 @@ def filter_queryset_by_pos(queryset, user, pos_field='point_of_sale'):
     
     # STAFF ne voit que son point de vente
     if role == 'STAFF':
-        user_pos = get_user_pos(user)
-        if user_pos:
-            # Construire le filtre dynamiquement
-            filter_kwargs = {pos_field: user_pos}
+        user_pos_id = get_user_permissions(user).point_of_sale_id
+        if user_pos_id:
+            # Construire le filtre dynamiquement (par id, sans charger le POS)
+            filter_kwargs = {f'{pos_field}_id': user_pos_id}
             return queryset.filter(**filter_kwargs)
         else:
             # Si pas de POS assigné, ne rien montrer
@@ -278,8 +338,8 @@ def can_modify_object(user, obj, check_pos=True):
     if role == 'STAFF':
         # Vérifier le point de vente si demandé
         if check_pos and hasattr(obj, 'point_of_sale'):
-            user_pos = get_user_pos(user)
-            if user_pos and obj.point_of_sale == user_pos:
+            user_pos_id = get_user_permissions(user).point_of_sale_id
+            if user_pos_id and getattr(obj, 'point_of_sale_id', None) == user_pos_id:
                 # Peut modifier certains objets de son POS
                 from .models import Invoice, Payment, Client
                 if isinstance(obj, (Invoice, Payment, Client)):
@@ -396,14 +456,15 @@ def get_user_permissions_context(user):
     Returns:
         dict: Contexte avec les permissions
     """
-    role = get_user_role(user)
+    permissions = get_user_permissions(user)
+    role = permissions.role
     
     return {
         'user_role': role,
         'is_admin': role == 'ADMIN',
         'is_superuser': role in ['ADMIN', 'SUPERUSER'],
         'is_staff': role in ['ADMIN', 'SUPERUSER', 'STAFF'],
-        'user_pos': get_user_pos(user),
+        'user_pos': permissions.point_of_sale,
         'can_manage_users': role == 'ADMIN',
         'can_delete_products': role == 'ADMIN',
         'can_modify_settings': role == 'ADMIN',
@@ -425,5 +486,4 @@ def can_view_finances(user):
     Returns:
         bool
     """
-    role = get_user_role(user)
-    return role in ['ADMIN', 'SUPERUSER']
+    return get_user_permissions(user).can_view_finances
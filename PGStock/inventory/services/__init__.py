@@ -9,17 +9,35 @@ Services encapsulate complex business operations and ensure:
 - Separation of concerns (Thin Views, Fat Services)
 """
 
+from .stock_ledger import StockLedger
 from .stock_service import StockService
 from .invoice_service import InvoiceService
 from .receipt_service import ReceiptService
 from .payment_service import PaymentService
 from .finance_service import FinanceService
+from .report_job_service import ReportJobService
+from .dashboard_service import DashboardService
+from .catalogue_service import CatalogueService
+from .checkout_service import CheckoutService
+from .product_import_service import ProductImportService
+from .import_job_service import ImportJobService
+from .stock_alert_service import StockAlertService
+from .sales_fact_service import SalesFactService
 
 __all__ = [
+    'StockLedger',
     'StockService',
     'InvoiceService',
     'ReceiptService',
     'PaymentService',
     'FinanceService',
+    'ReportJobService',
+    'DashboardService',
+    'CatalogueService',
+    'CheckoutService',
+    'ProductImportService',
+    'ImportJobService',
+    'StockAlertService',
+    'SalesFactService',
 ]
 
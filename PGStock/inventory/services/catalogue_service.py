@@ -0,0 +1,144 @@
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import DataVersion, Product
+
+
+# Chaque version est gardée sous sa propre clé ; la durée de vie ne fait que
+# libérer les versions périmées (la version courante est lue en base)
+CATALOGUE_CACHE_TIMEOUT = 60 * 60
+
+# Colonnes d'une ligne du catalogue, dans l'ordre
+CATALOGUE_FIELDS = ('id', 'name', 'sku', 'price', 'wholesale_price', 'units_per_box', 'category_id', 'image_url')
+
+
+def _catalogue_key(version):
+    return f'inventory:pos:catalogue:{version}'
+
+
+class ProductCatalogue:
+    """
+    Catalogue compact des produits vendables au POS.
+
+    Une ligne par produit (tuple dans l'ordre de CATALOGUE_FIELDS), indexée
+    par id pour les mises à jour ; le JSON servi au navigateur est encodé une
+    seule fois par version.
+    """
+
+    __slots__ = ('version', 'rows', 'payload')
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = rows
+        self.payload = None
+
+    @property
+    def etag(self):
+        return f'"catalogue-{self.version}"'
+
+    def encode(self):
+        """JSON {version, fields, rows} trié par nom (mis en cache avec l'objet)"""
+        if self.payload is None:
+            rows = sorted(self.rows.values(), key=lambda row: (row[1], row[0]))
+            self.payload = json.dumps(
+                {'version': self.version, 'fields': CATALOGUE_FIELDS, 'rows': rows},
+                separators=(',', ':'), ensure_ascii=False
+            ).encode()
+        return self.payload
+
+
+class CatalogueService:
+    """
+    Catalogue produits du POS, versionné et gardé en cache.
+
+    Le navigateur le télécharge une fois (revalidation par ETag), cherche
+    localement puis ne demande au serveur que le stock des produits affichés.
+
+    La version est partagée en base (DataVersion) et incrémentée après chaque
+    écriture produit : le cache étant local au processus, chaque worker
+    reconstruit son catalogue quand elle change. Celui qui a écrit remplace
+    seulement la ligne concernée.
+    """
+
+    @staticmethod
+    def fetch_rows(product_ids=None):
+        """Lignes du catalogue lues en une requête (tous les produits ou ceux donnés)"""
+        products = Product.objects.order_by()
+        if product_ids is not None:
+            products = products.filter(pk__in=product_ids)
+        image_storage = Product._meta.get_field('image').storage
+        return {
+            pk: (
+                pk, name, sku, float(price), float(wholesale_price), units_per_box, category_id,
+                image_storage.url(image) if image else None,
+            )
+            for pk, name, sku, price, wholesale_price, units_per_box, category_id, image in products.values_list(
+                'pk', 'name', 'sku', 'selling_price', 'wholesale_selling_price', 'units_per_box', 'category_id', 'image'
+            ).iterator(chunk_size=2000)
+        }
+
+    @staticmethod
+    def store(catalogue):
+        catalogue.encode()
+        cache.set(_catalogue_key(catalogue.version), catalogue, CATALOGUE_CACHE_TIMEOUT)
+        return catalogue
+
+    @classmethod
+    def build(cls, version):
+        """Reconstruit le catalogue complet (version lue avant les lignes)"""
+        return cls.store(ProductCatalogue(version, cls.fetch_rows()))
+
+    @staticmethod
+    def get_version():
+        """Version courante (suffit pour répondre 304 sans lire le catalogue)"""
+        return DataVersion.get_value(DataVersion.CATALOGUE)
+
+    @classmethod
+    def get_catalogue(cls, version=None):
+        """
+        Retourne le catalogue courant.
+
+        Args:
+            version: Version déjà lue (évite une seconde lecture de la clé de version)
+
+        Returns:
+            ProductCatalogue
+        """
+        if version is None:
+            version = cls.get_version()
+        catalogue = cache.get(_catalogue_key(version))
+        if catalogue is None:
+            catalogue = cls.build(version)
+        return catalogue
+
+    @classmethod
+    def refresh_products(cls, product_ids):
+        """
+        Incrémente la version après le commit et remplace (ou retire) les
+        lignes des produits donnés dans le catalogue de ce processus.
+
+        Le remplacement n'est fait que si ce catalogue est celui de la
+        version précédente : sinon une autre écriture s'est intercalée et
+        le catalogue sera reconstruit à la prochaine demande.
+        """
+        product_ids = set(product_ids)
+
+        def refresh_catalogue():
+            version = DataVersion.next_value(DataVersion.CATALOGUE)
+            catalogue = cache.get(_catalogue_key(version - 1))
+            if catalogue is None:
+                return
+            rows = dict(catalogue.rows)
+            for pk in product_ids:
+                rows.pop(pk, None)
+            rows.update(cls.fetch_rows(product_ids))
+            cls.store(ProductCatalogue(version, rows))
+
+        transaction.on_commit(refresh_catalogue, robust=True)
+
+    @staticmethod
+    def invalidate():
+        """Périme le catalogue de tous les processus (reconstruit à la prochaine demande)"""
+        DataVersion.bump_on_commit(DataVersion.CATALOGUE)
@@ -0,0 +1,147 @@
+"""
+Checkout Service
+
+Records a quick sale (POS basket) in a constant number of queries:
+- All cart products loaded in one query
+- Line amounts and invoice totals computed in memory
+- Invoice items bulk-created
+- Stock deducted through one StockService.apply_movements batch
+- Monthly profit report updated once, after commit
+"""
+
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .base import BaseService, ServiceException
+from .finance_service import FinanceService
+from .stock_service import StockService
+from ..models import Client, Invoice, InvoiceItem, PointOfSale, Product, StockMovement
+
+
+class CheckoutService(BaseService):
+    """
+    Service for POS checkouts.
+    
+    A checkout creates a paid invoice and deducts its stock in the same
+    transaction. The invoice report sync is deferred to a single
+    post-commit hook so the report row is not locked during the sale.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.stock_service = StockService()
+    
+    def checkout(
+        self,
+        client: Client,
+        point_of_sale: PointOfSale,
+        user: User,
+        lines: List[Dict[str, Any]],
+        invoice_type: str = 'retail',
+        apply_tax: bool = True,
+        discount: Decimal = Decimal('0')
+    ) -> Invoice:
+        """
+        Record a paid sale and deduct its stock.
+        
+        Args:
+            client: Client of the sale
+            point_of_sale: Point of sale the stock leaves from
+            user: Cashier
+            lines: List of dicts with keys: product_id, quantity, is_wholesale
+            invoice_type: 'retail' or 'wholesale'
+            apply_tax: Whether to apply tax
+            discount: Discount amount on the whole invoice
+            
+        Returns:
+            Created Invoice (status 'paid', stock deducted)
+            
+        Raises:
+            ServiceException: If the cart is empty or refers to unknown products
+            ValidationError: If stock is insufficient (nothing is written)
+        """
+        if not lines:
+            raise ServiceException("Le panier est vide.")
+        self.validate_required(point_of_sale, "Point de vente")
+        
+        with FinanceService.deferred_invoice_sync(), transaction.atomic():
+            invoice = self._create_sale(client, point_of_sale, user, lines, invoice_type, apply_tax, discount)
+        
+        self.log_info(
+            f"Quick sale recorded: {invoice.invoice_number}",
+            invoice_id=invoice.id,
+            items=len(lines),
+            total=float(invoice.total_amount)
+        )
+        return invoice
+    
+    def _create_sale(self, client, point_of_sale, user, lines, invoice_type, apply_tax, discount) -> Invoice:
+        product_ids = [self._product_id(line['product_id']) for line in lines]
+        products = Product.objects.in_bulk(set(product_ids))
+        
+        today = timezone.now().date()
+        invoice = Invoice(
+            client=client,
+            invoice_type=invoice_type,
+            point_of_sale=point_of_sale,
+            apply_tax=apply_tax,
+            date_issued=today,
+            date_due=today,
+            status='paid',
+            discount_amount=discount,
+            created_by=user,
+            stock_deducted=True,
+        )
+        
+        items = []
+        for line, product_id in zip(lines, product_ids):
+            product = products.get(product_id)
+            if product is None:
+                raise ServiceException(f"Produit introuvable (id {product_id}).")
+            quantity = int(line['quantity'])
+            if quantity < 1:
+                raise ServiceException(f"Quantité invalide pour {product.name}.")
+            is_wholesale = bool(line.get('is_wholesale', False))
+            
+            item = InvoiceItem(
+                invoice=invoice,
+                product=product,
+                quantity=quantity,
+                unit_price=product.wholesale_selling_price if is_wholesale else product.selling_price,
+                is_wholesale=is_wholesale,
+            )
+            item.compute_amounts()
+            items.append(item)
+        
+        invoice.compute_totals(items)
+        invoice.invoice_number = invoice.generate_invoice_number()
+        invoice.save(force_insert=True)
+        
+        InvoiceItem.objects.bulk_create(items)
+        
+        self.stock_service.apply_movements([
+            StockMovement(
+                product=item.product,
+                movement_type='exit',
+                quantity=item.quantity,
+                is_wholesale=item.is_wholesale,
+                from_point_of_sale=point_of_sale,
+                reference=f"Facture {invoice.invoice_number}",
+                notes=f"Sortie automatique ({'Gros' if item.is_wholesale else 'Détail'}) pour facture {invoice.invoice_number}",
+                user=user
+            )
+            for item in items
+        ])
+        
+        return invoice
+    
+    @staticmethod
+    def _product_id(value) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ServiceException(f"Produit introuvable (id {value}).")
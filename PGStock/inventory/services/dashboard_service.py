@@ -0,0 +1,187 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Sum, F, Q, Count, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+from ..models import (
+    Product, Category, Supplier, Client, Inventory, Invoice, InvoiceItem, StockMovement, PointOfSale, DataVersion
+)
+from ..permissions import filter_queryset_by_pos, get_user_permissions
+from .invoice_service import InvoiceService
+
+
+# Durée de vie d'un instantané (invalidé aussi à chaque écriture, voir signals.py)
+DASHBOARD_CACHE_TIMEOUT = 60
+
+MONEY = DecimalField(max_digits=20, decimal_places=2)
+
+INVOICE_STATUSES = [
+    ('paid', 'Payées', 'bg-emerald-100 text-emerald-800 dark:bg-emerald-900 dark:text-emerald-200'),
+    ('sent', 'Envoyées', 'bg-blue-100 text-blue-800 dark:bg-blue-900 dark:text-blue-200'),
+    ('cancelled', 'Annulées', 'bg-red-100 text-red-800 dark:bg-red-900 dark:text-red-200'),
+    ('draft', 'Brouillon', 'bg-gray-100 text-gray-800 dark:bg-gray-700 dark:text-gray-300')
+]
+
+
+class CountedPaginator(Paginator):
+    """Paginator dont le nombre d'éléments est déjà connu (pas de COUNT par liste)"""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @property
+    def count(self):
+        return self._known_count
+
+
+class DashboardService:
+    """
+    Instantané du tableau de bord.
+
+    Les tuiles sont calculées en quelques requêtes groupées puis gardées en
+    cache : une partie commune à tous les utilisateurs (compteurs, valeur du
+    stock, catégories, meilleures ventes) et une partie par (rôle, POS)
+    (factures, mouvements, stock par point de vente). Les clés contiennent
+    une version qui change à chaque écriture sur les modèles concernés,
+    partagée en base (DataVersion) par tous les processus.
+    """
+
+    @staticmethod
+    def get_version():
+        return DataVersion.get_value(DataVersion.DASHBOARD)
+
+    @staticmethod
+    def invalidate():
+        """Périme tous les instantanés et graphiques (après le commit de la transaction en cours)"""
+        DataVersion.bump_on_commit(DataVersion.DASHBOARD)
+
+    @classmethod
+    def get_snapshot(cls, user):
+        """
+        Retourne les tuiles du tableau de bord visibles par l'utilisateur.
+
+        Args:
+            user: Utilisateur de la requête
+
+        Returns:
+            Dict des tuiles (montants non masqués, voir can_view_finances)
+        """
+        permissions = get_user_permissions(user)
+        version = cls.get_version()
+        global_key = f'inventory:dashboard:{version}:global'
+        scoped_key = f'inventory:dashboard:{version}:{permissions.role}:{permissions.point_of_sale_id}'
+
+        cached = cache.get_many([global_key, scoped_key])
+        global_tiles = cached.get(global_key)
+        if global_tiles is None:
+            global_tiles = cls.compute_global_tiles()
+            cache.set(global_key, global_tiles, DASHBOARD_CACHE_TIMEOUT)
+        scoped_tiles = cached.get(scoped_key)
+        if scoped_tiles is None:
+            scoped_tiles = cls.compute_scoped_tiles(user)
+            cache.set(scoped_key, scoped_tiles, DASHBOARD_CACHE_TIMEOUT)
+
+        return {**global_tiles, **scoped_tiles}
+
+    @staticmethod
+    def compute_global_tiles():
+        """Tuiles identiques pour tous les utilisateurs"""
+        low_stock = Q(quantity__lte=F('reorder_level'), quantity__gt=0)
+        stock = Inventory.objects.aggregate(
+            low_stock_count=Count('id', filter=low_stock),
+            out_of_stock_count=Count('id', filter=Q(quantity=0)),
+            total_stock_value=Coalesce(
+                Sum(F('product__selling_price') * F('quantity'), output_field=MONEY),
+                Value(Decimal('0.00')), output_field=MONEY
+            ),
+            total_estimated_profit=Coalesce(
+                Sum((F('product__selling_price') - F('product__purchase_price')) * F('quantity'), output_field=MONEY),
+                Value(Decimal('0.00')), output_field=MONEY
+            ),
+        )
+
+        category_data = list(
+            Category.objects.annotate(count=Count('product')).values('name', 'count').order_by('-count')
+        )
+
+        top_selling_items = list(
+            InvoiceItem.objects.values(
+                'product__id', 'product__name', 'product__sku', 'product__image'
+            ).annotate(
+                total_sold=Sum('quantity'),
+                total_revenue=Sum(F('quantity') * F('unit_price'))
+            ).order_by('-total_sold')[:5]
+        )
+
+        return {
+            'total_products': Product.objects.count(),
+            'total_categories': Category.objects.count(),
+            'total_suppliers': Supplier.objects.count(),
+            'total_clients': Client.objects.count(),
+            **stock,
+            'category_data': category_data,
+            'top_selling_items': top_selling_items,
+        }
+
+    @staticmethod
+    def compute_scoped_tiles(user):
+        """Tuiles filtrées selon le rôle et le point de vente de l'utilisateur"""
+        permissions = get_user_permissions(user)
+
+        # Factures : une seule requête (agrégats conditionnels par statut)
+        invoices_qs = filter_queryset_by_pos(Invoice.objects.all(), user, 'point_of_sale')
+        invoice_totals = InvoiceService.get_statistics(invoices_qs)
+        invoice_stats = [
+            {
+                'label': label,
+                'status': status,
+                'css_class': css_class,
+                'count': invoice_totals[status]['count'],
+                'total': invoice_totals[status]['total'],
+            }
+            for status, label, css_class in INVOICE_STATUSES
+        ]
+
+        # Mouvements : une requête groupée par type
+        movements_qs = filter_queryset_by_pos(StockMovement.objects.all(), user, 'from_point_of_sale')
+        movements_by_type = dict(
+            movements_qs.order_by().values('movement_type').annotate(count=Count('id')).values_list('movement_type', 'count')
+        )
+
+        inventory_qs = filter_queryset_by_pos(Inventory.objects.all(), user, 'point_of_sale')
+        low_stock_list_count = inventory_qs.filter(quantity__lte=F('reorder_level'), quantity__gt=0).count()
+
+        # Répartition du stock par point de vente
+        stock_by_pos = PointOfSale.objects.filter(is_active=True)
+        if not permissions.is_admin:
+            if permissions.point_of_sale_id:
+                stock_by_pos = stock_by_pos.filter(id=permissions.point_of_sale_id)
+            else:
+                stock_by_pos = PointOfSale.objects.none()
+        stock_by_pos = list(stock_by_pos.values('id', 'name', 'code').annotate(
+            total_items=Coalesce(Sum('inventory__quantity'), 0),
+            total_value=Coalesce(
+                Sum(F('inventory__quantity') * F('inventory__product__selling_price'), output_field=MONEY),
+                Value(Decimal('0.00')), output_field=MONEY
+            ),
+            total_profit=Coalesce(
+                Sum(F('inventory__quantity') * (F('inventory__product__selling_price') - F('inventory__product__purchase_price')),
+                    output_field=MONEY),
+                Value(Decimal('0.00')), output_field=MONEY
+            )
+        ).order_by('name'))
+
+        return {
+            'total_sales': invoice_totals['paid']['total'],
+            'pending_orders': invoice_totals['sent']['count'],
+            'invoice_stats': invoice_stats,
+            'stock_by_pos': stock_by_pos,
+            # Tailles des listes paginées du tableau de bord
+            'recent_sales_count': invoice_totals['sent']['count'] + invoice_totals['paid']['count'],
+            'recent_movements_count': sum(movements_by_type.values()),
+            'returned_products_count': movements_by_type.get('return', 0),
+            'low_stock_list_count': low_stock_list_count,
+        }
@@ -1,104 +1,405 @@
-from django.db.models import Sum, F
-from decimal import Decimal
-from ..models import Invoice, InvoiceItem, Expense, MonthlyProfitReport, PointOfSale
+from django.db import transaction
+from django.db.models import Sum, F, Q, Value, DecimalField, Exists, OuterRef
+from django.db.models.functions import Coalesce
+from decimal import Decimal, ROUND_HALF_UP
+from ..models import Invoice, InvoiceItem, Expense, MonthlyProfitReport, PointOfSale, ProfitReportEntry
+from contextlib import contextmanager
 import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Factures dont la mise à jour du rapport est reportée après le commit (par thread)
+_deferred = threading.local()
+
+# Statuts de facture pris en compte dans les rapports de profit
+REPORTED_STATUSES = ['paid', 'sent']
+
+# Champs du rapport alimentés par les factures (voir ProfitReportEntry)
+CONTRIBUTION_FIELDS = ['total_sales_brut', 'total_discounts', 'total_cost_of_goods', 'gross_profit']
+
+# Les remises de ligne ont jusqu'à 6 décimales avant l'arrondi par facture
+AMOUNT = DecimalField(max_digits=20, decimal_places=2)
+PRECISE_AMOUNT = DecimalField(max_digits=26, decimal_places=6)
+
+
+def month_bounds(month, year):
+    """Retourne [premier jour du mois, premier jour du mois suivant[ (filtre indexable)"""
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + 1, 1, 1) if month == 12 else datetime.date(year, month + 1, 1)
+    return start, end
+
 
 class FinanceService:
     """Service pour gérer les calculs financiers et les rapports de profit"""
 
     @staticmethod
-    def generate_monthly_report(month, year, point_of_sale):
-        """Génère ou met à jour le rapport de profit pour un POS et un mois donné"""
-        
-        # 1. Calculer le total des ventes et du coût d'achat pour ce mois et ce POS
-        # On ne prend que les factures payées
-        invoices = Invoice.objects.filter(
-            date_issued__month=month,
-            date_issued__year=year,
-            point_of_sale=point_of_sale,
-            status__in=['paid', 'sent'] # Include 'sent' invoices
+    def invoice_contributions(**filters):
+        """
+        Calcule en une seule requête groupée ce que chaque facture apporte au
+        rapport de son mois et de son POS (Invoice LEFT JOIN InvoiceItem).
+
+        Args:
+            **filters: Filtres appliqués aux factures comptées dans les rapports
+
+        Returns:
+            Dict {invoice_id: ((mois, année, point_of_sale_id), contribution)}
+        """
+        brut_line = F('invoiceitem__quantity') * F('invoiceitem__unit_price')
+        rows = (
+            Invoice.objects
+            .filter(status__in=REPORTED_STATUSES, point_of_sale__isnull=False, **filters)
+            .order_by()
+            .values('id', 'point_of_sale_id', 'date_issued', 'discount_amount', 'total_profit')
+            .annotate(
+                # Ventes brutes (avant remises de ligne)
+                sales_brut=Coalesce(Sum(brut_line, output_field=AMOUNT), Value(Decimal('0.00')), output_field=AMOUNT),
+                # Remises de ligne
+                line_discounts=Coalesce(
+                    Sum(brut_line * Coalesce('invoiceitem__discount', Value(Decimal('0'))) / Value(Decimal('100')),
+                        output_field=PRECISE_AMOUNT),
+                    Value(Decimal('0')),
+                    output_field=PRECISE_AMOUNT
+                ),
+                # COGS avec le prix d'achat figé sur la ligne (gros ou détail)
+                cogs=Coalesce(
+                    Sum(F('invoiceitem__quantity') * F('invoiceitem__purchase_price'), output_field=AMOUNT),
+                    Value(Decimal('0.00')),
+                    output_field=AMOUNT
+                ),
+            )
         )
-        
-        total_sales_brut = Decimal('0.00')
-        total_discounts = Decimal('0.00')
-        total_cogs = Decimal('0.00')
-        total_net_profit = Decimal('0.00')
-        
-        for inv in invoices:
-            # total_sales_brut += inv.subtotal # Subtotal is brut before global discount
-            # We will calculate total_sales_brut from items to be truly "Gross" (before item discounts)
-            total_discounts += inv.discount_amount
-            
-            items = inv.invoiceitem_set.all()
-            for item in items:
-                # Add item-level discount to total_discounts if we want to show it separately
-                # But in our model, 'subtotal' already accounts for item-level discounts if we use item.get_total()
-                # Actually, Invoice.subtotal = sum(item.get_total())
-                # And item.get_total() = (qty * price) - item_discount
-                
-                # To get TRUE brut sales:
-                brut_line = item.quantity * item.unit_price
-                total_sales_brut += brut_line
-                
-                # COGS using the purchase_price stored on the item (fixed for wholesale)
-                total_cogs += item.quantity * item.purchase_price
-                
-                # If we want to track item-level discounts for display:
-                if item.discount:
-                    total_discounts += (brut_line * (item.discount / Decimal('100')))
-            
-            total_net_profit += inv.total_profit
-
-        # 2. Calculer le total des dépenses pour ce mois et ce POS
-        expenses_total = Expense.objects.filter(
-            date__month=month,
-            date__year=year,
-            point_of_sale=point_of_sale
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
 
-        # 3. Créer ou mettre à jour le rapport
+        contributions = {}
+        for row in rows:
+            total_discounts = Decimal(str(row['discount_amount'] or 0)) + row['line_discounts']
+            key = (row['date_issued'].month, row['date_issued'].year, row['point_of_sale_id'])
+            contributions[row['id']] = (key, {
+                'total_sales_brut': row['sales_brut'],
+                'total_discounts': total_discounts.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+                'total_cost_of_goods': row['cogs'],
+                'gross_profit': Decimal(str(row['total_profit'] or 0)),
+            })
+        return contributions
+
+    @staticmethod
+    def _get_locked_report(month, year, point_of_sale_id):
+        """Récupère (ou crée) le rapport et le verrouille pour appliquer un delta"""
         report, created = MonthlyProfitReport.objects.get_or_create(
             month=month,
             year=year,
-            point_of_sale=point_of_sale
+            point_of_sale_id=point_of_sale_id
         )
-        
-        report.total_sales_brut = total_sales_brut
-        report.total_discounts = total_discounts
-        report.total_cost_of_goods = total_cogs
-        report.total_expenses = expenses_total
-        
-        # Use our new calculated profit
-        report.gross_profit = total_net_profit
+        if created:
+            report.total_expenses = FinanceService._expenses_total(month, year, point_of_sale_id)
+            report.net_interest = report.gross_profit - report.total_expenses
+            report.save(update_fields=['total_expenses', 'net_interest'])
+        return MonthlyProfitReport.objects.select_for_update().get(pk=report.pk)
+
+    @staticmethod
+    def _apply_delta(report, deltas, sign=1):
+        """Ajoute (sign=1) ou retire (sign=-1) une contribution à un rapport verrouillé"""
+        for field in CONTRIBUTION_FIELDS:
+            setattr(report, field, getattr(report, field) + sign * deltas[field])
         report.net_interest = report.gross_profit - report.total_expenses
-        report.save()
-        
+        report.save(update_fields=CONTRIBUTION_FIELDS + ['net_interest'])
+
+    @staticmethod
+    @transaction.atomic
+    def sync_invoice_report(invoice):
+        """
+        Met à jour de façon incrémentale le rapport mensuel d'une facture.
+
+        Seule la différence entre la contribution enregistrée et la contribution
+        actuelle est appliquée (changement de totaux, de statut, de date ou de POS).
+        """
+        target, contribution = FinanceService.invoice_contributions(pk=invoice.pk).get(invoice.pk, (None, None))
+        entry = (
+            ProfitReportEntry.objects.select_for_update()
+            .select_related('report')
+            .filter(invoice_id=invoice.pk)
+            .first()
+        )
+
+        if entry:
+            current = (entry.report.month, entry.report.year, entry.report.point_of_sale_id)
+            if current == target:
+                deltas = {field: contribution[field] - getattr(entry, field) for field in CONTRIBUTION_FIELDS}
+                if any(deltas.values()):
+                    report = MonthlyProfitReport.objects.select_for_update().get(pk=entry.report_id)
+                    FinanceService._apply_delta(report, deltas)
+                if any(deltas.values()) or entry.is_stale:
+                    for field in CONTRIBUTION_FIELDS:
+                        setattr(entry, field, contribution[field])
+                    entry.is_stale = False
+                    entry.save(update_fields=CONTRIBUTION_FIELDS + ['is_stale'])
+                return entry.report
+
+            # La facture a quitté ce rapport (statut, date ou POS modifié)
+            FinanceService.remove_invoice_from_report(invoice)
+
+        if target is None:
+            return None
+
+        report = FinanceService._get_locked_report(*target)
+        FinanceService._apply_delta(report, contribution)
+        ProfitReportEntry.objects.create(invoice_id=invoice.pk, report=report, **contribution)
         return report
 
     @staticmethod
-    def update_all_reports_for_month(month, year):
-        """Met à jour les rapports de tous les POS pour un mois donné"""
-        reports = []
-        for pos in PointOfSale.objects.all():
-            reports.append(FinanceService.generate_monthly_report(month, year, pos))
+    @transaction.atomic
+    def remove_invoice_from_report(invoice):
+        """Retire la contribution d'une facture de son rapport (annulation, suppression)"""
+        entry = ProfitReportEntry.objects.select_for_update().filter(invoice_id=invoice.pk).first()
+        if not entry:
+            return
+        report = MonthlyProfitReport.objects.select_for_update().filter(pk=entry.report_id).first()
+        if report:
+            FinanceService._apply_delta(
+                report,
+                {field: getattr(entry, field) for field in CONTRIBUTION_FIELDS},
+                sign=-1
+            )
+        entry.delete()
+
+    @staticmethod
+    @contextmanager
+    def deferred_invoice_sync():
+        """
+        Reporte la mise à jour des rapports des factures enregistrées dans le
+        bloc à un seul hook après le commit (une vente ne verrouille pas le
+        rapport du mois pendant sa transaction).
+        """
+        if getattr(_deferred, 'invoice_ids', None) is not None:
+            # Bloc imbriqué : le bloc englobant enregistre le hook
+            yield
+            return
+        _deferred.invoice_ids = set()
+        try:
+            yield
+            invoice_ids = _deferred.invoice_ids
+        finally:
+            _deferred.invoice_ids = None
+        if invoice_ids:
+            transaction.on_commit(lambda: FinanceService.sync_invoice_reports(invoice_ids))
+
+    @staticmethod
+    def defer_invoice_sync(invoice_id):
+        """Retourne True si la facture est prise en charge par un deferred_invoice_sync() en cours"""
+        invoice_ids = getattr(_deferred, 'invoice_ids', None)
+        if invoice_ids is None:
+            return False
+        invoice_ids.add(invoice_id)
+        return True
+
+    @staticmethod
+    def sync_invoice_reports(invoice_ids):
+        """
+        Met à jour les rapports de plusieurs factures, une courte transaction
+        par facture. En cas d'échec le rapport est marqué à reconstruire.
+        """
+        for invoice in Invoice.objects.filter(pk__in=invoice_ids):
+            try:
+                with transaction.atomic():
+                    FinanceService.sync_invoice_report(invoice)
+            except Exception:
+                logger.exception("Mise à jour du rapport impossible pour la facture %s", invoice.pk)
+                if invoice.point_of_sale_id:
+                    FinanceService.mark_reports_stale(
+                        invoice.date_issued.month, invoice.date_issued.year, [invoice.point_of_sale_id]
+                    )
+
+    @staticmethod
+    def mark_reports_stale(month, year, point_of_sale_ids=None):
+        """
+        Marque des rapports à reconstruire à la prochaine lecture.
+
+        À utiliser après une écriture qui ne passe pas par les signaux
+        (fixtures, update() ou bulk_create sur les factures ou les dépenses).
+        """
+        reports = MonthlyProfitReport.objects.filter(month=month, year=year)
+        if point_of_sale_ids is not None:
+            reports = reports.filter(point_of_sale_id__in=point_of_sale_ids)
+        return reports.update(is_stale=True)
+
+    @staticmethod
+    def mark_invoice_items_changed(invoice_id):
+        """
+        Marque la contribution d'une facture comme périmée après une
+        modification de ses lignes (une seule requête UPDATE, sans effet si la
+        facture n'est pas comptée). Le prochain sync_invoice_report() la remet
+        à jour ; sinon le rapport est reconstruit à la prochaine lecture.
+        """
+        return ProfitReportEntry.objects.filter(invoice_id=invoice_id, is_stale=False).update(is_stale=True)
+
+    @staticmethod
+    def get_month_reports(month, year):
+        """
+        Retourne les rapports d'un mois tels qu'enregistrés.
+
+        Seuls les couples (mois, POS) périmés ou sans rapport sont reconstruits ;
+        sur un système à jour la lecture coûte deux requêtes quel que soit le
+        nombre de points de vente.
+
+        Returns:
+            Liste des rapports (avec point_of_sale chargé), dans l'ordre du modèle
+        """
+        def fetch():
+            return list(
+                MonthlyProfitReport.objects
+                .filter(month=month, year=year)
+                .select_related('point_of_sale')
+                .annotate(has_stale_entries=Exists(
+                    ProfitReportEntry.objects.filter(report=OuterRef('pk'), is_stale=True)
+                ))
+            )
+
+        reports = fetch()
+        reported_pos_ids = {report.point_of_sale_id for report in reports}
+        dirty = [
+            pos for pos in PointOfSale.objects.filter(
+                ~Q(pk__in=reported_pos_ids)
+                | Q(pk__in=[r.point_of_sale_id for r in reports if r.is_stale or r.has_stale_entries])
+            )
+        ]
+        if dirty:
+            FinanceService.rebuild_reports_for_month(month, year, dirty)
+            reports = fetch()
         return reports
 
+    @staticmethod
+    def _expenses_total(month, year, point_of_sale_id):
+        return Expense.objects.filter(
+            date__month=month,
+            date__year=year,
+            point_of_sale_id=point_of_sale_id
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+
+    @staticmethod
+    @transaction.atomic
+    def refresh_report_expenses(month, year, point_of_sale):
+        """Met à jour uniquement les charges (et l'intérêt net) d'un rapport"""
+        report = FinanceService._get_locked_report(month, year, point_of_sale.pk)
+        report.total_expenses = FinanceService._expenses_total(month, year, point_of_sale.pk)
+        report.net_interest = report.gross_profit - report.total_expenses
+        report.save(update_fields=['total_expenses', 'net_interest'])
+        return report
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_reports_for_month(month, year, points_of_sale=None):
+        """
+        Reconstruit entièrement les rapports d'un mois pour plusieurs POS en une passe.
+
+        Le nombre de requêtes est constant quel que soit le nombre de POS ou de
+        factures. Les contributions par facture (ProfitReportEntry) sont recréées
+        pour que les mises à jour incrémentales suivantes repartent de ce calcul.
+
+        Args:
+            month: Mois (1-12)
+            year: Année
+            points_of_sale: POS à reconstruire (tous par défaut)
+
+        Returns:
+            Liste des rapports, dans l'ordre des points de vente
+        """
+        if points_of_sale is None:
+            points_of_sale = list(PointOfSale.objects.all())
+        pos_ids = [pos.pk for pos in points_of_sale]
+        start, end = month_bounds(month, year)
+
+        # 1. Ventes, remises, COGS et bénéfice par facture (une requête groupée)
+        contributions = FinanceService.invoice_contributions(
+            date_issued__gte=start,
+            date_issued__lt=end,
+            point_of_sale_id__in=pos_ids
+        )
+
+        totals = {pos_id: {field: Decimal('0.00') for field in CONTRIBUTION_FIELDS} for pos_id in pos_ids}
+        for (_, _, pos_id), contribution in contributions.values():
+            for field in CONTRIBUTION_FIELDS:
+                totals[pos_id][field] += contribution[field]
+
+        # 2. Dépenses par POS
+        expenses = dict(
+            Expense.objects.filter(date__gte=start, date__lt=end, point_of_sale_id__in=pos_ids)
+            .order_by()
+            .values('point_of_sale_id')
+            .annotate(total=Sum('amount'))
+            .values_list('point_of_sale_id', 'total')
+        )
+
+        # 3. Créer ou mettre à jour les rapports
+        reports = {
+            report.point_of_sale_id: report
+            for report in MonthlyProfitReport.objects.select_for_update().filter(
+                month=month, year=year, point_of_sale_id__in=pos_ids
+            )
+        }
+        missing = [
+            MonthlyProfitReport(month=month, year=year, point_of_sale_id=pos_id)
+            for pos_id in pos_ids if pos_id not in reports
+        ]
+        if missing:
+            MonthlyProfitReport.objects.bulk_create(missing, ignore_conflicts=True)
+            reports.update({
+                report.point_of_sale_id: report
+                for report in MonthlyProfitReport.objects.select_for_update().filter(
+                    month=month, year=year, point_of_sale_id__in=[r.point_of_sale_id for r in missing]
+                )
+            })
+
+        for pos_id, report in reports.items():
+            for field in CONTRIBUTION_FIELDS:
+                setattr(report, field, totals[pos_id][field])
+            report.total_expenses = expenses.get(pos_id) or Decimal('0.00')
+            report.net_interest = report.gross_profit - report.total_expenses
+            report.is_stale = False
+        MonthlyProfitReport.objects.bulk_update(
+            list(reports.values()),
+            CONTRIBUTION_FIELDS + ['total_expenses', 'net_interest', 'is_stale']
+        )
+
+        # 4. Recréer les contributions par facture
+        report_ids = [report.pk for report in reports.values()]
+        ProfitReportEntry.objects.filter(report_id__in=report_ids).delete()
+        ProfitReportEntry.objects.filter(invoice_id__in=contributions.keys()).delete()
+        ProfitReportEntry.objects.bulk_create([
+            ProfitReportEntry(invoice_id=invoice_id, report=reports[pos_id], **contribution)
+            for invoice_id, ((_, _, pos_id), contribution) in contributions.items()
+        ])
+
+        for pos in points_of_sale:
+            reports[pos.pk].point_of_sale = pos
+        return [reports[pos_id] for pos_id in pos_ids]
+
+    @staticmethod
+    def generate_monthly_report(month, year, point_of_sale):
+        """Reconstruit entièrement le rapport de profit pour un POS et un mois donné"""
+        return FinanceService.rebuild_reports_for_month(month, year, [point_of_sale])[0]
+
+    @staticmethod
+    def update_all_reports_for_month(month, year):
+        """Met à jour les rapports de tous les POS pour un mois donné (nombre de requêtes constant)"""
+        return FinanceService.rebuild_reports_for_month(month, year)
+
     @staticmethod
     def recalculate_report_for_expense(expense):
-        """Recalcule le rapport pour le mois et le POS d'une dépense spécifique"""
+        """Recalcule les charges du rapport pour le mois et le POS d'une dépense spécifique"""
         if expense and expense.date and expense.point_of_sale:
-            return FinanceService.generate_monthly_report(
-                expense.date.month, 
-                expense.date.year, 
+            return FinanceService.refresh_report_expenses(
+                expense.date.month,
+                expense.date.year,
                 expense.point_of_sale
             )
         return None
 
     @staticmethod
     def recalculate_report_for_date(date, point_of_sale):
-        """Recalcule le rapport pour une date et un POS spécifiques"""
+        """Recalcule les charges du rapport pour une date et un POS spécifiques"""
         if date and point_of_sale:
-            return FinanceService.generate_monthly_report(
+            return FinanceService.refresh_report_expenses(
                 date.month,
                 date.year,
                 point_of_sale
@@ -0,0 +1,220 @@
+"""
+Import Job Service
+
+Database-backed queue for product imports:
+- The import view stores the uploaded workbook in an ImportJob
+- The process_import_jobs command claims pending jobs and imports them
+  chunk by chunk (ProductImportService)
+- Progress is saved in the transaction of each chunk, so a job picked up
+  again (worker restart, retry) continues after the last committed chunk
+- Each claim gets a worker token; a worker whose job was requeued and
+  claimed by another one rolls back its current chunk and stops
+"""
+
+import uuid
+from datetime import timedelta
+from typing import Optional
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.utils import timezone
+
+from .base import BaseService, ServiceException
+from .product_import_service import IMPORT_CHUNK_SIZE, ProductImportResult, ProductImportService
+from ..models import ImportJob
+
+
+# Fields written after each chunk
+PROGRESS_FIELDS = [
+    'rows_done', 'created_count', 'updated_count', 'error_count', 'errors', 'last_line', 'updated_at',
+]
+
+
+class ImportJobLost(ServiceException):
+    """The job was requeued and is no longer owned by this worker"""
+
+
+class ImportJobService(BaseService):
+    """
+    Service for queuing and running background product imports.
+
+    Jobs are claimed with a conditional UPDATE (status pending -> running),
+    as for ReportJobService, which also stores a fresh worker token. A
+    running job whose progress has not moved for a while is considered
+    abandoned and requeued; its former worker notices at its next chunk
+    (token changed) and stops without writing it.
+    """
+
+    # Attempts before a job stays failed
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, chunk_size: int = IMPORT_CHUNK_SIZE):
+        super().__init__()
+        self.chunk_size = chunk_size
+
+    def enqueue(self, uploaded_file, user: User) -> ImportJob:
+        """
+        Store an uploaded workbook and queue its import.
+
+        The header row is checked here so that a wrong file is reported
+        on the upload page rather than by a failed job.
+
+        Args:
+            uploaded_file: Uploaded .xlsx file
+            user: Requesting user
+
+        Returns:
+            Pending ImportJob
+
+        Raises:
+            ServiceException: If the workbook cannot be read or lacks the 'name' column
+        """
+        try:
+            workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        except Exception as e:
+            raise ServiceException(f"Erreur lors de la lecture du fichier: {e}")
+        try:
+            sheet = workbook.active
+            ProductImportService.parse_headers(next(sheet.iter_rows(values_only=True, max_row=1), ()))
+            total_rows = sheet.max_row - 1 if sheet.max_row else None
+        finally:
+            workbook.close()
+
+        uploaded_file.seek(0)
+        job = ImportJob(original_name=uploaded_file.name[:255], total_rows=total_rows, requested_by=user)
+        job.source_file.save(uploaded_file.name, uploaded_file, save=False)
+        job.save()
+        self.log_info(f"Import job #{job.pk} queued ({job.original_name})")
+        return job
+
+    def claim_next(self) -> Optional[ImportJob]:
+        """
+        Claim the oldest pending job.
+
+        Returns:
+            The job now marked running, or None if the queue is empty
+        """
+        while True:
+            job_id = (
+                ImportJob.objects.filter(status='pending')
+                .order_by('created_at', 'pk')
+                .values_list('pk', flat=True)
+                .first()
+            )
+            if job_id is None:
+                return None
+            now = timezone.now()
+            claimed = ImportJob.objects.filter(pk=job_id, status='pending').update(
+                status='running',
+                worker_token=uuid.uuid4().hex,
+                started_at=now,
+                updated_at=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return ImportJob.objects.get(pk=job_id)
+            # Another worker took it first: try the next one
+
+    def requeue_stale(self, older_than: timedelta) -> int:
+        """
+        Put back jobs left running by a worker that died.
+
+        Args:
+            older_than: Time without progress after which a job is considered abandoned
+
+        Returns:
+            Number of jobs requeued (jobs out of attempts are marked failed)
+        """
+        limit = timezone.now() - older_than
+        stale = ImportJob.objects.filter(status='running', updated_at__lt=limit)
+        failed = stale.filter(attempts__gte=self.MAX_ATTEMPTS).update(
+            status='failed',
+            error="Abandonné par le worker",
+            worker_token='',
+            finished_at=timezone.now(),
+        )
+        requeued = stale.update(status='pending', worker_token='')
+        if requeued or failed:
+            self.log_warning(f"{requeued} import job(s) requeued, {failed} failed")
+        return requeued
+
+    def retry(self, job: ImportJob) -> ImportJob:
+        """
+        Queue a failed job again; it resumes after its last committed chunk.
+
+        Args:
+            job: Failed job
+
+        Returns:
+            The job, pending
+        """
+        if job.status != 'failed':
+            raise ServiceException("Seule une importation en échec peut être relancée")
+        ImportJob.objects.filter(pk=job.pk, status='failed').update(
+            status='pending', error='', finished_at=None, attempts=0,
+        )
+        job.refresh_from_db()
+        return job
+
+    def run(self, job: ImportJob) -> ImportJob:
+        """
+        Import a claimed job, resuming after its last committed line.
+
+        Every chunk first locks the job row and checks the worker token, so
+        a job requeued meanwhile is left to the worker that claimed it.
+
+        Args:
+            job: Job in running state, as returned by claim_next
+
+        Returns:
+            The job, done or failed (unchanged if it was taken over)
+        """
+        result = ProductImportResult()
+        result.rows = job.rows_done
+        result.created = job.created_count
+        result.updated = job.updated_count
+        result.error_count = job.error_count
+        result.errors = list(job.errors)
+        result.last_line = job.last_line
+
+        def save_progress(result):
+            # Runs in the chunk transaction: the lock holds off requeue_stale until commit
+            self._check_owner(job, lock=True)
+            job.rows_done = result.rows
+            job.created_count = result.created
+            job.updated_count = result.updated
+            job.error_count = result.error_count
+            job.errors = result.errors[:ImportJob.MAX_STORED_ERRORS]
+            job.last_line = result.last_line
+            job.save(update_fields=PROGRESS_FIELDS)
+
+        try:
+            self._check_owner(job)
+            with job.source_file.open('rb') as f:
+                ProductImportService(self.chunk_size, on_chunk=save_progress).import_workbook(
+                    f, resume_after=job.last_line, result=result
+                )
+            status, error = 'done', ''
+        except ImportJobLost:
+            self.log_warning(f"Import job #{job.pk} was taken over by another worker, stopping")
+            job.refresh_from_db()
+            return job
+        except Exception as e:
+            self.log_exception(f"Import job #{job.pk} failed at line {job.last_line}")
+            status, error = 'failed', str(e)
+
+        finished = ImportJob.objects.filter(
+            pk=job.pk, status='running', worker_token=job.worker_token
+        ).update(status=status, error=error, worker_token='', finished_at=timezone.now(), updated_at=timezone.now())
+        if not finished:
+            self.log_warning(f"Import job #{job.pk} was taken over by another worker before it finished")
+        job.refresh_from_db()
+        return job
+
+    @staticmethod
+    def _check_owner(job: ImportJob, lock: bool = False):
+        """Raise ImportJobLost unless the job is still running under this worker's token"""
+        jobs = ImportJob.objects.filter(pk=job.pk, status='running', worker_token=job.worker_token)
+        if not job.worker_token or not (jobs.select_for_update() if lock else jobs).exists():
+            raise ImportJobLost(f"L'importation #{job.pk} a été reprise par un autre worker")
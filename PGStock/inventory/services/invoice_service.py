@@ -11,8 +11,11 @@ Handles all invoice-related business logic:
 
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Dict, Any, List
-from django.db import transaction, IntegrityError
+from django.db import transaction
+from django.db.models import Count, Sum, Q, Value, DecimalField, QuerySet
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 from .base import BaseService, ServiceException
@@ -22,6 +25,10 @@ from ..models import (
 )
 
 
+# Invoices still awaiting payment (can become overdue)
+PENDING_STATUSES = ('draft', 'sent')
+
+
 class InvoiceService(BaseService):
     """
     Service for managing invoices.
@@ -81,46 +88,21 @@ class InvoiceService(BaseService):
         if status != 'draft':
             self._validate_has_items_data(items_data)
         
-        # Generate invoice number BEFORE creating the object with retry logic
-        max_retries = 3
-        invoice = None
-        
-        for attempt in range(max_retries):
-            try:
-                # Generate a unique invoice number
-                invoice_number = self._generate_unique_invoice_number()
-                
-                # Create invoice WITH the number
-                invoice = Invoice.objects.create(
-                    invoice_number=invoice_number,
-                    client=client,
-                    point_of_sale=point_of_sale,
-                    created_by=user,
-                    status=status,
-                    invoice_type=invoice_type,
-                    date_issued=date_issued or datetime.now().date(),
-                    date_due=date_due or datetime.now().date(),
-                    apply_tax=apply_tax,
-                    tax_rate=tax_rate,
-                    notes=notes
-                )
-                break  # Success, exit loop
-                
-            except IntegrityError as e:
-                if 'UNIQUE constraint' in str(e) and attempt < max_retries - 1:
-                    # Number collision, retry
-                    self.log_warning(
-                        f"Invoice number collision, retrying... (attempt {attempt + 1})"
-                    )
-                    continue
-                else:
-                    # Definitive failure
-                    raise ServiceException(
-                        f"Impossible de générer un numéro de facture unique après {max_retries} tentatives."
-                    )
-        
-        if invoice is None:
-            raise ServiceException("Échec de la création de la facture.")
+        # The number comes from the invoice sequence, reserved in this transaction
+        today = timezone.now().date()
+        invoice = Invoice.objects.create(
+            invoice_number=self._generate_unique_invoice_number(),
+            client=client,
+            point_of_sale=point_of_sale,
+            created_by=user,
+            status=status,
+            invoice_type=invoice_type,
+            date_issued=date_issued or today,
+            date_due=date_due or today,
+            apply_tax=apply_tax,
+            tax_rate=tax_rate,
+            notes=notes
+        )
         
         # Create invoice items
         for item_data in items_data:
@@ -346,6 +328,46 @@ class InvoiceService(BaseService):
         
         invoice.save()
     
+    @staticmethod
+    def get_statistics(invoices: Optional[QuerySet] = None, today=None) -> Dict[str, Dict[str, Any]]:
+        """
+        Count and total invoices per status in a single query.
+        
+        Every bucket is a conditional aggregate (filter=Q(...)) over the same
+        scan of the invoice table.
+        
+        Args:
+            invoices: Invoice queryset, already filtered (dates, point of sale...)
+            today: Reference date for overdue invoices (defaults to today)
+            
+        Returns:
+            Dict {bucket: {'count': int, 'total': Decimal}} with one bucket per
+            status, plus 'pending' (draft + sent), 'overdue' (pending and past
+            due) and 'all'
+        """
+        if invoices is None:
+            invoices = Invoice.objects.all()
+        today = today or timezone.now().date()
+        
+        buckets = {status: Q(status=status) for status, _ in Invoice.STATUS_CHOICES}
+        buckets['pending'] = Q(status__in=PENDING_STATUSES)
+        buckets['overdue'] = Q(status__in=PENDING_STATUSES, date_due__lt=today)
+        buckets['all'] = None
+        
+        money = DecimalField(max_digits=20, decimal_places=2)
+        aggregates = {}
+        for name, condition in buckets.items():
+            aggregates[f'{name}_count'] = Count('id', filter=condition)
+            aggregates[f'{name}_total'] = Coalesce(
+                Sum('total_amount', filter=condition), Value(Decimal('0.00')), output_field=money
+            )
+        row = invoices.order_by().aggregate(**aggregates)
+        
+        return {
+            name: {'count': row[f'{name}_count'], 'total': row[f'{name}_total']}
+            for name in buckets
+        }
+    
     @transaction.atomic
     def deduct_stock(self, invoice: Invoice, user: User):
         """
@@ -477,34 +499,14 @@ class InvoiceService(BaseService):
         """
         Generate a unique invoice number.
         
-        Note: This method should be called within an atomic transaction.
-        Uses select_for_update to prevent race conditions when multiple
-        invoices are created simultaneously.
+        Note: This method should be called within the transaction that saves
+        the invoice. The yearly sequence row (DocumentSequence) stays locked
+        until commit, so numbers never collide and a rollback leaves no gap.
         
         Returns:
             Unique invoice number in format INV-YYYY-NNNNN
         """
-        from datetime import datetime
-        
-        year = datetime.now().year
-        
-        # Use select_for_update to lock the row and prevent race conditions
-        # Note: This assumes we're already in an atomic transaction
-        last_invoice = Invoice.objects.filter(
-            invoice_number__startswith=f'INV-{year}'
-        ).select_for_update().order_by('-invoice_number').first()
-        
-        if last_invoice:
-            try:
-                last_num = int(last_invoice.invoice_number.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                # Fallback if number parsing fails
-                new_num = 1
-        else:
-            new_num = 1
-        
-        return f'INV-{year}-{new_num:05d}'
+        return Invoice().generate_invoice_number()
     
     @transaction.atomic
     def convert_quote_to_invoice(
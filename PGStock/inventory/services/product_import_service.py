@@ -0,0 +1,353 @@
+"""
+Product Import Service
+
+Imports a product catalogue from an Excel workbook in chunks:
+- Rows streamed from a read-only workbook
+- Categories, suppliers and active points of sale resolved once
+- Products bulk-created / bulk-updated per chunk (one transaction each)
+- Inventory rows for every active point of sale bulk-created
+- Missing SKUs reserved in bulk per category (Product.allocate_skus)
+- Optional progress callback run inside each chunk's transaction, so a
+  background job can record how far it got and resume from there
+"""
+
+import time
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import openpyxl
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .base import BaseService, ServiceException
+from .catalogue_service import CatalogueService
+from .dashboard_service import DashboardService
+from .stock_ledger import StockLedger
+from ..models import Category, Inventory, PointOfSale, Product, Supplier
+
+
+# Rows written per transaction
+IMPORT_CHUNK_SIZE = 500
+
+# Accepted column headers: technical names and the labels of the downloadable template
+HEADER_ALIASES = {
+    'name': 'name',
+    'nom': 'name',
+    'sku': 'sku',
+    'description': 'description',
+    'category': 'category',
+    'catégorie': 'category',
+    'supplier': 'supplier',
+    'fournisseur': 'supplier',
+    'purchase_price': 'purchase_price',
+    "prix d'achat": 'purchase_price',
+    'margin': 'margin',
+    'marge': 'margin',
+    'marge (gnf)': 'margin',
+    'selling_price': 'selling_price',
+    'prix de vente': 'selling_price',
+}
+
+DEFAULT_CATEGORY = 'Non classé'
+
+# Inventory created for each active point of sale
+DEFAULT_REORDER_LEVEL = 10
+
+# Fields written when an existing product (same SKU) is updated
+UPDATE_FIELDS = [
+    'name', 'description', 'category', 'supplier',
+    'purchase_price', 'margin', 'selling_price',
+    'wholesale_purchase_price', 'wholesale_selling_price', 'wholesale_margin',
+    'updated_at',
+]
+
+
+def _text(value) -> str:
+    return str(value).strip() if value is not None else ''
+
+
+class ProductImportResult:
+    """Counters and messages of an import run"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        # Row errors and warnings, in file order
+        self.errors: List[str] = []
+        self.duration = 0.0
+        # Spreadsheet line of the last committed chunk
+        self.last_line = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.duration if self.duration else float(self.rows)
+
+
+class ProductImportService(BaseService):
+    """
+    Service for bulk product imports.
+
+    Same rules as the row-by-row import: rows are upserted by SKU, unknown
+    categories are created, unknown suppliers are reported and skipped, and
+    new products get an empty inventory in every active point of sale.
+    A row without SKU gets one generated from its category.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        on_chunk: Optional[Callable[[ProductImportResult], None]] = None
+    ):
+        """
+        Args:
+            chunk_size: Rows written per transaction
+            on_chunk: Called with the updated result inside the transaction
+                of each chunk (progress saved with the rows it describes)
+        """
+        super().__init__()
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+
+    def import_workbook(
+        self,
+        file,
+        resume_after: int = 0,
+        result: Optional[ProductImportResult] = None
+    ) -> ProductImportResult:
+        """
+        Import the first sheet of an Excel workbook.
+
+        Args:
+            file: Path or file object of an .xlsx workbook
+            resume_after: Skip the lines up to this one (already committed)
+            result: Counters of the interrupted run to continue from
+
+        Returns:
+            ProductImportResult
+
+        Raises:
+            ServiceException: If the header row lacks the 'name' column
+        """
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = self.parse_headers(next(rows, ()))
+            return self.import_rows(headers, rows, first_line=2, resume_after=resume_after, result=result)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def parse_headers(header_row: Iterable[Any]) -> List[Optional[str]]:
+        """Map header cells to field names (None for unknown columns)"""
+        headers = [HEADER_ALIASES.get(_text(cell).lower().rstrip('*').strip()) for cell in header_row]
+        if 'name' not in headers:
+            raise ServiceException("Le fichier Excel doit contenir au minimum la colonne 'name'")
+        return headers
+
+    def import_rows(
+        self,
+        headers: List[Optional[str]],
+        rows: Iterable[Tuple],
+        first_line: int = 2,
+        resume_after: int = 0,
+        result: Optional[ProductImportResult] = None
+    ) -> ProductImportResult:
+        """
+        Import rows (tuples of cell values in header order).
+
+        Args:
+            headers: Field names from parse_headers()
+            rows: Data rows
+            first_line: Spreadsheet line number of the first row (for messages)
+            resume_after: Skip the lines up to this one (already committed)
+            result: Counters of the interrupted run to continue from
+
+        Returns:
+            ProductImportResult
+        """
+        result = result or ProductImportResult()
+        started = time.monotonic()
+        resumed_rows = result.rows
+
+        self.categories = Category.objects.in_bulk(field_name='name')
+        self.suppliers = dict(Supplier.objects.values_list('name', 'id'))
+        self.pos_ids = list(PointOfSale.objects.filter(is_active=True).values_list('id', flat=True))
+
+        chunk = []
+        for line, row in enumerate(rows, start=first_line):
+            if line <= resume_after or not any(row):  # Lignes déjà importées ou vides
+                continue
+            result.rows += 1
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(headers, chunk, result)
+                chunk = []
+        if chunk:
+            self._import_chunk(headers, chunk, result)
+
+        if result.created or result.updated:
+            CatalogueService.invalidate()
+            DashboardService.invalidate()
+
+        result.duration = time.monotonic() - started
+        self.log_info(
+            f"Product import: {result.rows - resumed_rows} rows in {result.duration:.2f}s",
+            created=result.created,
+            updated=result.updated,
+            errors=result.error_count,
+            rows_per_second=round(result.rows_per_second, 1)
+        )
+        return result
+
+    def _import_chunk(self, headers, chunk, result: ProductImportResult):
+        parsed = []
+        for line, row in chunk:
+            entry = self._parse_row(headers, line, row, result)
+            if entry is not None:
+                parsed.append(entry)
+        last_line = chunk[-1][0]
+
+        try:
+            with transaction.atomic():
+                created = self._write(parsed) if parsed else 0
+                self._chunk_done(result, last_line, created, len(parsed) - created)
+        except DatabaseError as e:
+            result.errors.append(f"Lignes {chunk[0][0]} à {last_line}: {e}")
+            result.error_count += len(parsed)
+            # Progression du lot rejeté dans sa propre transaction (on_chunk peut verrouiller)
+            with transaction.atomic():
+                self._chunk_done(result, last_line, 0, 0)
+
+    def _chunk_done(self, result, last_line, created, updated):
+        """Count a committed (or rejected) chunk and report progress"""
+        counters = (result.created, result.updated, result.last_line)
+        result.created += created
+        result.updated += updated
+        result.last_line = last_line
+        if self.on_chunk is not None:
+            try:
+                self.on_chunk(result)
+            except Exception:
+                # Le lot est annulé avec sa progression
+                result.created, result.updated, result.last_line = counters
+                raise
+
+    def _parse_row(self, headers, line, row, result) -> Optional[Tuple[int, str, Dict[str, Any]]]:
+        """Validate a row; returns (line, sku, fields) or None if the row is rejected"""
+        data = {header: value for header, value in zip(headers, row) if header}
+        name = _text(data.get('name'))
+        sku = _text(data.get('sku'))
+
+        if not name:
+            result.errors.append(f"Ligne {line}: 'name' est obligatoire")
+            result.error_count += 1
+            return None
+        if len(name) > 200 or len(sku) > 50:
+            result.errors.append(f"Ligne {line}: nom (200) ou SKU (50 caractères) trop long")
+            result.error_count += 1
+            return None
+
+        fields = {
+            'name': name,
+            'description': _text(data.get('description')),
+        }
+
+        # Catégorie (créée si inconnue, catégorie par défaut si vide)
+        category_name = _text(data.get('category')) or DEFAULT_CATEGORY
+        if len(category_name) > 100:
+            result.errors.append(f"Ligne {line}: nom de catégorie trop long (100 caractères)")
+            result.error_count += 1
+            return None
+        fields['category'] = self._get_category(category_name)
+
+        # Fournisseur (signalé s'il est inconnu, la ligne est quand même importée)
+        supplier_name = _text(data.get('supplier'))
+        if supplier_name:
+            supplier_id = self.suppliers.get(supplier_name)
+            if supplier_id:
+                fields['supplier_id'] = supplier_id
+            else:
+                result.errors.append(f"Ligne {line}: Fournisseur '{supplier_name}' introuvable")
+
+        # Prix
+        try:
+            if data.get('purchase_price'):
+                fields['purchase_price'] = Decimal(str(data['purchase_price']))
+            if data.get('margin'):
+                fields['margin'] = Decimal(str(data['margin']))
+
+            if data.get('selling_price'):
+                fields['selling_price'] = Decimal(str(data['selling_price']))
+            elif fields.get('purchase_price') and fields.get('margin'):
+                # Calculer le prix de vente automatiquement: PV = PA + marge (montant)
+                fields['selling_price'] = fields['purchase_price'] + fields['margin']
+            else:
+                fields['selling_price'] = Decimal('0.01')
+                result.errors.append(f"Ligne {line}: Prix de vente manquant - valeur par défaut (0.01 GNF) appliquée")
+        except (ValueError, TypeError, InvalidOperation) as e:
+            result.errors.append(f"Ligne {line}: Erreur de prix - {str(e)}")
+            result.error_count += 1
+            return None
+
+        return line, sku, fields
+
+    def _get_category(self, name: str) -> Category:
+        category = self.categories.get(name)
+        if category is None:
+            description = (
+                'Catégorie par défaut pour les produits sans catégorie' if name == DEFAULT_CATEGORY
+                else 'Catégorie créée automatiquement lors de l\'importation'
+            )
+            category, _ = Category.objects.get_or_create(name=name, defaults={'description': description})
+            self.categories[name] = category
+        return category
+
+    def _write(self, parsed) -> int:
+        """Upsert one chunk; returns the number of products created"""
+        # SKU à générer : un bloc réservé par catégorie
+        missing = defaultdict(list)
+        for index, (_, sku, fields) in enumerate(parsed):
+            if not sku:
+                missing[fields['category']].append(index)
+        generated = {}
+        for category, indexes in missing.items():
+            generated.update(zip(indexes, Product.allocate_skus(category, len(indexes))))
+
+        skus = [sku for _, sku, _ in parsed if sku]
+        existing = Product.objects.in_bulk(skus, field_name='sku') if skus else {}
+
+        to_create = {}
+        to_update = {}
+        for index, (_, sku, fields) in enumerate(parsed):
+            sku = sku or generated[index]
+            # Une ligne répétée met à jour le produit créé ou modifié plus haut
+            product = to_create.get(sku) or existing.get(sku)
+            if product is None:
+                product = Product(sku=sku, **fields)
+                to_create[sku] = product
+            else:
+                for field, value in fields.items():
+                    setattr(product, field, value)
+                if product.pk:
+                    to_update[sku] = product
+            product.compute_prices()
+
+        created = Product.objects.bulk_create(to_create.values())
+
+        now = timezone.now()
+        for product in to_update.values():
+            product.updated_at = now
+        Product.objects.bulk_update(to_update.values(), UPDATE_FIELDS)
+
+        # Inventaire vide dans chaque point de vente actif
+        Inventory.objects.bulk_create([
+            Inventory(product=product, point_of_sale_id=pos_id, quantity=0, reorder_level=DEFAULT_REORDER_LEVEL)
+            for product in created
+            for pos_id in self.pos_ids
+        ])
+        StockLedger.refresh_summaries([product.pk for product in created])
+
+        return len(created)
@@ -0,0 +1,162 @@
+"""
+Report Job Service
+
+Database-backed queue for PDF reports:
+- Views enqueue a ReportJob (report type + request filters)
+- The process_report_jobs command claims pending jobs and renders them
+- Finished files are stored under a random name in the private storage
+  (PRIVATE_MEDIA_ROOT/reports/) and only served by report_job_download
+"""
+
+import sys
+from datetime import timedelta
+from io import BytesIO
+from typing import Optional
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .base import BaseService, ServiceException
+from ..models import ReportJob
+
+
+class ReportJobService(BaseService):
+    """
+    Service for queuing and rendering background PDF reports.
+
+    Jobs are claimed with a conditional UPDATE (status pending -> running),
+    so several workers can poll the same table without rendering a job
+    twice.
+    """
+
+    # Attempts before a job stays failed
+    MAX_ATTEMPTS = 3
+
+    def enqueue(self, report_type: str, params: dict, user: User) -> ReportJob:
+        """
+        Queue a PDF report.
+
+        Args:
+            report_type: Key registered in inventory.pdf_reports
+            params: Request filters (request.GET.dict())
+            user: Requesting user (used for point of sale filtering)
+
+        Returns:
+            Pending ReportJob
+        """
+        from ..pdf_reports import get_pdf_report
+
+        if get_pdf_report(report_type) is None:
+            raise ServiceException(f"Rapport inconnu : {report_type}")
+
+        job = ReportJob.objects.create(report_type=report_type, params=params, requested_by=user)
+        self.log_info(f"Report job #{job.pk} queued ({report_type})")
+        return job
+
+    def claim_next(self) -> Optional[ReportJob]:
+        """
+        Claim the oldest pending job.
+
+        Returns:
+            The job now marked running, or None if the queue is empty
+        """
+        while True:
+            job_id = (
+                ReportJob.objects.filter(status='pending')
+                .order_by('created_at', 'pk')
+                .values_list('pk', flat=True)
+                .first()
+            )
+            if job_id is None:
+                return None
+            claimed = ReportJob.objects.filter(pk=job_id, status='pending').update(
+                status='running',
+                started_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return ReportJob.objects.select_related('requested_by').get(pk=job_id)
+            # Another worker took it first: try the next one
+
+    def requeue_stale(self, older_than: timedelta) -> int:
+        """
+        Put back jobs left running by a worker that died.
+
+        Args:
+            older_than: Running time after which a job is considered abandoned
+
+        Returns:
+            Number of jobs requeued (jobs out of attempts are marked failed)
+        """
+        limit = timezone.now() - older_than
+        stale = ReportJob.objects.filter(status='running', started_at__lt=limit)
+        failed = stale.filter(attempts__gte=self.MAX_ATTEMPTS).update(
+            status='failed',
+            error="Abandonné par le worker",
+            finished_at=timezone.now(),
+        )
+        requeued = stale.update(status='pending')
+        if requeued or failed:
+            self.log_warning(f"{requeued} report job(s) requeued, {failed} failed")
+        return requeued
+
+    def run(self, job: ReportJob) -> ReportJob:
+        """
+        Render a claimed job and store its file.
+
+        Args:
+            job: Job in running state
+
+        Returns:
+            The job, done or failed
+        """
+        from ..pdf_reports import get_pdf_report
+
+        report = get_pdf_report(job.report_type)
+        try:
+            if report is None:
+                raise ServiceException(f"Rapport inconnu : {job.report_type}")
+            context = report.build_context(job.params, job.requested_by)
+            html = get_template(report.template).render(context)
+            content = self.render_pdf(html)
+
+            filename = report.filename()
+            job.file.save(filename, ContentFile(content), save=False)
+            job.filename = filename
+            job.status = 'done'
+            job.error = ''
+        except Exception as e:
+            self.log_exception(f"Report job #{job.pk} failed")
+            job.status = 'failed'
+            job.error = str(e)
+
+        job.finished_at = timezone.now()
+        job.save(update_fields=['file', 'filename', 'status', 'error', 'finished_at'])
+        return job
+
+    @staticmethod
+    def render_pdf(html: str) -> bytes:
+        """
+        Convert HTML to PDF with xhtml2pdf.
+
+        The lxml bypass swaps sys.modules, which is only safe because the
+        worker renders one job at a time in its own process.
+        """
+        lxml_backup = sys.modules.get('lxml')
+        sys.modules['lxml'] = None
+        try:
+            from xhtml2pdf import pisa
+
+            output = BytesIO()
+            status = pisa.CreatePDF(html, dest=output)
+            if status.err:
+                raise ServiceException(f"Erreur de génération PDF ({status.err})")
+            return output.getvalue()
+        finally:
+            if lxml_backup:
+                sys.modules['lxml'] = lxml_backup
+            elif 'lxml' in sys.modules:
+                del sys.modules['lxml']
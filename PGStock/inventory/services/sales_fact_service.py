@@ -0,0 +1,243 @@
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum, F, Q, DecimalField
+
+from ..models import DailySalesFact, InvoiceItem
+from .dashboard_service import DashboardService
+
+logger = logging.getLogger(__name__)
+
+# Statuts de facture comptés comme ventes
+SALES_STATUSES = ['paid']
+
+# Lignes insérées par requête lors d'une reconstruction
+REBUILD_BATCH_SIZE = 2000
+
+AMOUNT = DecimalField(max_digits=20, decimal_places=2)
+
+# Espace des verrous consultatifs PostgreSQL : bits 52 à 62 de la clé (jour sur 20 bits, POS sur 32)
+ADVISORY_LOCK_NAMESPACE = 0x5A1
+
+
+class _RefreshState:
+    """
+    Recalculs après commit d'une connexion.
+
+    queued numérote les appels de queue_refresh et les recalculs ; refreshed
+    garde le numéro du dernier recalcul de chaque couple (jour, POS).
+    """
+
+    __slots__ = ('queued', 'refreshed')
+
+    def __init__(self):
+        self.queued = 0
+        self.refreshed = {}
+
+
+def _refresh_state():
+    connection = transaction.get_connection()
+    state = getattr(connection, '_sales_fact_refresh', None)
+    if state is None:
+        state = connection._sales_fact_refresh = _RefreshState()
+    return state
+
+
+class SalesFactService:
+    """
+    Table de faits des ventes journalières (DailySalesFact).
+
+    L'unité de mise à jour est le couple (jour, point de vente) : toute
+    écriture sur une facture payée ou ses lignes recalcule les couples
+    touchés (ancien et nouveau jour si la facture a changé de date ou de POS)
+    en une requête groupée sur les lignes de ce seul jour. Les recalculs
+    d'un même couple sont sérialisés par un verrou pris avant la suppression.
+    """
+
+    @staticmethod
+    def fact_rows(condition=None):
+        """
+        Agrège les lignes des factures payées par (jour, POS, produit, gros/détail).
+
+        Args:
+            condition: Filtre Q supplémentaire sur les lignes de facture
+
+        Returns:
+            QuerySet de dicts prêts pour DailySalesFact
+        """
+        items = InvoiceItem.objects.filter(invoice__status__in=SALES_STATUSES)
+        if condition is not None:
+            items = items.filter(condition)
+        return (
+            items.order_by()
+            .values('invoice__date_issued', 'invoice__point_of_sale_id', 'product_id', 'is_wholesale')
+            .annotate(
+                total_quantity=Sum('quantity'),
+                total_gross=Sum(F('quantity') * F('unit_price'), output_field=AMOUNT),
+                total_net=Sum('total'),
+                total_cost=Sum(F('quantity') * F('purchase_price'), output_field=AMOUNT),
+                total_margin=Sum('margin'),
+            )
+        )
+
+    @staticmethod
+    def _build_fact(row):
+        gross = row['total_gross'] or Decimal('0.00')
+        return DailySalesFact(
+            date=row['invoice__date_issued'],
+            point_of_sale_id=row['invoice__point_of_sale_id'],
+            product_id=row['product_id'],
+            is_wholesale=row['is_wholesale'],
+            quantity=row['total_quantity'] or 0,
+            gross=gross,
+            # Remise = brut - totaux de ligne (cohérent avec l'arrondi de chaque ligne)
+            discount=gross - (row['total_net'] or Decimal('0.00')),
+            cost_of_goods=row['total_cost'] or Decimal('0.00'),
+            margin=row['total_margin'] or Decimal('0.00'),
+        )
+
+    @staticmethod
+    def _days_filter(days, date_field='date', pos_field='point_of_sale'):
+        condition = Q()
+        for day, pos_id in days:
+            if pos_id is None:
+                condition |= Q(**{date_field: day, f'{pos_field}__isnull': True})
+            else:
+                condition |= Q(**{date_field: day, f'{pos_field}_id': pos_id})
+        return condition
+
+    @staticmethod
+    def _lock_days(days):
+        """
+        Verrouille les couples (jour, POS) jusqu'à la fin de la transaction.
+
+        Sans verrou, deux recalculs concurrents du même jour (deux ventes
+        validées par deux workers) se croisent : le second ne voit pas les
+        lignes insérées par le premier et viole unique_daily_sales_fact.
+        PostgreSQL : un verrou consultatif par couple, pris dans l'ordre.
+        SQLite sérialise déjà les transactions d'écriture.
+        """
+        connection = transaction.get_connection()
+        if connection.vendor != 'postgresql':
+            return
+        keys = sorted(
+            (ADVISORY_LOCK_NAMESPACE << 52) | (day.toordinal() << 32) | (pos_id or 0)
+            for day, pos_id in days
+        )
+        with connection.cursor() as cursor:
+            # Partagé entre recalculs, exclusif pour une reconstruction (rebuild)
+            cursor.execute("SELECT pg_advisory_xact_lock_shared(%s)", [ADVISORY_LOCK_NAMESPACE << 52])
+            for key in keys:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+    @staticmethod
+    def _lock_table():
+        """Attend la fin des recalculs en cours et bloque les suivants (PostgreSQL)"""
+        connection = transaction.get_connection()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [ADVISORY_LOCK_NAMESPACE << 52])
+
+    @staticmethod
+    @transaction.atomic
+    def refresh_days(days):
+        """
+        Recalcule les faits des couples (jour, point_de_vente_id) donnés.
+
+        Returns:
+            Nombre de faits écrits
+        """
+        days = set(days)
+        if not days:
+            return 0
+        # Verrou avant la suppression : chaque requête suivante voit les recalculs déjà validés
+        SalesFactService._lock_days(days)
+        DailySalesFact.objects.filter(SalesFactService._days_filter(days)).delete()
+        facts = [
+            SalesFactService._build_fact(row)
+            for row in SalesFactService.fact_rows(
+                SalesFactService._days_filter(days, 'invoice__date_issued', 'invoice__point_of_sale')
+            )
+        ]
+        DailySalesFact.objects.bulk_create(facts)
+        # Écritures sans signal : les graphiques en cache sont périmés ici
+        DashboardService.invalidate()
+        return len(facts)
+
+    @staticmethod
+    def queue_refresh(days):
+        """
+        Recalcule les couples (jour, point_de_vente_id) après le commit.
+
+        Chaque appel enregistre son callback on_commit : un rollback l'abandonne
+        avec ses couples. Au commit, un couple déjà recalculé depuis l'appel
+        (callback précédent de la même transaction) n'est pas recalculé.
+
+        La facture est déjà validée quand le callback s'exécute : une erreur
+        est journalisée avec la période à reconstruire (rebuild_sales_facts)
+        au lieu de faire échouer la vente.
+        """
+        days = {day for day in days if day[0] is not None}
+        if not days:
+            return
+        state = _refresh_state()
+        state.queued += 1
+        queued = state.queued
+
+        def refresh_sales_days():
+            # Seuls comptent les recalculs postérieurs à l'appel : ils ont vu ses écritures
+            state.refreshed = {key: seq for key, seq in state.refreshed.items() if seq > queued}
+            todo = days - state.refreshed.keys()
+            if not todo:
+                return
+            try:
+                SalesFactService.refresh_days(todo)
+            except Exception:
+                dates = sorted(day for day, _ in todo)
+                logger.exception(
+                    "Ventes journalières non mises à jour pour %s couple(s) (jour, POS) : "
+                    "lancer rebuild_sales_facts --start %s --end %s", len(todo), dates[0], dates[-1]
+                )
+                return
+            state.queued += 1
+            state.refreshed.update(dict.fromkeys(todo, state.queued))
+
+        transaction.on_commit(refresh_sales_days)
+
+    @staticmethod
+    def rebuild(start=None, end=None):
+        """
+        Reconstruit la table sur une période (toute la table par défaut).
+
+        Args:
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+
+        Returns:
+            Nombre de faits écrits
+        """
+        facts = DailySalesFact.objects.all()
+        condition = Q()
+        if start:
+            facts = facts.filter(date__gte=start)
+            condition &= Q(invoice__date_issued__gte=start)
+        if end:
+            facts = facts.filter(date__lte=end)
+            condition &= Q(invoice__date_issued__lte=end)
+
+        written = 0
+        with transaction.atomic():
+            SalesFactService._lock_table()
+            facts.delete()
+            batch = []
+            for row in SalesFactService.fact_rows(condition).iterator(chunk_size=REBUILD_BATCH_SIZE):
+                batch.append(SalesFactService._build_fact(row))
+                if len(batch) >= REBUILD_BATCH_SIZE:
+                    DailySalesFact.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            DailySalesFact.objects.bulk_create(batch)
+            written += len(batch)
+            DashboardService.invalidate()
+        return written
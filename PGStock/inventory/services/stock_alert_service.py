@@ -0,0 +1,228 @@
+"""
+Stock Alert Service
+
+Low-stock alerts through a database outbox:
+- Stock movements queue a check of the (product, point of sale) pairs
+  they touched; the check runs after the transaction commits
+- Low inventories get one pending StockAlert per pair, deduplicated over
+  ALERT_DEDUP_WINDOW
+- The send_stock_alerts command mails pending alerts as a single digest,
+  so no sale ever waits on the SMTP server
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .base import BaseService
+from ..models import Inventory, Settings, StockAlert
+
+
+# A pair already alerted within this window is not alerted again
+ALERT_DEDUP_WINDOW = timedelta(hours=24)
+
+DEFAULT_ALERT_RECIPIENTS = ['admin@gestionstock.com']
+
+
+class StockAlertService(BaseService):
+    """
+    Service for detecting and mailing low-stock alerts.
+
+    Detection is cheap (one inventory query and one insert per committed
+    transaction) and never sends mail; delivery is left to the worker.
+    """
+
+    # Failed deliveries before an alert is given up
+    MAX_ATTEMPTS = 3
+
+    def queue_checks(self, pairs: Iterable[Tuple[int, int]]):
+        """
+        Check the given inventories once the current transaction commits.
+
+        Args:
+            pairs: (product_id, point_of_sale_id) pairs touched by stock movements
+        """
+        pairs = {(product_id, pos_id) for product_id, pos_id in pairs if pos_id}
+        if pairs:
+            transaction.on_commit(lambda: self.evaluate(pairs))
+
+    def evaluate(self, pairs: Iterable[Tuple[int, int]]) -> List[StockAlert]:
+        """
+        Queue an alert for each low inventory among the given pairs.
+
+        Args:
+            pairs: (product_id, point_of_sale_id) pairs
+
+        Returns:
+            Alerts created (pairs alerted within the window are skipped)
+        """
+        app_settings = Settings.get_current()
+        if not app_settings or not app_settings.email_notifications:
+            return []
+
+        condition = Q()
+        for product_id, pos_id in pairs:
+            condition |= Q(product_id=product_id, point_of_sale_id=pos_id)
+        if not condition:
+            return []
+
+        low = list(
+            Inventory.objects.filter(condition, quantity__lte=F('reorder_level'))
+            .values_list('product_id', 'point_of_sale_id', 'quantity', 'reorder_level')
+        )
+        if not low:
+            return []
+
+        since = timezone.now() - ALERT_DEDUP_WINDOW
+        already_alerted = set(
+            StockAlert.objects.filter(
+                product_id__in={product_id for product_id, _, _, _ in low},
+                created_at__gte=since,
+            ).exclude(status='resolved').values_list('product_id', 'point_of_sale_id')
+        )
+        alerts = [
+            StockAlert(product_id=product_id, point_of_sale_id=pos_id, quantity=quantity, reorder_level=reorder_level)
+            for product_id, pos_id, quantity, reorder_level in low
+            if (product_id, pos_id) not in already_alerted
+        ]
+        # Une alerte en attente créée en parallèle pour le même couple l'emporte
+        return StockAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+
+    def claim_pending(self) -> List[StockAlert]:
+        """
+        Mark pending alerts as being sent and return them.
+
+        The claim is committed before any mail is sent, so new alerts can
+        be queued while the worker talks to the SMTP server.
+        """
+        alert_ids = list(StockAlert.objects.filter(status='pending').values_list('pk', flat=True))
+        if not alert_ids:
+            return []
+        StockAlert.objects.filter(pk__in=alert_ids, status='pending').update(status='sending', sent_at=timezone.now())
+        return list(
+            StockAlert.objects.filter(pk__in=alert_ids, status='sending')
+            .select_related('product', 'product__supplier', 'point_of_sale')
+            .order_by('point_of_sale__name', 'product__name')
+        )
+
+    def requeue_stale(self, older_than: timedelta) -> int:
+        """
+        Put back alerts left in sending state by a worker that died.
+
+        Args:
+            older_than: Age after which a sending alert is considered abandoned
+
+        Returns:
+            Number of alerts requeued
+        """
+        limit = timezone.now() - older_than
+        requeued = self._requeue(StockAlert.objects.filter(status='sending', sent_at__lt=limit))
+        if requeued:
+            self.log_warning(f"{requeued} stock alert(s) requeued")
+        return requeued
+
+    def send_digest(self) -> int:
+        """
+        Mail all pending alerts in one digest.
+
+        Alerts whose stock recovered since detection are dropped. A failed
+        delivery puts the alerts back in the queue until MAX_ATTEMPTS.
+
+        Returns:
+            Number of alerts sent
+        """
+        alerts = self.claim_pending()
+        if not alerts:
+            return 0
+
+        current = {
+            (product_id, pos_id): (quantity, reorder_level)
+            for product_id, pos_id, quantity, reorder_level in Inventory.objects.filter(
+                product_id__in={alert.product_id for alert in alerts}
+            ).values_list('product_id', 'point_of_sale_id', 'quantity', 'reorder_level')
+        }
+        to_send = []
+        resolved = []
+        for alert in alerts:
+            quantity, reorder_level = current.get((alert.product_id, alert.point_of_sale_id), (0, 0))
+            if quantity > reorder_level:
+                resolved.append(alert.pk)
+            else:
+                alert.quantity, alert.reorder_level = quantity, reorder_level
+                to_send.append(alert)
+        if resolved:
+            StockAlert.objects.filter(pk__in=resolved).update(status='resolved')
+        if not to_send:
+            return 0
+
+        subject, message = self.build_digest(to_send)
+        sent_ids = [alert.pk for alert in to_send]
+        try:
+            send_mail(
+                subject,
+                message,
+                settings.DEFAULT_FROM_EMAIL,
+                getattr(settings, 'LOW_STOCK_ALERT_RECIPIENTS', DEFAULT_ALERT_RECIPIENTS),
+                fail_silently=False,
+            )
+        except Exception as e:
+            self.log_exception(f"Low-stock digest of {len(to_send)} alert(s) failed")
+            failing = StockAlert.objects.filter(pk__in=sent_ids)
+            failing.update(attempts=F('attempts') + 1, error=str(e))
+            failing.filter(attempts__gte=self.MAX_ATTEMPTS).update(status='failed')
+            self._requeue(failing.filter(status='sending'))
+            return 0
+
+        StockAlert.objects.filter(pk__in=sent_ids).update(
+            status='sent', sent_at=timezone.now(), error='',
+        )
+        self.log_info(f"Low-stock digest sent ({len(to_send)} alert(s))")
+        return len(to_send)
+
+    @staticmethod
+    def _requeue(alerts) -> int:
+        """Back to pending, unless a newer pending alert exists for the same pair"""
+        pending = set(
+            StockAlert.objects.filter(status='pending').values_list('product_id', 'point_of_sale_id')
+        )
+        requeued = []
+        superseded = []
+        for alert_id, product_id, pos_id in alerts.values_list('pk', 'product_id', 'point_of_sale_id'):
+            if (product_id, pos_id) in pending:
+                superseded.append(alert_id)
+            else:
+                pending.add((product_id, pos_id))
+                requeued.append(alert_id)
+        StockAlert.objects.filter(pk__in=superseded).update(status='resolved')
+        return StockAlert.objects.filter(pk__in=requeued).update(status='pending', sent_at=None)
+
+    @staticmethod
+    def build_digest(alerts: List[StockAlert]) -> Tuple[str, str]:
+        """Subject and body of the digest, alerts grouped by point of sale"""
+        by_pos = defaultdict(list)
+        for alert in alerts:
+            by_pos[alert.point_of_sale.name].append(alert)
+
+        if len(alerts) == 1:
+            subject = f'⚠️ Alerte Stock Faible: {alerts[0].product.name}'
+        else:
+            subject = f'⚠️ Alerte Stock Faible: {len(alerts)} produits'
+
+        lines = ["Les produits suivants ont atteint un niveau critique.", ""]
+        for pos_name, pos_alerts in by_pos.items():
+            lines.append(f"{pos_name}")
+            for alert in pos_alerts:
+                product = alert.product
+                supplier = product.supplier.name if product.supplier else "votre fournisseur"
+                lines.append(
+                    f"  - {product.name} (SKU: {product.sku}) : stock {alert.quantity}, "
+                    f"seuil {alert.reorder_level} - commander auprès de {supplier}"
+                )
+            lines.append("")
+        return subject, "\n".join(lines)
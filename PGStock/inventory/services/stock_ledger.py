@@ -0,0 +1,251 @@
+"""
+Stock Ledger
+
+Low-level engine that applies stock movements to Inventory rows:
+- Inventory rows are created on demand without get_or_create races
+- Rows are locked with select_for_update in a deterministic order
+- Quantities are changed in the database with F-expressions
+  (no Python read-modify-write, so no lost updates between workers)
+- Per-product totals (ProductStockSummary) are refreshed after each write
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F, Q, Value, Sum, Min, Count
+from django.dispatch import Signal
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import Inventory, ProductStockSummary
+
+
+# (product_id, point_of_sale_id)
+InventoryKey = Tuple[int, int]
+
+INCREASE_TYPES = ('entry', 'return')
+DECREASE_TYPES = ('exit', 'defective')
+
+# Sent once after a batch of movements has been applied (kwargs: movements)
+stock_movements_applied = Signal()
+
+SUMMARY_FIELDS = [
+    'total_quantity', 'pos_count', 'min_reorder_level',
+    'low_stock_count', 'in_stock_count', 'status', 'updated_at',
+]
+
+
+class StockLedger:
+    """
+    Applies stock movements to inventory rows.
+
+    Every write is an atomic UPDATE on a locked row, so several workers
+    can run in parallel on PostgreSQL without losing updates. Locks are
+    always taken in (product_id, point_of_sale_id) order to avoid
+    deadlocks between crossed transfers.
+    """
+
+    @staticmethod
+    def sort_keys(keys: Iterable[InventoryKey]) -> List[InventoryKey]:
+        """Return unique keys in lock order"""
+        return sorted(set(keys))
+
+    @staticmethod
+    def ensure_inventories(keys: Iterable[InventoryKey]):
+        """
+        Create missing inventory rows (quantity 0).
+
+        ignore_conflicts keeps this safe when another worker creates the
+        same row concurrently (unique product/point_of_sale constraint).
+        """
+        keys = StockLedger.sort_keys(keys)
+        if not keys:
+            return
+        Inventory.objects.bulk_create(
+            [Inventory(product_id=product_id, point_of_sale_id=pos_id, quantity=0)
+             for product_id, pos_id in keys],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def _keys_filter(keys: List[InventoryKey]) -> Q:
+        condition = Q()
+        for product_id, pos_id in keys:
+            condition |= Q(product_id=product_id, point_of_sale_id=pos_id)
+        return condition
+
+    @staticmethod
+    def lock_inventories(keys: Iterable[InventoryKey], create_missing: bool = True) -> Dict[InventoryKey, Inventory]:
+        """
+        Lock (SELECT ... FOR UPDATE) the requested inventory rows.
+
+        Must be called inside a transaction.
+
+        Args:
+            keys: (product_id, point_of_sale_id) pairs
+            create_missing: Create absent rows before locking
+
+        Returns:
+            Dict {(product_id, point_of_sale_id): Inventory}
+        """
+        keys = StockLedger.sort_keys(keys)
+        if not keys:
+            return {}
+        if create_missing:
+            StockLedger.ensure_inventories(keys)
+
+        rows = (
+            Inventory.objects
+            .select_for_update()
+            .filter(StockLedger._keys_filter(keys))
+            .order_by('product_id', 'point_of_sale_id')
+        )
+        return {(inv.product_id, inv.point_of_sale_id): inv for inv in rows}
+
+    @staticmethod
+    def movement_operations(movement_type: str, units: int, from_pos_id: int,
+                            to_pos_id: Optional[int] = None) -> List[Tuple[int, str, int]]:
+        """
+        Translate a movement into elementary inventory operations.
+
+        Returns:
+            List of (point_of_sale_id, operation, units) where operation is
+            'add', 'remove' (floored at 0) or 'set'.
+        """
+        if movement_type in INCREASE_TYPES:
+            return [(from_pos_id, 'add', units)]
+        if movement_type in DECREASE_TYPES:
+            return [(from_pos_id, 'remove', units)]
+        if movement_type == 'transfer':
+            operations = [(from_pos_id, 'remove', units)]
+            if to_pos_id:
+                operations.append((to_pos_id, 'add', units))
+            return operations
+        if movement_type == 'adjustment':
+            return [(from_pos_id, 'set', units)]
+        return []
+
+    @staticmethod
+    def movement_keys(movement) -> List[InventoryKey]:
+        """Return the inventory keys touched by a movement, in lock order"""
+        keys = [(movement.product_id, movement.from_point_of_sale_id)]
+        if movement.movement_type == 'transfer' and movement.to_point_of_sale_id:
+            keys.append((movement.product_id, movement.to_point_of_sale_id))
+        return StockLedger.sort_keys(keys)
+
+    @staticmethod
+    def apply_operation(quantity: int, operation: str, units: int) -> int:
+        """Python counterpart of _quantity_expression, for locked snapshots"""
+        if operation == 'add':
+            return quantity + units
+        if operation == 'remove':
+            return max(0, quantity - units)
+        return units
+
+    @staticmethod
+    def _quantity_expression(operation: str, units: int):
+        if operation == 'add':
+            return F('quantity') + units
+        if operation == 'remove':
+            return Greatest(F('quantity') - units, Value(0))
+        return Value(units)
+
+    @staticmethod
+    @transaction.atomic
+    def apply_movement(movement) -> Dict[int, Inventory]:
+        """
+        Apply a saved StockMovement to the inventory.
+
+        Args:
+            movement: StockMovement instance
+
+        Returns:
+            Dict {point_of_sale_id: Inventory} with refreshed quantities
+        """
+        units = movement.quantity
+        if movement.is_wholesale:
+            units = movement.quantity * movement.product.units_per_box
+
+        operations = StockLedger.movement_operations(
+            movement.movement_type,
+            units,
+            movement.from_point_of_sale_id,
+            movement.to_point_of_sale_id,
+        )
+        keys = [(movement.product_id, pos_id) for pos_id, _, _ in operations]
+        locked = StockLedger.lock_inventories(keys)
+
+        now = timezone.now()
+        for pos_id, operation, op_units in operations:
+            Inventory.objects.filter(pk=locked[(movement.product_id, pos_id)].pk).update(
+                quantity=StockLedger._quantity_expression(operation, op_units),
+                last_updated=now
+            )
+
+        StockLedger.refresh_summaries([movement.product_id])
+
+        inventories = {}
+        for (product_id, pos_id), inventory in locked.items():
+            inventory.refresh_from_db(fields=['quantity', 'last_updated'])
+            inventories[pos_id] = inventory
+        return inventories
+
+    @staticmethod
+    def refresh_summaries(product_ids: Iterable[int], create_missing: bool = True) -> List[ProductStockSummary]:
+        """
+        Recompute the stock summary of the given products.
+
+        One grouped query over Inventory, then one upsert.
+
+        Args:
+            product_ids: Products whose inventory rows changed
+            create_missing: Insert absent summaries. Pass False while
+                inventory rows are being deleted (the product itself may be
+                in the middle of a cascade delete).
+
+        Returns:
+            The refreshed summaries
+        """
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return []
+
+        totals = {
+            row['product_id']: row
+            for row in Inventory.objects.filter(product_id__in=product_ids).order_by().values('product_id').annotate(
+                total_quantity=Sum('quantity'),
+                pos_count=Count('id'),
+                min_reorder_level=Min('reorder_level'),
+                low_stock_count=Count('id', filter=Q(quantity__gt=0, quantity__lte=F('reorder_level'))),
+                in_stock_count=Count('id', filter=Q(quantity__gt=F('reorder_level'))),
+            )
+        }
+
+        now = timezone.now()
+        summaries = []
+        for product_id in product_ids:
+            row = totals.get(product_id)
+            summary = ProductStockSummary(product_id=product_id, updated_at=now)
+            if row is not None:
+                summary.total_quantity = row['total_quantity']
+                summary.pos_count = row['pos_count']
+                summary.min_reorder_level = row['min_reorder_level']
+                summary.low_stock_count = row['low_stock_count']
+                summary.in_stock_count = row['in_stock_count']
+            summary.status = ProductStockSummary.compute_status(summary.total_quantity, summary.min_reorder_level)
+            summaries.append(summary)
+
+        if create_missing:
+            ProductStockSummary.objects.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=SUMMARY_FIELDS,
+            )
+        else:
+            existing = set(
+                ProductStockSummary.objects.filter(product_id__in=product_ids).values_list('product_id', flat=True)
+            )
+            summaries = [summary for summary in summaries if summary.product_id in existing]
+            ProductStockSummary.objects.bulk_update(summaries, SUMMARY_FIELDS)
+        return summaries
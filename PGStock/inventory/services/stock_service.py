@@ -13,8 +13,10 @@ from typing import Optional, Dict, Any, List
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 from .base import BaseService, ServiceException
+from .stock_ledger import StockLedger, stock_movements_applied
 from ..models import (
     Product, Inventory, PointOfSale, StockMovement
 )
@@ -99,6 +101,87 @@ class StockService(BaseService):
         
         return movement
     
+    @transaction.atomic
+    def apply_movements(
+        self,
+        batch: List[StockMovement],
+        validate: bool = True
+    ) -> List[StockMovement]:
+        """
+        Apply a batch of unsaved stock movements in a constant number of queries.
+        
+        All touched inventory rows are locked once (in ledger order), every
+        line is validated against that snapshot as if the movements were
+        created one by one, then movements are bulk-created and inventories
+        bulk-updated. A single `stock_movements_applied` signal is sent for
+        the whole batch (low stock alerts, reports).
+        
+        Args:
+            batch: Unsaved StockMovement instances
+            validate: Run StockMovement.validate_against on each line
+            
+        Returns:
+            The created StockMovements
+            
+        Raises:
+            ValidationError: If a line fails validation (nothing is written)
+        """
+        if not batch:
+            return []
+        
+        units_per_box = dict(
+            Product.objects.filter(
+                id__in={movement.product_id for movement in batch}
+            ).values_list('id', 'units_per_box')
+        )
+        
+        operations = []
+        keys = []
+        for movement in batch:
+            # Les entrées sont toujours en gros (cf. StockMovement.save)
+            if movement.movement_type == 'entry':
+                movement.is_wholesale = True
+            units = movement.quantity
+            if movement.is_wholesale:
+                units = movement.quantity * units_per_box[movement.product_id]
+            movement_ops = StockLedger.movement_operations(
+                movement.movement_type, units,
+                movement.from_point_of_sale_id, movement.to_point_of_sale_id
+            )
+            operations.append(movement_ops)
+            keys.extend((movement.product_id, pos_id) for pos_id, _, _ in movement_ops)
+        
+        # Instantané verrouillé: lignes existantes, puis création des manquantes
+        existing_keys = set(StockLedger.lock_inventories(keys, create_missing=False))
+        snapshot = StockLedger.lock_inventories(keys)
+        
+        touched_keys = set(existing_keys)
+        for movement, movement_ops in zip(batch, operations):
+            if validate:
+                source_key = (movement.product_id, movement.from_point_of_sale_id)
+                movement.validate_against(snapshot[source_key] if source_key in touched_keys else None)
+            for pos_id, operation, units in movement_ops:
+                key = (movement.product_id, pos_id)
+                inventory = snapshot[key]
+                inventory.quantity = StockLedger.apply_operation(inventory.quantity, operation, units)
+                touched_keys.add(key)
+        
+        movements = StockMovement.objects.bulk_create(batch)
+        
+        now = timezone.now()
+        changed = [snapshot[key] for key in StockLedger.sort_keys(keys)]
+        for inventory in changed:
+            inventory.last_updated = now
+        Inventory.objects.bulk_update(changed, ['quantity', 'last_updated'])
+        StockLedger.refresh_summaries(movement.product_id for movement in movements)
+        
+        self.log_info(
+            f"Stock batch applied: {len(movements)} movements, {len(changed)} inventories updated"
+        )
+        
+        stock_movements_applied.send(sender=StockMovement, movements=movements)
+        return movements
+    
     def _validate_movement_params(
         self,
         product: Product,
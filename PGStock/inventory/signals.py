@@ -1,41 +1,79 @@
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
-from .models import StockMovement, Invoice, Payment, Expense
-from .utils import check_and_send_low_stock_alert
+from .models import (
+    StockMovement, Invoice, InvoiceItem, Expense, PointOfSale, Settings,
+    Product, Category, Supplier, Client, Inventory
+)
 from .services.finance_service import FinanceService
+from .services.stock_ledger import StockLedger, stock_movements_applied
+from .services.dashboard_service import DashboardService
+from .services.catalogue_service import CatalogueService
+from .services.stock_alert_service import StockAlertService
+from .services.sales_fact_service import SalesFactService, SALES_STATUSES
 
 @receiver(post_save, sender=StockMovement)
 def check_stock_after_movement(sender, instance, created, **kwargs):
     """
-    Trigger low stock check after any stock movement.
+    Trigger low stock check (after commit) for the inventories the movement touched.
+    The alert itself is mailed by the send_stock_alerts worker.
     """
-    if created:
-        check_and_send_low_stock_alert(instance.product)
+    if created and not kwargs.get('raw'):
+        StockAlertService().queue_checks(StockLedger.movement_keys(instance))
+
+@receiver(stock_movements_applied, sender=StockMovement)
+def check_stock_after_movement_batch(sender, movements, **kwargs):
+    """
+    Trigger low stock check once for all inventories touched by a batch of movements.
+    """
+    StockAlertService().queue_checks(
+        key for movement in movements for key in StockLedger.movement_keys(movement)
+    )
 
 @receiver(post_save, sender=Invoice)
-def update_profit_report_on_invoice(sender, instance, **kwargs):
-    """Met à jour le rapport financier quand une facture est modifiée"""
-    if instance.status in ['paid', 'sent'] and instance.point_of_sale:
-        FinanceService.generate_monthly_report(
-            instance.date_issued.month, 
-            instance.date_issued.year, 
-            instance.point_of_sale
-        )
+def update_profit_report_on_invoice(sender, instance, update_fields=None, **kwargs):
+    """
+    Met à jour le rapport financier quand une facture est modifiée.
+    
+    Seul le delta de la facture est appliqué au rapport (pas de recalcul du mois).
+    Un paiement qui change le statut passe aussi par ici via Invoice.update_status().
+    """
+    # Le marquage du stock déduit ne change rien aux montants
+    if update_fields is not None and set(update_fields) <= {'stock_deducted'}:
+        return
+    # Chargement de fixtures : les lignes ne sont pas encore là, on reconstruira à la lecture
+    if kwargs.get('raw'):
+        if instance.point_of_sale_id:
+            FinanceService.mark_reports_stale(
+                instance.date_issued.month, instance.date_issued.year, [instance.point_of_sale_id]
+            )
+        return
+    # Écriture groupée (FinanceService.deferred_invoice_sync) : rapport mis à jour après le commit
+    if FinanceService.defer_invoice_sync(instance.pk):
+        return
+    FinanceService.sync_invoice_report(instance)
 
-@receiver(post_save, sender=Payment)
-def update_profit_report_on_payment(sender, instance, **kwargs):
-    """Met à jour le rapport financier lors d'un paiement (peut changer le statut de la facture)"""
-    invoice = instance.invoice
-    if invoice.status in ['paid', 'sent'] and invoice.point_of_sale:
-        FinanceService.generate_monthly_report(
-            invoice.date_issued.month, 
-            invoice.date_issued.year, 
-            invoice.point_of_sale
-        )
+@receiver(post_save, sender=InvoiceItem)
+@receiver(post_delete, sender=InvoiceItem)
+def mark_profit_report_on_invoice_item_change(sender, instance, **kwargs):
+    """
+    Une ligne modifiée rend la contribution de sa facture périmée jusqu'au
+    prochain calcul des totaux (qui déclenche update_profit_report_on_invoice).
+    """
+    FinanceService.mark_invoice_items_changed(instance.invoice_id)
+
+@receiver(pre_delete, sender=Invoice)
+def update_profit_report_on_invoice_delete(sender, instance, **kwargs):
+    """Retire la contribution d'une facture supprimée de son rapport"""
+    FinanceService.remove_invoice_from_report(instance)
 
 @receiver(post_save, sender=Expense)
 def update_profit_report_on_expense(sender, instance, **kwargs):
     """Met à jour le rapport financier lors d'une nouvelle dépense ou modification"""
+    if kwargs.get('raw'):
+        if instance.point_of_sale_id:
+            FinanceService.mark_reports_stale(instance.date.month, instance.date.year, [instance.point_of_sale_id])
+        return
     FinanceService.recalculate_report_for_expense(instance)
     
     # Si la date ou le POS a changé, on recalcule aussi l'ancien rapport
@@ -58,3 +96,126 @@ def handle_expense_changes(sender, instance, **kwargs):
 def update_profit_report_on_expense_delete(sender, instance, **kwargs):
     """Met à jour le rapport financier après la suppression d'une dépense"""
     FinanceService.recalculate_report_for_expense(instance)
+
+
+# ==================== PERMISSIONS MÉMORISÉES ====================
+
+def _forget_user_permissions(user):
+    """Oublie le rôle mémorisé sur l'instance (modifiée pendant la requête)"""
+    user.__dict__.pop('_inventory_permissions', None)
+
+@receiver(post_save, sender=User)
+def invalidate_permissions_on_user_save(sender, instance, **kwargs):
+    """is_superuser / is_staff peuvent avoir changé"""
+    _forget_user_permissions(instance)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_permissions_on_group_membership(sender, instance, action, reverse, **kwargs):
+    """Ajout ou retrait de groupes depuis l'utilisateur (user.groups.add())"""
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        _forget_user_permissions(instance)
+
+
+# ==================== CACHE DES PARAMÈTRES ====================
+
+@receiver(post_save, sender=Settings)
+@receiver(post_delete, sender=Settings)
+def clear_settings_cache(sender, **kwargs):
+    """Le singleton Settings est relu à la prochaine demande"""
+    Settings.clear_cache()
+
+
+
+# ==================== RÉSUMÉ DU STOCK PAR PRODUIT ====================
+
+@receiver(post_save, sender=Product)
+def create_stock_summary(sender, instance, created, **kwargs):
+    """Un nouveau produit démarre avec un résumé vide (rupture de stock)"""
+    if created:
+        StockLedger.refresh_summaries([instance.pk])
+
+@receiver(post_save, sender=Inventory)
+def refresh_stock_summary_on_inventory_save(sender, instance, **kwargs):
+    """
+    Inventaire modifié hors du registre (formulaires, configuration en masse).
+    Les mouvements appliqués par le registre rafraîchissent eux-mêmes le résumé.
+    """
+    StockLedger.refresh_summaries([instance.product_id])
+
+@receiver(post_delete, sender=Inventory)
+def refresh_stock_summary_on_inventory_delete(sender, instance, **kwargs):
+    """Mise à jour seulement : le produit peut être en cours de suppression"""
+    StockLedger.refresh_summaries([instance.product_id], create_missing=False)
+
+# ==================== CATALOGUE PRODUITS DU POS ====================
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_pos_catalogue(sender, instance, **kwargs):
+    """Seule la ligne du produit modifié est remplacée dans le catalogue"""
+    CatalogueService.refresh_products([instance.pk])
+
+# ==================== INSTANTANÉ DU TABLEAU DE BORD ====================
+
+DASHBOARD_MODELS = (
+    Product, Category, Supplier, Client, Inventory, Invoice, InvoiceItem, StockMovement, PointOfSale
+)
+
+def invalidate_dashboard(sender, **kwargs):
+    """Toute écriture sur une donnée affichée périme les instantanés du tableau de bord"""
+    DashboardService.invalidate()
+
+for model in DASHBOARD_MODELS:
+    post_save.connect(invalidate_dashboard, sender=model, dispatch_uid=f'dashboard_{model.__name__}_save')
+    post_delete.connect(invalidate_dashboard, sender=model, dispatch_uid=f'dashboard_{model.__name__}_delete')
+
+# Le registre applique les mouvements par UPDATE (sans post_save sur Inventory)
+stock_movements_applied.connect(invalidate_dashboard, sender=StockMovement, dispatch_uid='dashboard_movements_applied')
+
+
+# ==================== VENTES JOURNALIÈRES ====================
+
+@receiver(pre_save, sender=Invoice)
+def remember_invoice_sales_day(sender, instance, update_fields=None, **kwargs):
+    """Mémorise le statut, le jour et le POS enregistrés avant la modification"""
+    instance._previous_sales_day = None
+    if update_fields is not None and set(update_fields) <= {'stock_deducted'}:
+        return
+    if instance.pk and not kwargs.get('raw'):
+        instance._previous_sales_day = (
+            Invoice.objects.filter(pk=instance.pk)
+            .values_list('status', 'date_issued', 'point_of_sale_id')
+            .first()
+        )
+
+@receiver(post_save, sender=Invoice)
+def refresh_sales_facts_on_invoice(sender, instance, update_fields=None, **kwargs):
+    """Recalcule après le commit les jours touchés (ancien et nouveau) d'une facture vendue"""
+    if update_fields is not None and set(update_fields) <= {'stock_deducted'}:
+        return
+    days = set()
+    if instance.status in SALES_STATUSES:
+        days.add((instance.date_issued, instance.point_of_sale_id))
+    previous = getattr(instance, '_previous_sales_day', None)
+    if previous and previous[0] in SALES_STATUSES:
+        days.add(previous[1:])
+    if days:
+        SalesFactService.queue_refresh(days)
+
+@receiver(post_delete, sender=Invoice)
+def refresh_sales_facts_on_invoice_delete(sender, instance, **kwargs):
+    """Retire les ventes d'une facture supprimée de son jour"""
+    if instance.status in SALES_STATUSES:
+        SalesFactService.queue_refresh([(instance.date_issued, instance.point_of_sale_id)])
+
+@receiver(post_save, sender=InvoiceItem)
+@receiver(post_delete, sender=InvoiceItem)
+def refresh_sales_facts_on_invoice_item_change(sender, instance, **kwargs):
+    """Une ligne modifiée sur une facture vendue : son jour est recalculé après le commit"""
+    invoice = (
+        Invoice.objects.filter(pk=instance.invoice_id)
+        .values_list('status', 'date_issued', 'point_of_sale_id')
+        .first()
+    )
+    if invoice and invoice[0] in SALES_STATUSES:
+        SalesFactService.queue_refresh([invoice[1:]])
@@ -0,0 +1,67 @@
+"""
+Stockage privé des fichiers générés ou importés.
+
+Les rapports PDF et les classeurs importés contiennent des prix d'achat et
+des marges : ils sont rangés sous PRIVATE_MEDIA_ROOT, hors de MEDIA_ROOT
+(servi tel quel par static()), et ne sont lus que par les vues qui
+vérifient les droits (FileResponse). Les noms de fichiers sont aléatoires.
+"""
+
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+
+@deconstructible
+class PrivateFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage sous PRIVATE_MEDIA_ROOT, sans URL publique"""
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    @cached_property
+    def base_url(self):
+        # url() lève ValueError : ces fichiers ne passent que par les vues
+        return None
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+
+private_storage = PrivateFileSystemStorage()
+
+
+def _random_name(folder, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{folder}/{timezone.now():%Y/%m}/{uuid.uuid4().hex}{extension}"
+
+
+def report_upload_to(instance, filename):
+    """reports/AAAA/MM/<aléatoire>.pdf (le nom affiché est gardé dans ReportJob.filename)"""
+    return _random_name('reports', filename)
+
+
+def import_upload_to(instance, filename):
+    """imports/AAAA/MM/<aléatoire>.xlsx (le nom d'origine est gardé dans ImportJob.original_name)"""
+    return _random_name('imports', filename)
+
+
+def move_to_private_storage(name):
+    """Déplace un fichier enregistré avant le stockage privé depuis MEDIA_ROOT (migrations)"""
+    source = os.path.join(settings.MEDIA_ROOT, name)
+    if not name or not os.path.isfile(source):
+        return False
+    target = private_storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+    return True
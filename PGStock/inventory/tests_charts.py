@@ -0,0 +1,117 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, DataVersion, Inventory, PointOfSale, Product, StockMovement, UserProfile
+from .services.dashboard_service import DashboardService
+
+
+class ChartApiTests(TestCase):
+    """Chart APIs are cached per (chart, params, POS scope) and revalidated with ETag / Last-Modified"""
+
+    def setUp(self):
+        cache.clear()
+        staff_group, _ = Group.objects.get_or_create(name='STAFF')
+        self.admin = User.objects.create_superuser(username='chartadmin', password='password', email='c@example.com')
+        self.staff = User.objects.create_user(username='chartstaff', password='password')
+        self.staff.groups.add(staff_group)
+        self.pos = PointOfSale.objects.create(name="Chart Store", code="CHART")
+        UserProfile.objects.update_or_create(user=self.staff, defaults={'point_of_sale': self.pos})
+
+        self.category = Category.objects.create(name="Chart Category")
+        self.product = Product.objects.create(
+            name="Chart Product", sku="CHART-001", category=self.category, selling_price=Decimal('10.00')
+        )
+        Inventory.objects.create(product=self.product, point_of_sale=self.pos, quantity=40, reorder_level=0)
+        self.client.login(username='chartadmin', password='password')
+
+    def move(self, movement_type, quantity, days_ago=0):
+        movement = StockMovement.objects.create(
+            product=self.product, movement_type=movement_type, quantity=quantity,
+            from_point_of_sale=self.pos, user=self.admin,
+        )
+        if days_ago:
+            StockMovement.objects.filter(pk=movement.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+
+    def test_stock_evolution_in_one_grouped_query(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.move('entry', 10, days_ago=2)
+            self.move('exit', 4)
+            self.move('return', 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('inventory:api_stock_evolution'), {'days': 7}).json()
+        movement_queries = [
+            q for q in queries.captured_queries if 'inventory_stockmovement' in q['sql'] and 'SUM(' in q['sql']
+        ]
+        self.assertEqual(len(movement_queries), 1)
+
+        self.assertEqual(len(data['labels']), 8)
+        self.assertEqual(data['labels'][-1], timezone.localdate().strftime('%d/%m'))
+        self.assertEqual(data['entries'][-3], 10)
+        self.assertEqual((data['entries'][-1], data['exits'][-1]), (1, 4))
+        self.assertEqual(sum(data['exits']), 4)
+
+    def test_unchanged_data_is_not_modified(self):
+        url = reverse('inventory:api_category_distribution')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'labels': ['Chart Category'], 'data': [40]})
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Une ligne de version lue, aucune table du graphique
+        self.assertEqual(len([q for q in queries.captured_queries if 'inventory_dataversion' in q['sql']]), 1)
+        self.assertFalse([q for q in queries.captured_queries if 'inventory_inventory' in q['sql']])
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.move('entry', 5)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data'], [45])
+
+    def test_cache_is_scoped_by_params_and_user(self):
+        url = reverse('inventory:api_stock_evolution')
+        etag = self.client.get(url, {'days': 7})['ETag']
+        self.assertNotEqual(self.client.get(url, {'days': 14})['ETag'], etag)
+
+        self.client.login(username='chartstaff', password='password')
+        response = self.client.get(url, {'days': 7}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_validators_follow_the_shared_version(self):
+        url = reverse('inventory:api_stock_evolution')
+        self.move('entry', 3, days_ago=1)
+        etag = self.client.get(url)['ETag']
+
+        # Écriture d'un autre processus : seule la version en base change, pas ce cache
+        with mock.patch.object(DashboardService, 'invalidate'):
+            self.move('exit', 2)
+        DataVersion.next_value(DataVersion.DASHBOARD)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['exits'][-1], 2)
+
+        # Les suppressions passent par les mêmes signaux
+        url = reverse('inventory:api_category_distribution')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Inventory.objects.get(product=self.product, point_of_sale=self.pos).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], [])
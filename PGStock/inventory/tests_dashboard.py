@@ -0,0 +1,294 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import (
+    Category, Product, PointOfSale, Inventory, Client, Invoice, Receipt, Supplier, UserProfile, DailySalesFact
+)
+from .services import DashboardService, InvoiceService
+
+
+class DashboardSnapshotTests(TestCase):
+    """Dashboard tiles are served from a cached snapshot per (role, POS)"""
+
+    def setUp(self):
+        cache.clear()
+        admin_group, _ = Group.objects.get_or_create(name='Admin')
+        staff_group, _ = Group.objects.get_or_create(name='STAFF')
+        self.admin = User.objects.create_user(username='dashadmin', password='password')
+        self.admin.groups.add(admin_group)
+        self.staff = User.objects.create_user(username='dashstaff', password='password')
+        self.staff.groups.add(staff_group)
+
+        self.pos = PointOfSale.objects.create(name="Dash Store", code="DASH")
+        self.pos_b = PointOfSale.objects.create(name="Dash Store B", code="DASH_B")
+        UserProfile.objects.update_or_create(user=self.staff, defaults={'point_of_sale': self.pos})
+
+        category = Category.objects.create(name="Dash Category")
+        self.product = Product.objects.create(
+            name="Dash Product", sku="DASH-001", category=category,
+            purchase_price=Decimal('100.00'), selling_price=Decimal('150.00')
+        )
+        Inventory.objects.create(product=self.product, point_of_sale=self.pos, quantity=10, reorder_level=2)
+        Inventory.objects.create(product=self.product, point_of_sale=self.pos_b, quantity=2, reorder_level=5)
+        self.client_obj = Client.objects.create(name="Dash Client")
+
+    def make_invoice(self, number, pos, status='paid', amount=Decimal('1000.00')):
+        return Invoice.objects.create(
+            invoice_number=number, client=self.client_obj, point_of_sale=pos,
+            date_issued=date(2025, 5, 2), date_due=date(2025, 5, 2), status=status,
+            total_amount=amount, created_by=self.admin
+        )
+
+    def test_snapshot_values(self):
+        self.make_invoice('INV-DASH-1', self.pos)
+        self.make_invoice('INV-DASH-2', self.pos_b, status='sent')
+
+        snapshot = DashboardService.get_snapshot(self.admin)
+        self.assertEqual(snapshot['total_stock_value'], Decimal('1800.00'))
+        self.assertEqual(snapshot['total_estimated_profit'], Decimal('600.00'))
+        self.assertEqual(snapshot['low_stock_count'], 1)
+        self.assertEqual(snapshot['total_sales'], Decimal('1000.00'))
+        self.assertEqual(snapshot['pending_orders'], 1)
+        self.assertEqual(snapshot['recent_sales_count'], 2)
+        codes = [pos['code'] for pos in snapshot['stock_by_pos']]
+        self.assertIn('DASH', codes)
+        self.assertIn('DASH_B', codes)
+
+        # STAFF : limité à son point de vente
+        snapshot = DashboardService.get_snapshot(self.staff)
+        self.assertEqual(snapshot['pending_orders'], 0)
+        self.assertEqual(snapshot['recent_sales_count'], 1)
+        self.assertEqual(snapshot['low_stock_list_count'], 0)
+        self.assertEqual([pos['code'] for pos in snapshot['stock_by_pos']], ['DASH'])
+
+    def test_warm_snapshot_does_not_query(self):
+        DashboardService.get_snapshot(self.admin)
+        with self.assertNumQueries(1):  # version partagée
+            DashboardService.get_snapshot(self.admin)
+
+    def test_writes_invalidate_snapshot(self):
+        self.assertEqual(DashboardService.get_snapshot(self.admin)['total_sales'], Decimal('0.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_invoice('INV-DASH-3', self.pos)
+        self.assertEqual(DashboardService.get_snapshot(self.admin)['total_sales'], Decimal('1000.00'))
+
+    def test_view_query_count_does_not_grow_with_data(self):
+        self.client.login(username='dashadmin', password='password')
+        url = reverse('inventory:dashboard')
+
+        def count_queries():
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        self.make_invoice('INV-DASH-20', self.pos)
+        baseline = count_queries()
+        for i in range(5):
+            self.make_invoice(f'INV-DASH-1{i}', self.pos)
+        cache.clear()
+        self.assertEqual(count_queries(), baseline)
+
+
+class InvoiceStatisticsTests(TestCase):
+    """Counts and totals per status come from a single conditional aggregate"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='statsuser', password='password')
+        pos = PointOfSale.objects.create(name="Stats Store", code="STATS")
+        client = Client.objects.create(name="Stats Client")
+        for number, status, amount, due in [
+            ('INV-STAT-1', 'paid', Decimal('100.00'), date(2025, 1, 10)),
+            ('INV-STAT-2', 'paid', Decimal('50.00'), date(2025, 1, 10)),
+            ('INV-STAT-3', 'sent', Decimal('70.00'), date(2025, 1, 10)),
+            ('INV-STAT-4', 'draft', Decimal('30.00'), date(2025, 3, 10)),
+            ('INV-STAT-5', 'cancelled', Decimal('20.00'), date(2025, 1, 10)),
+        ]:
+            Invoice.objects.create(
+                invoice_number=number, client=client, point_of_sale=pos,
+                date_issued=date(2025, 1, 1), date_due=due, status=status,
+                total_amount=amount, created_by=user
+            )
+
+    def test_statistics_per_status(self):
+        with self.assertNumQueries(1):
+            stats = InvoiceService.get_statistics(today=date(2025, 2, 1))
+
+        self.assertEqual(stats['paid'], {'count': 2, 'total': Decimal('150.00')})
+        self.assertEqual(stats['sent'], {'count': 1, 'total': Decimal('70.00')})
+        self.assertEqual(stats['pending'], {'count': 2, 'total': Decimal('100.00')})
+        self.assertEqual(stats['overdue'], {'count': 1, 'total': Decimal('70.00')})
+        self.assertEqual(stats['all'], {'count': 5, 'total': Decimal('270.00')})
+
+    def test_statistics_respect_queryset_filters(self):
+        stats = InvoiceService.get_statistics(Invoice.objects.filter(status='cancelled'))
+        self.assertEqual(stats['paid'], {'count': 0, 'total': Decimal('0.00')})
+        self.assertEqual(stats['cancelled'], {'count': 1, 'total': Decimal('20.00')})
+
+    def test_report_pages_use_statistics(self):
+        admin_group, _ = Group.objects.get_or_create(name='Admin')
+        User.objects.get(username='statsuser').groups.add(admin_group)
+        self.client.login(username='statsuser', password='password')
+
+        response = self.client.get(reverse('inventory:reports'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['pending_invoices_count'], 1)
+        self.assertEqual(response.context['total_sales'], Decimal('150.00'))
+
+        response = self.client.get(reverse('inventory:advanced_reports'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['invoice_stats']['pending']['count'], 2)
+        self.assertEqual(len(response.context['invoices_paid']), 2)
+
+
+class ReportsViewDailyStatsTests(TestCase):
+    """Daily sales/purchases per POS come from one grouped query per source"""
+
+    def setUp(self):
+        admin_group, _ = Group.objects.get_or_create(name='Admin')
+        self.user = User.objects.create_user(username='dailyadmin', password='password')
+        self.user.groups.add(admin_group)
+        self.client_obj = Client.objects.create(name="Daily Client")
+        self.supplier = Supplier.objects.create(name="Daily Supplier")
+        self.sequence = 0
+        self.client.login(username='dailyadmin', password='password')
+
+    def add_shop(self, code, day):
+        self.sequence += 1
+        pos = PointOfSale.objects.create(name=f"Daily {code}", code=code)
+        for amount in (Decimal('100.00'), Decimal('50.00')):
+            self.sequence += 1
+            Invoice.objects.create(
+                invoice_number=f'INV-DAILY-{self.sequence}', client=self.client_obj, point_of_sale=pos,
+                date_issued=day, date_due=day, status='paid', total_amount=amount, created_by=self.user
+            )
+        Receipt.objects.create(
+            receipt_number=f'REC-DAILY-{self.sequence}', supplier=self.supplier, point_of_sale=pos,
+            date_received=day, status='validated', total_amount=Decimal('40.00'), created_by=self.user
+        )
+        return pos
+
+    def get_reports(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('inventory:reports'), {
+                'start_date': '2025-06-01', 'end_date': '2025-06-30'
+            })
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_daily_matrix(self):
+        pos_a = self.add_shop('DAY_A', date(2025, 6, 1))
+        self.add_shop('DAY_B', date(2025, 6, 1))
+        self.add_shop('DAY_C', date(2025, 6, 2))
+        self.add_shop('DAY_OLD', date(2025, 5, 1))
+
+        response, _ = self.get_reports()
+        daily = {day['date']: day for day in response.context['daily_stats']}
+        self.assertEqual(list(daily), [date(2025, 6, 2), date(2025, 6, 1)])
+        self.assertEqual(daily[date(2025, 6, 1)]['sales'], Decimal('300.00'))
+        self.assertEqual(daily[date(2025, 6, 1)]['purchases'], Decimal('80.00'))
+        self.assertEqual(daily[date(2025, 6, 1)]['profit'], Decimal('220.00'))
+        self.assertEqual(response.context['total_purchases'], Decimal('120.00'))
+
+        pos_stats = {stat['pos'].code: stat for stat in response.context['pos_stats']}
+        self.assertEqual(set(pos_stats), {'DAY_A', 'DAY_B', 'DAY_C'})
+        self.assertEqual(pos_stats['DAY_A']['pos'], pos_a)
+        self.assertEqual(pos_stats['DAY_A']['total_sales'], Decimal('150.00'))
+        self.assertEqual(pos_stats['DAY_A']['total_purchases'], Decimal('40.00'))
+
+    def test_query_count_does_not_grow_with_shops(self):
+        self.add_shop('DAY_1', date(2025, 6, 3))
+        self.get_reports()
+        _, baseline = self.get_reports()
+        for i in range(2, 6):
+            self.add_shop(f'DAY_{i}', date(2025, 6, i))
+        _, queries = self.get_reports()
+        self.assertEqual(queries, baseline)
+
+
+class ProductSalesTypeApiTests(TestCase):
+    """The wholesale/retail chart is one grouped query over the daily sales table"""
+
+    def setUp(self):
+        cache.clear()
+        staff_group, _ = Group.objects.get_or_create(name='STAFF')
+        self.admin = User.objects.create_superuser(username='salestypeadmin', password='password', email='s@example.com')
+        self.staff = User.objects.create_user(username='salestypestaff', password='password')
+        self.staff.groups.add(staff_group)
+        self.pos = PointOfSale.objects.create(name="Type Store", code="TYPE")
+        self.pos_b = PointOfSale.objects.create(name="Type Store B", code="TYPE_B")
+        UserProfile.objects.update_or_create(user=self.staff, defaults={'point_of_sale': self.pos})
+
+        category = Category.objects.create(name="Type Category")
+        # Deux produits homonymes restent distincts
+        self.products = [
+            Product.objects.create(
+                name="Savon" if i < 2 else f"Produit {i}", sku=f"TYPE-{i:03d}", category=category,
+                selling_price=Decimal('10.00')
+            )
+            for i in range(8)
+        ]
+        for i, product in enumerate(self.products):
+            self.add_fact(product, self.pos, date(2025, 6, 1), False, 10 + i)
+            self.add_fact(product, self.pos_b, date(2025, 6, 5), True, i)
+
+    def add_fact(self, product, pos, day, is_wholesale, quantity):
+        DailySalesFact.objects.create(
+            date=day, point_of_sale=pos, product=product, is_wholesale=is_wholesale,
+            quantity=quantity, gross=product.selling_price * quantity,
+        )
+
+    def get_data(self, user=None, **params):
+        self.client.login(username=(user or self.admin).username, password='password')
+        response = self.client.get(reverse('inventory:api_product_sales_type'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_top_products_with_breakdown(self):
+        data = self.get_data()
+        self.assertEqual(data['labels'], ['Produit 7', 'Produit 6', 'Produit 5', 'Produit 4', 'Produit 3'])
+        self.assertEqual(data['retail'], [17, 16, 15, 14, 13])
+        self.assertEqual(data['wholesale'], [7, 6, 5, 4, 3])
+
+        data = self.get_data(limit=8)
+        self.assertEqual(data['labels'][-2:], ['Savon', 'Savon'])
+        self.assertEqual(data['retail'][-2:], [11, 10])
+
+    def test_pos_and_date_filters(self):
+        data = self.get_data(pos=self.pos_b.pk, limit=2)
+        self.assertEqual((data['retail'], data['wholesale']), ([0, 0], [7, 6]))
+
+        data = self.get_data(start_date='2025-06-02', limit=1)
+        self.assertEqual((data['retail'], data['wholesale']), ([0], [7]))
+
+        data = self.get_data(date='2025-06-01', limit=1)
+        self.assertEqual((data['retail'], data['wholesale']), ([17], [0]))
+
+        response = self.client.get(reverse('inventory:api_product_sales_type'), {'date': '2025-13-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_staff_only_sees_own_pos(self):
+        data = self.get_data(user=self.staff, pos=self.pos_b.pk)
+        self.assertEqual(data['labels'], [])
+        data = self.get_data(user=self.staff, limit=1)
+        self.assertEqual((data['retail'], data['wholesale']), ([17], [0]))
+
+    def test_single_query_whatever_the_limit(self):
+        self.client.login(username='salestypeadmin', password='password')
+        url = reverse('inventory:api_product_sales_type')
+        self.client.get(url)
+        for limit in (2, 8):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, {'limit': limit})
+            sales_queries = [
+                q for q in queries.captured_queries if 'inventory_dailysalesfact' in q['sql'] and 'SUM(' in q['sql']
+            ]
+            self.assertEqual(len(sales_queries), 1)
@@ -0,0 +1,57 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Client, DocumentSequence, Invoice, PointOfSale, Quote
+
+
+class DocumentSequenceTests(TestCase):
+    """Document numbers come from a per-(type, year, POS) counter row"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sequser', password='password')
+        self.customer = Client.objects.create(name="Sequence Client")
+        self.year = timezone.now().year
+
+    def make_invoice(self, number):
+        return Invoice.objects.create(
+            invoice_number=number, client=self.customer, date_issued=date.today(),
+            date_due=date.today(), total_amount=Decimal('10.00'), created_by=self.user
+        )
+
+    def test_numbers_are_sequential(self):
+        numbers = [Invoice().generate_invoice_number() for _ in range(3)]
+        self.assertEqual(numbers, [f'INV-{self.year}-{n:05d}' for n in (1, 2, 3)])
+
+    def test_sequence_is_seeded_from_existing_documents(self):
+        self.make_invoice(f'INV-{self.year}-00041')
+        self.make_invoice(f'INV-{self.year - 1}-00099')
+        self.assertEqual(Invoice().generate_invoice_number(), f'INV-{self.year}-00042')
+        self.assertEqual(Quote().generate_quote_number(), f'QUO-{self.year}-00001')
+
+    def test_reservation_is_one_update_and_one_read(self):
+        DocumentSequence.next_value('invoice', self.year)
+        with self.assertNumQueries(2):
+            self.assertEqual(DocumentSequence.next_value('invoice', self.year), 2)
+
+    def test_rollback_leaves_no_gap(self):
+        self.assertEqual(DocumentSequence.next_value('receipt', self.year), 1)
+        try:
+            with transaction.atomic():
+                DocumentSequence.next_value('receipt', self.year)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(DocumentSequence.next_value('receipt', self.year), 2)
+
+    def test_point_of_sale_sequences_are_independent(self):
+        pos = PointOfSale.objects.create(name="Sequence Store", code="SEQ")
+        self.assertEqual(DocumentSequence.next_value('invoice', self.year), 1)
+        self.assertEqual(DocumentSequence.next_value('invoice', self.year, point_of_sale=pos), 1)
+        self.assertEqual(DocumentSequence.next_value('invoice', self.year, point_of_sale=pos), 2)
+        self.assertEqual(DocumentSequence.next_value('invoice', self.year), 2)
+        self.assertEqual(DocumentSequence.objects.count(), 2)
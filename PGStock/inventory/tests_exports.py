@@ -0,0 +1,121 @@
+import io
+from decimal import Decimal
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .excel_utils import export_to_excel, queryset_rows, WIDTH_SAMPLE_ROWS, MAX_COLUMN_WIDTH
+from .models import Category, Product, PointOfSale, Inventory, Client, Invoice, Payment
+
+
+class StreamingExcelExportTests(SimpleTestCase):
+    """export_to_excel writes a streamed, write-only workbook"""
+
+    def export(self, headers, rows):
+        response = export_to_excel(headers, rows, "Mouvements de Stock", "Mouvements_Stock")
+        self.assertIsInstance(response, StreamingHttpResponse)
+        content = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(content))
+        return openpyxl.load_workbook(io.BytesIO(content)).active
+
+    def test_rows_from_generator(self):
+        rows = ((f"Produit {i}", i * 1000, i) for i in range(1, 1001))
+        ws = self.export(['Produit', 'Prix Unitaire', 'Quantité'], rows)
+
+        self.assertEqual(ws.title, "Mouvements de Stock")
+        self.assertEqual(ws.max_row, 1001)
+        self.assertEqual([c.value for c in ws[1]], ['Produit', 'Prix Unitaire', 'Quantité'])
+        self.assertEqual([c.value for c in ws[1001]], ['Produit 1000', 1000000, 1000])
+        self.assertEqual(ws.freeze_panes, 'A2')
+
+    def test_shared_styles(self):
+        ws = self.export(['Produit', 'Montant'], [['A', 10], ['B', 20]])
+        self.assertTrue(ws['A1'].font.bold)
+        self.assertEqual(ws['B2'].number_format, '#,##0 "GNF"')
+        self.assertEqual(ws['B2'].alignment.horizontal, 'right')
+        self.assertEqual(ws['A2'].fill.fgColor.rgb, '00F5F8FA')
+        self.assertIsNone(ws['A3'].fill.fill_type)
+        self.assertEqual(ws['A2'].style, 'export_text_stripe')
+
+    def test_column_widths_from_sample(self):
+        rows = [['x' * 30, 1]] + [['y', 2]] * WIDTH_SAMPLE_ROWS + [['z' * 200, 3]]
+        ws = self.export(['Produit', 'Quantité'], rows)
+        self.assertEqual(ws.column_dimensions['A'].width, 32)
+        self.assertEqual(ws.column_dimensions['B'].width, len('Quantité') + 2)
+        self.assertLessEqual(ws.column_dimensions['A'].width, MAX_COLUMN_WIDTH)
+
+
+class QuerysetExportTests(TestCase):
+    """Export views read values_list rows chunk by chunk"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='exportadmin', password='password')
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name="Export Category")
+        self.pos = PointOfSale.objects.create(name="Export Store", code="EXPORT")
+
+    def add_products(self, count, start=0):
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f"Export Product {i:03d}", sku=f"EXP-{i:03d}", category=self.category,
+                purchase_price=Decimal('100.00'), selling_price=Decimal('150.00'), units_per_box=12
+            )
+            Inventory.objects.create(product=product, point_of_sale=self.pos, quantity=30 + i, reorder_level=5)
+
+    def download(self, url_name):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(url_name))
+            content = b''.join(response.streaming_content)
+        sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+        return sheet, len(context.captured_queries)
+
+    def test_queryset_rows_chunks(self):
+        self.add_products(5)
+        chunks = []
+
+        def build_rows(chunk):
+            chunks.append(len(chunk))
+            return [[name] for name, in chunk]
+
+        rows = list(queryset_rows(Product.objects.order_by('name'), ['name'], build_rows, chunk_size=2))
+        self.assertEqual(chunks, [2, 2, 1])
+        self.assertEqual(rows[0], ['Export Product 000'])
+
+    def test_inventory_and_products_exports(self):
+        self.add_products(3)
+        self.download('inventory:export_inventory_excel')  # Session et permissions en cache
+        sheet, few_queries = self.download('inventory:export_inventory_excel')
+        self.assertEqual(
+            [c.value for c in sheet[2]][:7],
+            ['Export Product 000', 'EXP-000', 'Export Category', 30, 2, 6, '2 Colis, 6 Unité(s)']
+        )
+        self.add_products(20, start=3)
+        _, many_queries = self.download('inventory:export_inventory_excel')
+        self.assertEqual(few_queries, many_queries)
+
+        sheet, _ = self.download('inventory:export_products_excel')
+        self.assertEqual(sheet.max_row, 24)
+        self.assertEqual([c.value for c in sheet[2]][3:7], [30, 2, 6, '2 Colis, 6 Unité(s)'])
+
+    def test_invoice_status_export_totals(self):
+        client = Client.objects.create(name="Export Client")
+        for number, status, total, paid in (('INV-EXP-1', 'sent', '1000.00', '400.00'), ('INV-EXP-2', 'paid', '500.00', '500.00')):
+            invoice = Invoice.objects.create(
+                invoice_number=number, client=client, point_of_sale=self.pos,
+                date_issued='2025-01-10', date_due='2025-02-10', created_by=self.user
+            )
+            Invoice.objects.filter(pk=invoice.pk).update(status=status, total_amount=Decimal(total))
+            Payment.objects.bulk_create([
+                Payment(invoice=invoice, amount=Decimal(paid), payment_date='2025-01-15', payment_method='cash')
+            ])
+
+        sheet, _ = self.download('inventory:export_invoice_status_excel')
+        rows = {row[0].value: [c.value for c in row] for row in sheet.iter_rows(min_row=2)}
+        self.assertEqual(rows['INV-EXP-1'][4:], ['Envoyée', 1000, 400, 600])
+        self.assertEqual(rows['INV-EXP-2'][4:], ['Payée', 500, 500, 0])
+        self.assertEqual([c.value for c in sheet[sheet.max_row]][4:], ['TOTAL GÉNÉRAL', 1500, 900, 600])
@@ -0,0 +1,187 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, ImportJob, Product
+from .services import ImportJobService, ProductImportService
+from .services.base import ServiceException
+from .tests_product_import import make_workbook
+
+
+def make_upload(rows, headers=None):
+    buffer = make_workbook(rows) if headers is None else make_workbook(rows, headers)
+    return SimpleUploadedFile('produits.xlsx', buffer.getvalue())
+
+
+class ImportJobTests(TestCase):
+    """Uploaded workbooks are imported by the worker, chunk by chunk, with saved progress"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.private_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.private_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PRIVATE_MEDIA_ROOT=self.private_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_superuser(username='jobimporter', password='password', email='j@example.com')
+        Category.objects.create(name="Papeterie")
+        self.rows = [[f'Article {i}', f'ART-{i:03d}', '', 'Papeterie', '', 10, 5, None] for i in range(7)]
+
+    def test_view_queues_job_and_worker_imports_it(self):
+        self.client.login(username='jobimporter', password='password')
+        rows = self.rows + [[None, 'NONAME', '', '', '', None, None, 1]]
+        response = self.client.post(reverse('inventory:product_import'), {'excel_file': make_upload(rows)})
+
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, reverse('inventory:import_job_detail', args=[job.pk]))
+        self.assertEqual(job.status, 'pending')
+        # Fichier privé, sous un nom aléatoire
+        self.assertEqual(job.original_name, 'produits.xlsx')
+        self.assertRegex(job.source_file.name, r'^imports/\d{4}/\d{2}/[0-9a-f]{32}\.xlsx$')
+        self.assertTrue(os.path.isfile(os.path.join(self.private_root, job.source_file.name)))
+        self.assertEqual(os.listdir(self.media_root), [])
+        self.assertEqual(job.total_rows, 8)
+        self.assertFalse(Product.objects.filter(sku__startswith='ART-').exists())
+
+        call_command('process_import_jobs', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done', job.error)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual((job.rows_done, job.created_count, job.error_count), (8, 7, 1))
+        self.assertEqual(job.last_line, 9)
+        self.assertIn("Ligne 9", job.errors[0])
+        self.assertEqual(Product.objects.filter(sku__startswith='ART-').count(), 7)
+
+        status = self.client.get(reverse('inventory:import_job_status', args=[job.pk])).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['progress'], 100)
+        self.assertEqual(status['created'], 7)
+
+        response = self.client.get(reverse('inventory:import_job_detail', args=[job.pk]))
+        self.assertContains(response, "Ligne 9")
+
+    def test_invalid_file_is_rejected_on_upload(self):
+        with self.assertRaises(ServiceException):
+            ImportJobService().enqueue(make_upload([['x']], headers=['sku']), self.user)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_failed_job_resumes_after_last_committed_chunk(self):
+        service = ImportJobService(chunk_size=3)
+        service.enqueue(make_upload(self.rows), self.user)
+
+        # Le troisième lot échoue : les deux premiers restent validés
+        original_write = ProductImportService._write
+        calls = []
+
+        def failing_write(self, parsed):
+            calls.append(len(parsed))
+            if len(calls) == 3:
+                raise RuntimeError("Connexion perdue")
+            return original_write(self, parsed)
+
+        with mock.patch.object(ProductImportService, '_write', failing_write):
+            job = service.run(service.claim_next())
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual((job.last_line, job.rows_done, job.created_count), (7, 6, 6))
+        self.assertEqual(Product.objects.filter(sku__startswith='ART-').count(), 6)
+
+        service.retry(job)
+        job = service.run(service.claim_next())
+        self.assertEqual(job.status, 'done', job.error)
+        self.assertEqual((job.last_line, job.rows_done, job.created_count, job.updated_count), (8, 7, 7, 0))
+        self.assertEqual(Product.objects.filter(sku__startswith='ART-').count(), 7)
+
+    def test_progress_is_rolled_back_with_its_chunk(self):
+        service = ImportJobService()
+        service.enqueue(make_upload(self.rows), self.user)
+        job = service.claim_next()
+
+        with mock.patch.object(ImportJob, 'save', side_effect=DatabaseError("disk full")):
+            job = service.run(job)
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual((job.last_line, job.rows_done), (0, 0))
+        self.assertFalse(Product.objects.filter(sku__startswith='ART-').exists())
+
+    def test_rejected_chunk_is_logged_and_the_job_goes_on(self):
+        service = ImportJobService(chunk_size=3)
+        service.enqueue(make_upload(self.rows), self.user)
+        job = service.claim_next()
+
+        original_write = ProductImportService._write
+        original_check = ImportJobService._check_owner
+        calls = []
+        lock_depths = []
+        baseline = len(connection.atomic_blocks)
+
+        def failing_write(self, parsed):
+            calls.append(len(parsed))
+            if len(calls) == 2:
+                raise DatabaseError("duplicate key")
+            return original_write(self, parsed)
+
+        def check_owner(job, lock=False):
+            if lock:
+                lock_depths.append(len(connection.atomic_blocks) - baseline)
+            return original_check(job, lock)
+
+        with mock.patch.object(ProductImportService, '_write', failing_write), \
+                mock.patch.object(ImportJobService, '_check_owner', staticmethod(check_owner)):
+            job = service.run(job)
+
+        self.assertEqual(job.status, 'done', job.error)
+        self.assertEqual((job.last_line, job.created_count, job.error_count), (8, 4, 3))
+        self.assertIn("Lignes 5 à 7", job.errors[0])
+        # Le verrou du job est toujours pris dans une transaction, lot rejeté compris (PostgreSQL l'exige)
+        self.assertEqual(lock_depths, [1, 1, 1])
+
+    def test_stale_running_job_is_requeued(self):
+        service = ImportJobService()
+        job = service.enqueue(make_upload(self.rows), self.user)
+        service.claim_next()
+        ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(minutes=20))
+
+        self.assertEqual(service.requeue_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(service.claim_next().pk, job.pk)
+
+    def test_requeued_job_stops_its_former_worker(self):
+        service = ImportJobService(chunk_size=3)
+        service.enqueue(make_upload(self.rows), self.user)
+        slow = service.claim_next()
+
+        # Le deuxième lot est trop long : le job est remis en file et repris par un autre worker
+        original_parse = ProductImportService._parse_row
+        takeover = []
+
+        def slow_parse(self, headers, line, row, result):
+            if line == 5 and not takeover:
+                ImportJob.objects.filter(pk=slow.pk).update(updated_at=timezone.now() - timedelta(minutes=20))
+                service.requeue_stale(timedelta(minutes=10))
+                takeover.append(service.claim_next())
+            return original_parse(self, headers, line, row, result)
+
+        with mock.patch.object(ProductImportService, '_parse_row', slow_parse):
+            job = service.run(slow)
+
+        # Le lot en cours de l'ancien worker est annulé, rien n'est marqué terminé
+        self.assertEqual((job.status, job.last_line, job.attempts), ('running', 4, 2))
+        self.assertEqual(Product.objects.filter(sku__startswith='ART-').count(), 3)
+
+        job = service.run(takeover[0])
+        self.assertEqual(job.status, 'done', job.error)
+        self.assertEqual(job.created_count, 7)
+        self.assertEqual(Product.objects.filter(sku__startswith='ART-').count(), 7)
@@ -0,0 +1,81 @@
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from .models import PointOfSale, UserProfile, Invoice
+from .permissions import (
+    get_user_role, get_user_pos, is_admin, can_view_finances, filter_queryset_by_pos
+)
+
+
+class CachedPermissionsTests(TestCase):
+    """Role and POS resolution is computed once per request and never outlives it"""
+
+    def setUp(self):
+        cache.clear()
+        self.staff_group, _ = Group.objects.get_or_create(name='STAFF')
+        self.admin_group, _ = Group.objects.get_or_create(name='Admin')
+        self.pos = PointOfSale.objects.create(name="Perm Store", code="PERM")
+        self.user = User.objects.create_user(username='permuser', password='password')
+        self.user.groups.add(self.staff_group)
+        UserProfile.objects.update_or_create(user=self.user, defaults={'point_of_sale': self.pos})
+
+    def fresh_user(self):
+        """Simulate a new request (new user instance)"""
+        return User.objects.get(pk=self.user.pk)
+
+    def test_role_is_resolved_once_per_request(self):
+        user = self.fresh_user()
+        self.assertEqual(get_user_role(user), 'STAFF')
+        with self.assertNumQueries(0):
+            for _ in range(50):
+                get_user_role(user)
+                is_admin(user)
+                can_view_finances(user)
+
+    def test_role_is_not_kept_across_requests(self):
+        self.assertEqual(get_user_role(self.fresh_user()), 'STAFF')
+        # Changement sans signal (autre worker, UPDATE direct) : visible à la requête suivante
+        Group.objects.filter(pk=self.staff_group.pk).update(name='Ancien staff')
+        self.assertIsNone(get_user_role(self.fresh_user()))
+
+    def test_template_filters_do_not_query_per_cell(self):
+        user = self.fresh_user()
+        template = Template(
+            "{% load permission_tags inventory_extras %}"
+            "{% for amount in amounts %}{{ amount|mask_currency:user }}{{ amount|format_currency:user }}"
+            "{% if user|is_admin %}x{% endif %}{% endfor %}"
+        )
+        get_user_role(user)
+        with self.assertNumQueries(0):
+            template.render(Context({'user': user, 'amounts': range(50)}))
+
+    def test_group_change_invalidates_cache(self):
+        self.assertEqual(get_user_role(self.fresh_user()), 'STAFF')
+        self.user.groups.add(self.admin_group)
+        self.assertEqual(get_user_role(self.fresh_user()), 'ADMIN')
+
+        self.admin_group.user_set.remove(self.user)
+        self.assertEqual(get_user_role(self.fresh_user()), 'STAFF')
+
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertEqual(get_user_role(self.fresh_user()), 'ADMIN')
+
+    def test_profile_change_invalidates_pos(self):
+        self.assertEqual(get_user_pos(self.fresh_user()), self.pos)
+        other = PointOfSale.objects.create(name="Perm Store 2", code="PERM2")
+        profile = UserProfile.objects.get(user=self.user)
+        profile.point_of_sale = other
+        profile.save()
+        self.assertEqual(get_user_pos(self.fresh_user()), other)
+
+    def test_filter_queryset_by_pos_for_staff(self):
+        user = self.fresh_user()
+        queryset = filter_queryset_by_pos(Invoice.objects.all(), user)
+        self.assertEqual(queryset.query.where.children[0].rhs, self.pos.pk)
+
+        # Sans rôle : rien n'est visible
+        self.user.groups.remove(self.staff_group)
+        self.assertTrue(filter_queryset_by_pos(Invoice.objects.all(), self.fresh_user()).query.is_empty())
@@ -0,0 +1,217 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import (
+    Category, Product, PointOfSale, Inventory, UserProfile, Client, Invoice, InvoiceItem, StockMovement,
+    ProfitReportEntry, DataVersion
+)
+
+
+class ProductSearchApiTests(TestCase):
+    """POS search returns results and local stock in a constant number of queries"""
+
+    def setUp(self):
+        cache.clear()
+        staff_group, _ = Group.objects.get_or_create(name='STAFF')
+        self.user = User.objects.create_user(username='posuser', password='password')
+        self.user.groups.add(staff_group)
+        self.pos = PointOfSale.objects.create(name="Search Store", code="SEARCH")
+        other_pos = PointOfSale.objects.create(name="Search Store B", code="SEARCH_B")
+        UserProfile.objects.update_or_create(user=self.user, defaults={'point_of_sale': self.pos})
+
+        category = Category.objects.create(name="Search Category")
+        for i in range(20):
+            product = Product.objects.create(
+                name=f"Café {i:02d}", sku=f"CAF-{i:03d}", category=category,
+                purchase_price=Decimal('1.00'), selling_price=Decimal('2.00')
+            )
+            Inventory.objects.create(product=product, point_of_sale=self.pos, quantity=i)
+            Inventory.objects.create(product=product, point_of_sale=other_pos, quantity=100)
+        Product.objects.create(
+            name="Sucre au café", sku="SUC-001", category=category,
+            purchase_price=Decimal('1.00'), selling_price=Decimal('2.00')
+        )
+
+        self.client.login(username='posuser', password='password')
+        self.url = reverse('inventory:api_pos_search_products')
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_local_stock_and_ranking(self):
+        results = self.search(q='caf-003')
+        self.assertEqual(results[0]['sku'], 'CAF-003')
+        self.assertEqual(results[0]['stock'], 3)
+
+        # Trop peu de préfixes : la recherche « contient » complète la liste
+        results = self.search(q='sucre')
+        self.assertEqual([r['sku'] for r in results], ['SUC-001'])
+        self.assertEqual(results[0]['stock'], 0)
+
+    def test_query_count_does_not_grow_with_results(self):
+        self.search(q='café')
+        with self.assertNumQueries(5):  # session, utilisateur, rôle (groupes, profil), recherche
+            results = self.search(q='café')
+        self.assertEqual(len(results), 15)
+        self.assertEqual(results[0]['name'], 'Café 00')
+
+
+class ProductCatalogueTests(TestCase):
+    """The quick-sale catalogue is versioned, revalidated by ETag and patched per product"""
+
+    def setUp(self):
+        cache.clear()
+        staff_group, _ = Group.objects.get_or_create(name='STAFF')
+        self.user = User.objects.create_user(username='catuser', password='password')
+        self.user.groups.add(staff_group)
+        self.pos = PointOfSale.objects.create(name="Catalogue Store", code="CAT")
+        UserProfile.objects.update_or_create(user=self.user, defaults={'point_of_sale': self.pos})
+
+        self.category = Category.objects.create(name="Catalogue Category")
+        self.product = Product.objects.create(
+            name="Thé vert", sku="THE-001", category=self.category,
+            purchase_price=Decimal('1.00'), selling_price=Decimal('2.50'), units_per_box=12
+        )
+        Inventory.objects.create(product=self.product, point_of_sale=self.pos, quantity=7)
+
+        self.client.login(username='catuser', password='password')
+        self.url = reverse('inventory:api_pos_catalogue')
+
+    def test_catalogue_payload_and_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        rows = [dict(zip(data['fields'], row)) for row in data['rows']]
+        self.assertIn({
+            'id': self.product.pk, 'name': "Thé vert", 'sku': "THE-001", 'price': 2.5,
+            'wholesale_price': 30.0, 'units_per_box': 12, 'category_id': self.category.pk, 'image_url': None,
+        }, rows)
+
+        with self.assertNumQueries(5):  # session, utilisateur, rôle (groupes, profil), version
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_product_change_patches_catalogue(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.selling_price = Decimal('3.00')
+            self.product.save()
+            Product.objects.create(
+                name="Thé noir", sku="THE-002", category=self.category,
+                purchase_price=Decimal('1.00'), selling_price=Decimal('2.00')
+            )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        rows = {row[2]: row for row in response.json()['rows']}
+        self.assertEqual(rows['THE-001'][3], 3.0)
+        self.assertIn('THE-002', rows)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(sku='THE-002').delete()
+        rows = {row[2] for row in self.client.get(self.url).json()['rows']}
+        self.assertNotIn('THE-002', rows)
+
+    def test_version_is_shared_through_the_database(self):
+        etag = self.client.get(self.url)['ETag']
+
+        # Écriture d'un autre processus : seule la version en base change, pas ce cache
+        Product.objects.filter(pk=self.product.pk).update(selling_price=Decimal('4.00'))
+        DataVersion.next_value(DataVersion.CATALOGUE)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual({row[2]: row[3] for row in response.json()['rows']}['THE-001'], 4.0)
+
+    def test_live_stock_for_user_pos(self):
+        response = self.client.get(reverse('inventory:api_pos_stock'), {'ids': f'{self.product.pk},999999'})
+        self.assertEqual(response.json()['stock'], {str(self.product.pk): 7, '999999': 0})
+
+
+class QuickSaleCheckoutTests(TestCase):
+    """A POS basket is recorded in a constant number of queries, reports updated after commit"""
+
+    def setUp(self):
+        cache.clear()
+        staff_group, _ = Group.objects.get_or_create(name='STAFF')
+        self.user = User.objects.create_user(username='cashier', password='password')
+        self.user.groups.add(staff_group)
+        self.pos = PointOfSale.objects.create(name="Checkout Store", code="CHK")
+        UserProfile.objects.update_or_create(user=self.user, defaults={'point_of_sale': self.pos})
+        self.customer = Client.objects.create(name="Checkout Client")
+
+        category = Category.objects.create(name="Checkout Category")
+        self.products = []
+        for i in range(30):
+            product = Product.objects.create(
+                name=f"Article {i:02d}", sku=f"CHK-{i:03d}", category=category,
+                purchase_price=Decimal('60.00'), selling_price=Decimal('100.00'), units_per_box=10
+            )
+            Inventory.objects.create(product=product, point_of_sale=self.pos, quantity=100, reorder_level=0)
+            self.products.append(product)
+
+        self.client.login(username='cashier', password='password')
+        self.url = reverse('inventory:quick_sale')
+
+    def checkout(self, items, **extra):
+        payload = {'client_id': self.customer.pk, 'apply_tax': False, 'items': items, **extra}
+        response = self.client.post(self.url, json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def basket(self, size):
+        return [{'product_id': p.pk, 'quantity': 2, 'is_wholesale': False} for p in self.products[:size]]
+
+    def test_checkout_records_invoice_items_and_stock(self):
+        items = self.basket(2) + [{'product_id': self.products[2].pk, 'quantity': 1, 'is_wholesale': True}]
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.checkout(items, discount=50)
+        self.assertTrue(result['success'], result)
+
+        invoice = Invoice.objects.get(pk=result['invoice_id'])
+        self.assertEqual(invoice.status, 'paid')
+        self.assertTrue(invoice.stock_deducted)
+        self.assertEqual(invoice.invoiceitem_set.count(), 3)
+        # 2 x 100 + 2 x 100 + 1 colis (prix de gros dérivé du modèle)
+        wholesale_price = self.products[2].wholesale_selling_price
+        self.assertEqual(invoice.subtotal, Decimal('400.00') + wholesale_price)
+        self.assertEqual(invoice.total_amount, invoice.subtotal - Decimal('50.00'))
+
+        quantities = dict(Inventory.objects.filter(point_of_sale=self.pos).values_list('product__sku', 'quantity'))
+        self.assertEqual(quantities['CHK-000'], 98)
+        self.assertEqual(quantities['CHK-002'], 90)
+        self.assertEqual(StockMovement.objects.filter(reference=f"Facture {invoice.invoice_number}").count(), 3)
+
+        entry = ProfitReportEntry.objects.get(invoice=invoice)
+        self.assertFalse(entry.is_stale)
+        self.assertEqual(entry.total_sales_brut, invoice.subtotal)
+
+    def test_query_count_does_not_grow_with_basket(self):
+        def count_queries(size):
+            with CaptureQueriesContext(connection) as context:
+                with self.captureOnCommitCallbacks(execute=True):
+                    result = self.checkout(self.basket(size))
+            self.assertTrue(result['success'], result)
+            return len(context.captured_queries)
+
+        count_queries(1)
+        self.assertEqual(count_queries(30), count_queries(3))
+
+    def test_insufficient_stock_writes_nothing(self):
+        items = self.basket(1) + [{'product_id': self.products[1].pk, 'quantity': 101, 'is_wholesale': False}]
+        result = self.checkout(items)
+        self.assertFalse(result['success'])
+        self.assertFalse(Invoice.objects.exists())
+        self.assertFalse(InvoiceItem.objects.exists())
+        self.assertEqual(Inventory.objects.get(product=self.products[0], point_of_sale=self.pos).quantity, 100)
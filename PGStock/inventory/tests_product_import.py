@@ -0,0 +1,105 @@
+from decimal import Decimal
+from io import BytesIO
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Category, DataVersion, Inventory, PointOfSale, Product, ProductStockSummary, Supplier
+from .services import ProductImportService
+
+HEADERS = ['name', 'sku', 'description', 'category', 'supplier', 'purchase_price', 'margin', 'selling_price']
+
+
+def make_workbook(rows, headers=HEADERS):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class ProductImportTests(TestCase):
+    """The Excel import upserts products in bulk, chunk by chunk"""
+
+    def setUp(self):
+        self.pos_ids = set(PointOfSale.objects.filter(is_active=True).values_list('id', flat=True))
+        self.pos_ids.add(PointOfSale.objects.create(name="Import Store", code="IMP").pk)
+        self.supplier = Supplier.objects.create(name="Import Supplier")
+        self.category = Category.objects.create(name="Papeterie")
+        self.existing = Product.objects.create(
+            name="Ancien nom", sku="PAP-EXIST", category=self.category,
+            purchase_price=Decimal('1.00'), selling_price=Decimal('2.00')
+        )
+
+    def test_import_creates_updates_and_reports(self):
+        result = ProductImportService(chunk_size=2).import_workbook(make_workbook([
+            ['Stylo', 'STY-001', 'Bleu', 'Papeterie', 'Import Supplier', 100, 50, None],
+            ['Nouveau nom', 'PAP-EXIST', '', 'Papeterie', '', None, None, 5],
+            ['Cahier', None, '', 'Fournitures', 'Inconnu', 200, None, 300],
+            [None, 'NONAME', '', '', '', None, None, 1],
+            ['Stylo rouge', 'STY-001', 'Rouge', 'Papeterie', '', 100, 50, None],
+        ]))
+
+        self.assertEqual(result.rows, 5)
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.updated, 2)
+        self.assertEqual(result.error_count, 1)
+        self.assertTrue(any("Inconnu" in error for error in result.errors))
+        self.assertGreater(result.rows_per_second, 0)
+
+        pen = Product.objects.get(sku='STY-001')
+        self.assertEqual(pen.name, 'Stylo rouge')
+        self.assertEqual(pen.supplier, self.supplier)
+        self.assertEqual(pen.selling_price, Decimal('150.00'))
+        self.assertEqual(pen.margin, Decimal('50.00'))
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Nouveau nom')
+        self.assertEqual(self.existing.selling_price, Decimal('5.00'))
+
+        notebook = Product.objects.get(name='Cahier')
+        self.assertEqual(notebook.sku, 'FOU-0001')
+        self.assertEqual(notebook.category.name, 'Fournitures')
+
+        for product in (pen, notebook):
+            self.assertEqual(
+                set(Inventory.objects.filter(product=product).values_list('point_of_sale_id', flat=True)),
+                self.pos_ids
+            )
+            self.assertEqual(ProductStockSummary.objects.get(product=product).status, 'out_of_stock')
+
+    def test_import_bumps_the_shared_catalogue_version(self):
+        rows = [[f'Gomme {i}', f'GOM-{i:03d}', '', 'Papeterie', '', 10, 5, None] for i in range(5)]
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImportService(chunk_size=2).import_workbook(make_workbook(rows))
+        # Écritures groupées sans signal : une seule version pour tout l'import, visible de tous les workers
+        self.assertEqual(DataVersion.get_value(DataVersion.CATALOGUE), 1)
+
+    def test_query_count_is_per_chunk_not_per_row(self):
+        def count_queries(prefix, size):
+            rows = [[f'{prefix} {i}', f'{prefix}-{i:05d}', '', 'Papeterie', '', 10, 5, None] for i in range(size)]
+            with CaptureQueriesContext(connection) as context:
+                result = ProductImportService().import_workbook(make_workbook(rows))
+            self.assertEqual(result.created, size)
+            return len(context.captured_queries)
+
+        # Quelques requêtes par lot (le backend découpe les INSERT volumineux), pas par ligne
+        self.assertLess(count_queries('A', 400), 40)
+
+    def test_downloaded_template_is_accepted(self):
+        User.objects.create_superuser(username='importer', password='password', email='i@example.com')
+        self.client.login(username='importer', password='password')
+
+        template = self.client.get(reverse('inventory:product_import_template'))
+        result = ProductImportService().import_workbook(BytesIO(template.content))
+        self.assertEqual(result.error_count, 0)
+        self.assertTrue(Product.objects.filter(sku='DELL-LAP-001').exists())
+        self.assertEqual(Product.objects.filter(sku__in=['LOG-MOU-001', 'KEY-RGB-001']).count(), 2)
@@ -0,0 +1,215 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .models import (
+    Category, Product, PointOfSale, Inventory, Client, Invoice, InvoiceItem,
+    Expense, ExpenseCategory, MonthlyProfitReport
+)
+from .services import FinanceService
+
+
+REPORT_FIELDS = [
+    'total_sales_brut', 'total_discounts', 'total_cost_of_goods',
+    'total_expenses', 'gross_profit', 'net_interest'
+]
+
+
+def reference_report(month, year, point_of_sale):
+    """Full recomputation, as FinanceService.generate_monthly_report historically did it"""
+    total_sales_brut = Decimal('0.00')
+    total_discounts = Decimal('0.00')
+    total_cogs = Decimal('0.00')
+    total_net_profit = Decimal('0.00')
+    invoices = Invoice.objects.filter(
+        date_issued__month=month, date_issued__year=year,
+        point_of_sale=point_of_sale, status__in=['paid', 'sent']
+    )
+    for inv in invoices:
+        total_discounts += inv.discount_amount
+        for item in inv.invoiceitem_set.all():
+            brut_line = item.quantity * item.unit_price
+            total_sales_brut += brut_line
+            total_cogs += item.quantity * item.purchase_price
+            if item.discount:
+                total_discounts += (brut_line * (item.discount / Decimal('100')))
+        total_net_profit += inv.total_profit
+    expenses = Expense.objects.filter(
+        date__month=month, date__year=year, point_of_sale=point_of_sale
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+    return {
+        'total_sales_brut': total_sales_brut,
+        'total_discounts': total_discounts,
+        'total_cost_of_goods': total_cogs,
+        'total_expenses': expenses,
+        'gross_profit': total_net_profit,
+        'net_interest': total_net_profit - expenses,
+    }
+
+
+class IncrementalProfitReportTests(TestCase):
+    """Incremental report maintenance must match a full recomputation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='financeuser', password='password')
+        self.category = Category.objects.create(name="Finance Category")
+        self.products = [
+            Product.objects.create(
+                name=f"Finance Product {i}",
+                sku=f"FIN-{i:03d}",
+                category=self.category,
+                purchase_price=Decimal('1000.00') * (i + 1),
+                selling_price=Decimal('1500.00') * (i + 1),
+                units_per_box=10
+            )
+            for i in range(3)
+        ]
+        self.pos = PointOfSale.objects.create(name="Finance Store", code="FIN_A")
+        self.pos_b = PointOfSale.objects.create(name="Finance Store B", code="FIN_B")
+        for product in self.products:
+            for pos in (self.pos, self.pos_b):
+                Inventory.objects.create(product=product, point_of_sale=pos, quantity=1000, reorder_level=0)
+        self.client_obj = Client.objects.create(name="Finance Client")
+        self.day = date(2025, 3, 14)
+        expense_category = ExpenseCategory.objects.create(name="Loyer test")
+        Expense.objects.create(
+            reference='EXP-FIN-1', category=expense_category, point_of_sale=self.pos,
+            amount=Decimal('2500.00'), date=self.day, description="Loyer"
+        )
+
+    def make_invoice(self, number, lines, status='paid', discount_amount=Decimal('0'), pos=None):
+        invoice = Invoice.objects.create(
+            invoice_number=number,
+            client=self.client_obj,
+            point_of_sale=pos or self.pos,
+            date_issued=self.day,
+            date_due=self.day,
+            status=status,
+            discount_amount=discount_amount,
+            apply_tax=False,
+            created_by=self.user
+        )
+        for product, quantity, is_wholesale, discount in lines:
+            price = product.wholesale_selling_price if is_wholesale else product.selling_price
+            InvoiceItem.objects.create(
+                invoice=invoice, product=product, quantity=quantity, unit_price=price,
+                is_wholesale=is_wholesale, discount=discount, total=price * quantity
+            )
+        invoice.calculate_totals()
+        return invoice
+
+    def assertReportMatchesReference(self, pos=None):
+        pos = pos or self.pos
+        report = MonthlyProfitReport.objects.get(month=self.day.month, year=self.day.year, point_of_sale=pos)
+        expected = reference_report(self.day.month, self.day.year, pos)
+        for field in REPORT_FIELDS:
+            self.assertEqual(getattr(report, field), expected[field].quantize(Decimal('0.01')), field)
+
+    def test_lifecycle_matches_full_recomputation(self):
+        first = self.make_invoice('INV-FIN-1', [
+            (self.products[0], 3, False, Decimal('0')),
+            (self.products[1], 2, True, Decimal('10')),
+        ], discount_amount=Decimal('500'))
+        self.make_invoice('INV-FIN-2', [(self.products[2], 5, False, Decimal('5'))], status='sent')
+        draft = self.make_invoice('INV-FIN-3', [(self.products[0], 1, False, Decimal('0'))], status='draft')
+        self.assertReportMatchesReference()
+
+        # Modification des lignes d'une facture payée
+        InvoiceItem.objects.create(
+            invoice=first, product=self.products[2], quantity=4,
+            unit_price=self.products[2].selling_price, total=self.products[2].selling_price * 4
+        )
+        first.calculate_totals()
+        self.assertReportMatchesReference()
+
+        # Brouillon validé, puis facture annulée
+        draft.status = 'paid'
+        draft.save()
+        first.status = 'cancelled'
+        first.save()
+        self.assertReportMatchesReference()
+
+        # Changement de point de vente
+        draft.point_of_sale = self.pos_b
+        draft.save()
+        self.assertReportMatchesReference()
+        self.assertReportMatchesReference(self.pos_b)
+
+        # Suppression
+        draft.delete()
+        self.assertReportMatchesReference(self.pos_b)
+
+    def test_rebuild_matches_incremental(self):
+        self.make_invoice('INV-FIN-10', [(self.products[0], 7, False, Decimal('0'))])
+        self.make_invoice('INV-FIN-11', [(self.products[1], 1, True, Decimal('20'))], discount_amount=Decimal('100'))
+        incremental = MonthlyProfitReport.objects.get(month=self.day.month, year=self.day.year, point_of_sale=self.pos)
+
+        rebuilt = FinanceService.generate_monthly_report(self.day.month, self.day.year, self.pos)
+        for field in REPORT_FIELDS:
+            self.assertEqual(getattr(rebuilt, field), getattr(incremental, field), field)
+
+        # Les deltas suivants repartent des contributions reconstruites
+        self.make_invoice('INV-FIN-12', [(self.products[2], 2, False, Decimal('0'))])
+        self.assertReportMatchesReference()
+
+    def test_expense_change_updates_report(self):
+        self.make_invoice('INV-FIN-20', [(self.products[0], 1, False, Decimal('0'))])
+        Expense.objects.create(
+            reference='EXP-FIN-2', category=ExpenseCategory.objects.get(name="Loyer test"),
+            point_of_sale=self.pos, amount=Decimal('750.00'), date=self.day, description="Transport"
+        )
+        self.assertReportMatchesReference()
+
+    def test_rebuild_all_points_of_sale_in_constant_queries(self):
+        self.make_invoice('INV-FIN-30', [(self.products[0], 2, False, Decimal('10'))])
+        self.make_invoice('INV-FIN-31', [(self.products[1], 1, True, Decimal('0'))], pos=self.pos_b)
+
+        def count_queries():
+            FinanceService.update_all_reports_for_month(self.day.month, self.day.year)
+            with CaptureQueriesContext(connection) as context:
+                FinanceService.update_all_reports_for_month(self.day.month, self.day.year)
+            return len(context.captured_queries)
+
+        baseline = count_queries()
+        for i in range(4):
+            pos = PointOfSale.objects.create(name=f"Finance Store X{i}", code=f"FIN_X{i}")
+            self.make_invoice(f'INV-FIN-4{i}', [(self.products[2], i + 1, False, Decimal('0'))], pos=pos)
+        self.assertEqual(count_queries(), baseline)
+
+        for pos in PointOfSale.objects.all():
+            self.assertReportMatchesReference(pos)
+
+    def test_warm_read_does_not_recompute(self):
+        self.make_invoice('INV-FIN-50', [(self.products[0], 2, False, Decimal('0'))])
+        FinanceService.get_month_reports(self.day.month, self.day.year)
+
+        for i in range(3):
+            PointOfSale.objects.create(name=f"Finance Store W{i}", code=f"FIN_W{i}")
+        FinanceService.get_month_reports(self.day.month, self.day.year)
+
+        with self.assertNumQueries(2):
+            reports = FinanceService.get_month_reports(self.day.month, self.day.year)
+        self.assertEqual(len(reports), PointOfSale.objects.count())
+
+    def test_stale_reports_are_rebuilt_on_read(self):
+        invoice = self.make_invoice('INV-FIN-60', [(self.products[0], 2, False, Decimal('0'))])
+        FinanceService.get_month_reports(self.day.month, self.day.year)
+
+        # Ligne ajoutée sans recalcul des totaux de la facture
+        InvoiceItem.objects.create(
+            invoice=invoice, product=self.products[1], quantity=3,
+            unit_price=self.products[1].selling_price, total=self.products[1].selling_price * 3
+        )
+        # Dépense modifiée sans passer par les signaux
+        Expense.objects.filter(reference='EXP-FIN-1').update(amount=Decimal('4000.00'))
+        FinanceService.mark_reports_stale(self.day.month, self.day.year, [self.pos.pk])
+
+        reports = FinanceService.get_month_reports(self.day.month, self.day.year)
+        report = next(r for r in reports if r.point_of_sale_id == self.pos.pk)
+        self.assertFalse(report.is_stale)
+        self.assertReportMatchesReference()
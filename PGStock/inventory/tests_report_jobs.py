@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import Category, Product, PointOfSale, Inventory, ReportJob, Settings
+from .services import ReportJobService
+
+
+class ReportJobTests(TestCase):
+    """PDF exports are queued by the views and rendered by the worker command"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.private_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.private_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PRIVATE_MEDIA_ROOT=self.private_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        admin_group, _ = Group.objects.get_or_create(name='Admin')
+        self.user = User.objects.create_user(username='pdfuser', password='password')
+        self.user.groups.add(admin_group)
+        self.other = User.objects.create_user(username='pdfother', password='password')
+
+        Settings.objects.create(company_name="PDF Shop")
+        category = Category.objects.create(name="PDF Category")
+        pos = PointOfSale.objects.create(name="PDF Store", code="PDF")
+        for i in range(3):
+            product = Product.objects.create(
+                name=f"PDF Product {i}", sku=f"PDF-{i:03d}", category=category,
+                purchase_price=Decimal('100.00'), selling_price=Decimal('150.00')
+            )
+            Inventory.objects.create(product=product, point_of_sale=pos, quantity=10 * i, reorder_level=5)
+
+        self.client.login(username='pdfuser', password='password')
+
+    def test_export_view_queues_job(self):
+        response = self.client.get(reverse('inventory:export_products_pdf'), {'q': 'PDF'})
+        job = ReportJob.objects.get()
+        self.assertRedirects(response, reverse('inventory:report_job_detail', args=[job.pk]))
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.report_type, 'products')
+        self.assertEqual(job.params, {'q': 'PDF'})
+        self.assertEqual(job.requested_by, self.user)
+
+    def test_worker_renders_queued_jobs(self):
+        self.client.get(reverse('inventory:export_inventory_pdf'))
+        self.client.get(reverse('inventory:export_low_stock_pdf'))
+
+        call_command('process_report_jobs', '--once', stdout=StringIO())
+
+        for job in ReportJob.objects.all():
+            self.assertEqual(job.status, 'done', job.error)
+            self.assertEqual(job.attempts, 1)
+            with job.file.open('rb') as f:
+                self.assertEqual(f.read(4), b'%PDF')
+
+        job = ReportJob.objects.filter(report_type='inventory').get()
+        response = self.client.get(reverse('inventory:report_job_status', args=[job.pk]))
+        self.assertEqual(response.json()['status'], 'done')
+        self.assertEqual(
+            response.json()['download_url'], reverse('inventory:report_job_download', args=[job.pk])
+        )
+
+        response = self.client.get(reverse('inventory:report_job_download', args=[job.pk]))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn(job.filename, response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content)[:4], b'%PDF')
+
+    def test_pdf_is_stored_privately_under_a_random_name(self):
+        ReportJobService().enqueue('products', {}, self.user)
+        job = ReportJobService().run(ReportJobService().claim_next())
+        self.assertEqual(job.status, 'done', job.error)
+
+        self.assertTrue(job.filename.startswith('Liste_Produits_'))
+        self.assertNotIn(os.path.splitext(job.filename)[0], job.file.name)
+        self.assertRegex(job.file.name, r'^reports/\d{4}/\d{2}/[0-9a-f]{32}\.pdf$')
+        self.assertTrue(os.path.isfile(os.path.join(self.private_root, job.file.name)))
+        self.assertEqual(os.listdir(self.media_root), [])
+        with self.assertRaises(ValueError):
+            job.file.url
+
+    def test_job_is_claimed_once(self):
+        service = ReportJobService()
+        job = service.enqueue('products', {}, self.user)
+        claimed = service.claim_next()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNone(service.claim_next())
+
+    def test_only_requester_or_admin_can_download(self):
+        ReportJobService().enqueue('products', {}, self.user)
+        job = ReportJobService().run(ReportJobService().claim_next())
+        self.assertEqual(job.status, 'done', job.error)
+
+        self.client.login(username='pdfother', password='password')
+        response = self.client.get(reverse('inventory:report_job_download', args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,152 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from .models import Category, Client, DailySalesFact, Inventory, Invoice, InvoiceItem, PointOfSale, Product
+from .services import SalesFactService
+
+
+FACT_FIELDS = ['date', 'point_of_sale_id', 'product_id', 'is_wholesale', 'quantity', 'gross', 'discount',
+               'cost_of_goods', 'margin']
+
+
+class DailySalesFactTests(TestCase):
+    """The daily sales table follows paid invoices after commit and matches a full rebuild"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='factuser', password='password')
+        category = Category.objects.create(name="Fact Category")
+        self.products = [
+            Product.objects.create(
+                name=f"Fact Product {i}", sku=f"FACT-{i:03d}", category=category,
+                purchase_price=Decimal('100.00') * (i + 1), selling_price=Decimal('150.00') * (i + 1),
+            )
+            for i in range(2)
+        ]
+        self.pos = PointOfSale.objects.create(name="Fact Store", code="FACT_A")
+        self.pos_b = PointOfSale.objects.create(name="Fact Store B", code="FACT_B")
+        for product in self.products:
+            for pos in (self.pos, self.pos_b):
+                Inventory.objects.create(product=product, point_of_sale=pos, quantity=1000, reorder_level=0)
+        self.client_obj = Client.objects.create(name="Fact Client")
+        self.day = date(2025, 4, 2)
+
+    def make_invoice(self, number, lines, status='paid'):
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice = Invoice.objects.create(
+                invoice_number=number, client=self.client_obj, point_of_sale=self.pos,
+                date_issued=self.day, date_due=self.day, status=status, apply_tax=False, created_by=self.user,
+            )
+            for product, quantity, discount in lines:
+                InvoiceItem.objects.create(
+                    invoice=invoice, product=product, quantity=quantity, unit_price=product.selling_price,
+                    discount=discount, total=product.selling_price * quantity,
+                )
+            invoice.calculate_totals()
+        return invoice
+
+    def facts(self):
+        return sorted(DailySalesFact.objects.values_list(*FACT_FIELDS))
+
+    def assertFactsMatchRebuild(self):
+        incremental = self.facts()
+        call_command('rebuild_sales_facts', stdout=StringIO())
+        self.assertEqual(incremental, self.facts())
+
+    def test_paid_invoice_is_aggregated_after_commit(self):
+        self.make_invoice('INV-FACT-1', [(self.products[0], 3, Decimal('10'))])
+        self.make_invoice('INV-FACT-2', [(self.products[0], 2, Decimal('0')), (self.products[1], 1, Decimal('0'))])
+        self.make_invoice('INV-FACT-3', [(self.products[1], 5, Decimal('0'))], status='draft')
+
+        fact = DailySalesFact.objects.get(product=self.products[0])
+        self.assertEqual((fact.date, fact.point_of_sale, fact.quantity), (self.day, self.pos, 5))
+        self.assertEqual(fact.gross, Decimal('750.00'))
+        self.assertEqual(fact.discount, Decimal('45.00'))
+        self.assertEqual(fact.net_sales, Decimal('705.00'))
+        self.assertEqual(fact.cost_of_goods, Decimal('500.00'))
+        self.assertEqual(fact.margin, Decimal('205.00'))
+        self.assertEqual(DailySalesFact.objects.get(product=self.products[1]).quantity, 1)
+        self.assertFactsMatchRebuild()
+
+    def test_moved_or_cancelled_invoice_updates_both_days(self):
+        invoice = self.make_invoice('INV-FACT-1', [(self.products[0], 3, Decimal('0'))])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.date_issued = date(2025, 4, 3)
+            invoice.point_of_sale = self.pos_b
+            invoice.save()
+        self.assertEqual(
+            list(DailySalesFact.objects.values_list('date', 'point_of_sale')),
+            [(date(2025, 4, 3), self.pos_b.pk)],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.status = 'cancelled'
+            invoice.save()
+        self.assertFalse(DailySalesFact.objects.exists())
+        self.assertFactsMatchRebuild()
+
+    def test_item_changes_on_paid_invoice_refresh_the_day(self):
+        invoice = self.make_invoice('INV-FACT-1', [(self.products[0], 3, Decimal('0'))])
+        item = invoice.invoiceitem_set.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.quantity = 4
+            item.save()
+            InvoiceItem.objects.create(
+                invoice=invoice, product=self.products[1], quantity=1,
+                unit_price=self.products[1].selling_price, total=self.products[1].selling_price,
+            )
+        self.assertEqual(DailySalesFact.objects.get(product=self.products[0]).quantity, 4)
+        self.assertEqual(DailySalesFact.objects.count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertFalse(DailySalesFact.objects.filter(product=self.products[0]).exists())
+        self.assertFactsMatchRebuild()
+
+    def test_rebuild_restores_a_period(self):
+        self.make_invoice('INV-FACT-1', [(self.products[0], 3, Decimal('0'))])
+        expected = self.facts()
+        DailySalesFact.objects.all().delete()
+
+        self.assertEqual(SalesFactService.rebuild(date(2025, 4, 3)), 0)
+        self.assertEqual(SalesFactService.rebuild(self.day, self.day), 1)
+        self.assertEqual(self.facts(), expected)
+
+    def test_rolled_back_days_are_forgotten(self):
+        stale = DailySalesFact.objects.create(
+            date=self.day, point_of_sale=self.pos, product=self.products[0], quantity=99, gross=Decimal('1.00'),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    SalesFactService.queue_refresh([(self.day, self.pos.pk)])
+                    raise RuntimeError("vente annulée")
+            SalesFactService.queue_refresh([(date(2025, 4, 3), self.pos.pk)])
+
+        # Seul le jour de la transaction validée a été recalculé
+        self.assertTrue(DailySalesFact.objects.filter(pk=stale.pk).exists())
+
+    def test_days_are_refreshed_once_per_transaction(self):
+        with mock.patch.object(SalesFactService, 'refresh_days', wraps=SalesFactService.refresh_days) as refresh:
+            self.make_invoice('INV-FACT-1', [(self.products[0], 3, Decimal('0')), (self.products[1], 1, Decimal('0'))])
+        refresh.assert_called_once_with({(self.day, self.pos.pk)})
+        self.assertEqual(DailySalesFact.objects.count(), 2)
+
+    def test_refresh_failure_does_not_fail_the_committed_sale(self):
+        with mock.patch.object(DailySalesFact.objects, 'bulk_create', side_effect=IntegrityError("doublon")):
+            with self.assertLogs('inventory.services.sales_fact_service', 'ERROR') as logs:
+                invoice = self.make_invoice('INV-FACT-1', [(self.products[0], 3, Decimal('0'))])
+        self.assertIn('rebuild_sales_facts --start 2025-04-02 --end 2025-04-02', logs.output[0])
+        self.assertTrue(Invoice.objects.filter(pk=invoice.pk, status='paid').exists())
+
+        # La réparation indiquée rattrape le jour
+        call_command('rebuild_sales_facts', '--start', '2025-04-02', '--end', '2025-04-02', stdout=StringIO())
+        self.assertEqual(DailySalesFact.objects.get().quantity, 3)
@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Settings
+
+
+class CachedSettingsTests(TestCase):
+    """Settings singleton is read from the cache and refreshed on save"""
+
+    def setUp(self):
+        cache.clear()
+        Settings.objects.all().delete()
+
+    def test_missing_settings_are_cached(self):
+        self.assertIsNone(Settings.get_current())
+        with self.assertNumQueries(0):
+            self.assertIsNone(Settings.get_current())
+
+    def test_save_and_delete_invalidate_cache(self):
+        Settings.get_current()
+        settings = Settings.objects.create(company_name="Vev Shop")
+        self.assertEqual(Settings.get_current().company_name, "Vev Shop")
+
+        settings.currency = 'GNF'
+        settings.company_name = "Vev Shop 2"
+        settings.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(Settings.get_current().company_name, "Vev Shop 2")
+            Settings.get_current()
+
+        settings.delete()
+        self.assertIsNone(Settings.get_current())
+
+    def test_cached_settings_expire(self):
+        # Une modification faite par un autre processus n'invalide pas ce cache-ci
+        Settings.objects.create(company_name="Vev Shop")
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            Settings.get_current()
+        cache_set.assert_called_once_with(Settings.CACHE_KEY, mock.ANY, Settings.CACHE_TIMEOUT)
+        self.assertTrue(0 < Settings.CACHE_TIMEOUT <= 300)
+
+    def test_page_does_not_query_settings_when_warm(self):
+        Settings.objects.create(company_name="Vev Shop")
+        user = User.objects.create_superuser(username='settingsadmin', password='password')
+        self.client.force_login(user)
+        self.client.get(reverse('inventory:profit_report'))
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('inventory:profit_report'))
+        settings_queries = [q for q in context.captured_queries if 'inventory_settings' in q['sql']]
+        self.assertEqual(settings_queries, [])
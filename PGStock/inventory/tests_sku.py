@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from .models import Category, Product, SkuSequence
+
+
+class SkuAllocationTests(TestCase):
+    """Automatic SKUs come from a per-prefix counter, reserved in bulk"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Boissons")
+
+    def make_product(self, sku=''):
+        return Product.objects.create(
+            name="Produit", sku=sku, category=self.category,
+            purchase_price=Decimal('1.00'), selling_price=Decimal('2.00')
+        )
+
+    def test_sequential_skus(self):
+        self.assertEqual(self.make_product().sku, 'BOI-0001')
+        self.assertEqual(self.make_product().sku, 'BOI-0002')
+
+    def test_counter_starts_after_existing_skus(self):
+        self.make_product('BOI-0009')
+        self.make_product('BOI-12000')
+        self.make_product('BOI-SPECIAL')
+        self.assertEqual(self.make_product().sku, 'BOI-12001')
+
+    def test_bulk_reservation_is_constant_time(self):
+        Product.allocate_skus(self.category, 1)
+        with self.assertNumQueries(3):  # UPDATE, lecture du compteur, contrôle des SKU pris
+            skus = Product.allocate_skus(self.category, 1000)
+        self.assertEqual(len(set(skus)), 1000)
+        self.assertEqual(skus[0], 'BOI-0002')
+        self.assertEqual(skus[-1], 'BOI-1001')
+
+    def test_pre_numbered_skus_are_skipped(self):
+        self.make_product()  # BOI-0001, crée le compteur
+        self.make_product('BOI-0003')
+        self.make_product('BOI-0050')
+        skus = Product.allocate_skus(self.category, 3)
+        self.assertEqual(skus, ['BOI-0002', 'BOI-0004', 'BOI-0051'])
+        self.assertEqual(SkuSequence.objects.get(prefix='BOI').last_value, 51)
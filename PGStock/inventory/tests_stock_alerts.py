@@ -0,0 +1,118 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Category, Inventory, PointOfSale, Product, Settings, StockAlert, StockMovement
+from .services import StockAlertService, StockService
+
+
+class StockAlertTests(TestCase):
+    """Low-stock alerts are queued per (product, POS) after commit and mailed as a digest"""
+
+    def setUp(self):
+        cache.clear()
+        Settings.objects.create(company_name="Alert Shop", email_notifications=True)
+        self.user = User.objects.create_user(username='alertuser', password='password')
+        category = Category.objects.create(name="Alert Category")
+        self.pos = PointOfSale.objects.create(name="Alert Store", code="ALERT")
+        self.pos_b = PointOfSale.objects.create(name="Alert Store B", code="ALERT_B")
+        self.product = Product.objects.create(
+            name="Alert Product", sku="ALERT-001", category=category, selling_price=Decimal('10.00')
+        )
+        self.other = Product.objects.create(
+            name="Other Product", sku="ALERT-002", category=category, selling_price=Decimal('10.00')
+        )
+        for product in (self.product, self.other):
+            Inventory.objects.create(product=product, point_of_sale=self.pos, quantity=10, reorder_level=5)
+            Inventory.objects.create(product=product, point_of_sale=self.pos_b, quantity=8, reorder_level=5)
+
+    def sell(self, product, quantity, pos=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService().process_exit(product=product, quantity=quantity, point_of_sale=pos or self.pos, user=self.user)
+
+    def test_alert_is_queued_after_commit_for_the_moved_pos(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            StockService().process_exit(product=self.product, quantity=5, point_of_sale=self.pos, user=self.user)
+        self.assertFalse(StockAlert.objects.exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+        for callback in callbacks:
+            callback()
+        alert = StockAlert.objects.get()
+        self.assertEqual((alert.product, alert.point_of_sale, alert.quantity), (self.product, self.pos, 5))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_alerts_are_deduplicated_within_window(self):
+        service = StockAlertService()
+        self.sell(self.product, 5)
+        pair = [(self.product.pk, self.pos.pk)]
+        self.assertEqual(service.evaluate(pair), [])
+        self.assertEqual(StockAlert.objects.count(), 1)
+
+        service.send_digest()
+        self.assertEqual(service.evaluate(pair), [])
+
+        StockAlert.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(len(service.evaluate(pair)), 1)
+        self.assertEqual(StockAlert.objects.filter(status='pending').count(), 1)
+
+    def test_digest_groups_alerts_in_one_mail(self):
+        self.sell(self.product, 5)
+        self.sell(self.other, 5)
+        self.sell(self.product, 3, pos=self.pos_b)
+
+        call_command('send_stock_alerts', '--once', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertIn('3 produits', message.subject)
+        self.assertIn('ALERT-001', message.body)
+        self.assertIn('ALERT-002', message.body)
+        self.assertIn('Alert Store B', message.body)
+        self.assertEqual(StockAlert.objects.filter(status='sent').count(), 3)
+
+        StockAlertService().send_digest()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_recovered_stock_is_not_mailed(self):
+        self.sell(self.product, 5)
+        Inventory.objects.filter(product=self.product, point_of_sale=self.pos).update(quantity=50)
+
+        self.assertEqual(StockAlertService().send_digest(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(StockAlert.objects.get().status, 'resolved')
+
+    def test_failed_delivery_is_retried(self):
+        self.sell(self.product, 5)
+        service = StockAlertService()
+        with mock.patch('inventory.services.stock_alert_service.send_mail', side_effect=OSError("SMTP down")):
+            self.assertEqual(service.send_digest(), 0)
+        alert = StockAlert.objects.get()
+        self.assertEqual((alert.status, alert.attempts), ('pending', 1))
+        self.assertIn("SMTP down", alert.error)
+
+        self.assertEqual(service.send_digest(), 1)
+        self.assertEqual(StockAlert.objects.get().status, 'sent')
+
+    def test_notifications_disabled(self):
+        Settings.objects.update(email_notifications=False)
+        Settings.clear_cache()
+        self.sell(self.product, 5)
+        self.assertFalse(StockAlert.objects.exists())
+
+    def test_batched_movements_queue_one_check(self):
+        movements = [
+            StockMovement(product=product, movement_type='exit', quantity=5, from_point_of_sale=self.pos, user=self.user)
+            for product in (self.product, self.other)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService().apply_movements(movements)
+        self.assertEqual(StockAlert.objects.count(), 2)
@@ -0,0 +1,298 @@
+import threading
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+
+from .models import (
+    Category, Product, PointOfSale, Inventory, StockMovement,
+    Client, Invoice, InvoiceItem, ProductStockSummary
+)
+from .services import StockService
+from .services.stock_ledger import StockLedger
+
+
+class StockLedgerTests(TestCase):
+    """Tests for database-side inventory updates"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ledgeruser', password='password')
+        self.category = Category.objects.create(name="Ledger Category")
+        self.product = Product.objects.create(
+            name="Ledger Product",
+            sku="LED-001",
+            category=self.category,
+            purchase_price=Decimal('50.00'),
+            selling_price=Decimal('100.00'),
+            units_per_box=12
+        )
+        self.pos_a = PointOfSale.objects.create(name="Ledger Store A", code="LED_A")
+        self.pos_b = PointOfSale.objects.create(name="Ledger Store B", code="LED_B")
+        self.inv_a = Inventory.objects.create(product=self.product, point_of_sale=self.pos_a, quantity=100, reorder_level=0)
+
+    def move(self, movement_type, quantity, **kwargs):
+        kwargs.setdefault('from_point_of_sale', self.pos_a)
+        return StockMovement.objects.create(
+            product=self.product,
+            movement_type=movement_type,
+            quantity=quantity,
+            user=self.user,
+            **kwargs
+        )
+
+    def test_exit_and_return(self):
+        self.move('exit', 30)
+        self.inv_a.refresh_from_db()
+        self.assertEqual(self.inv_a.quantity, 70)
+
+        self.move('return', 5)
+        self.inv_a.refresh_from_db()
+        self.assertEqual(self.inv_a.quantity, 75)
+
+    def test_wholesale_entry_counts_units(self):
+        self.move('entry', 2)
+        self.inv_a.refresh_from_db()
+        self.assertEqual(self.inv_a.quantity, 100 + 2 * 12)
+
+    def test_adjustment_sets_quantity(self):
+        self.move('adjustment', 7)
+        self.inv_a.refresh_from_db()
+        self.assertEqual(self.inv_a.quantity, 7)
+
+    def test_transfer_creates_destination_row(self):
+        self.move('transfer', 40, to_point_of_sale=self.pos_b)
+        self.inv_a.refresh_from_db()
+        inv_b = Inventory.objects.get(product=self.product, point_of_sale=self.pos_b)
+        self.assertEqual(self.inv_a.quantity, 60)
+        self.assertEqual(inv_b.quantity, 40)
+
+    def test_stale_instance_does_not_overwrite_stock(self):
+        """A concurrent write between two movements must not be lost"""
+        Inventory.objects.filter(pk=self.inv_a.pk).update(quantity=500)
+        self.move('exit', 10)
+        self.inv_a.refresh_from_db()
+        self.assertEqual(self.inv_a.quantity, 490)
+
+    def test_lock_order_is_deterministic(self):
+        keys = [(2, 9), (1, 5), (2, 1), (1, 5)]
+        self.assertEqual(StockLedger.sort_keys(keys), [(1, 5), (2, 1), (2, 9)])
+
+
+class StockBatchTests(TestCase):
+    """Tests for StockService.apply_movements"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='batchuser', password='password')
+        self.category = Category.objects.create(name="Batch Category")
+        self.products = [
+            Product.objects.create(
+                name=f"Batch Product {i}",
+                sku=f"BAT-{i:03d}",
+                category=self.category,
+                purchase_price=Decimal('10.00'),
+                selling_price=Decimal('15.00'),
+                units_per_box=6
+            )
+            for i in range(20)
+        ]
+        self.pos = PointOfSale.objects.create(name="Batch Store", code="BATCH")
+        for product in self.products:
+            Inventory.objects.create(product=product, point_of_sale=self.pos, quantity=100, reorder_level=0)
+        self.service = StockService()
+
+    def exits(self, count, quantity=1):
+        return [
+            StockMovement(
+                product=product,
+                movement_type='exit',
+                quantity=quantity,
+                from_point_of_sale=self.pos,
+                user=self.user
+            )
+            for product in self.products[:count]
+        ]
+
+    def count_queries(self, batch):
+        with CaptureQueriesContext(connection) as context:
+            self.service.apply_movements(batch)
+        return len(context.captured_queries)
+
+    def test_query_count_is_constant(self):
+        self.assertEqual(self.count_queries(self.exits(2)), self.count_queries(self.exits(20)))
+
+    def test_batch_matches_sequential_result(self):
+        pos_b = PointOfSale.objects.create(name="Batch Store B", code="BATCH_B")
+        product = self.products[0]
+        self.service.apply_movements([
+            StockMovement(product=product, movement_type='exit', quantity=10, from_point_of_sale=self.pos),
+            StockMovement(product=product, movement_type='exit', quantity=2, is_wholesale=True, from_point_of_sale=self.pos),
+            StockMovement(product=product, movement_type='transfer', quantity=30, from_point_of_sale=self.pos, to_point_of_sale=pos_b),
+            StockMovement(product=product, movement_type='exit', quantity=5, from_point_of_sale=pos_b),
+        ])
+        self.assertEqual(Inventory.objects.get(product=product, point_of_sale=self.pos).quantity, 100 - 10 - 12 - 30)
+        self.assertEqual(Inventory.objects.get(product=product, point_of_sale=pos_b).quantity, 25)
+        self.assertEqual(StockMovement.objects.filter(product=product).count(), 4)
+
+    def test_invalid_line_rolls_back_batch(self):
+        batch = self.exits(3)
+        batch.append(StockMovement(
+            product=self.products[0], movement_type='exit', quantity=500, from_point_of_sale=self.pos
+        ))
+        with self.assertRaises(ValidationError):
+            self.service.apply_movements(batch)
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertEqual(Inventory.objects.get(product=self.products[0], point_of_sale=self.pos).quantity, 100)
+
+    def test_invoice_deduct_and_restore_stock(self):
+        client = Client.objects.create(name="Batch Client")
+        invoice = Invoice.objects.create(
+            invoice_number='INV-BATCH-1',
+            client=client,
+            point_of_sale=self.pos,
+            date_issued="2024-01-01",
+            date_due="2024-01-01",
+            created_by=self.user
+        )
+        for product in self.products[:5]:
+            InvoiceItem.objects.create(invoice=invoice, product=product, quantity=4, unit_price=Decimal('15.00'), total=Decimal('60.00'))
+
+        invoice.deduct_stock()
+        self.assertTrue(invoice.stock_deducted)
+        self.assertEqual(
+            list(Inventory.objects.filter(product__in=self.products[:5]).values_list('quantity', flat=True)),
+            [96] * 5
+        )
+
+        invoice.restore_stock()
+        self.assertFalse(invoice.stock_deducted)
+        self.assertEqual(
+            list(Inventory.objects.filter(product__in=self.products[:5]).values_list('quantity', flat=True)),
+            [100] * 5
+        )
+
+
+
+class ProductStockSummaryTests(TestCase):
+    """The per-product summary follows every inventory write"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='summaryuser', password='password')
+        self.category = Category.objects.create(name="Summary Category")
+        self.product = Product.objects.create(
+            name="Summary Product", sku="SUM-001", category=self.category,
+            purchase_price=Decimal('10.00'), selling_price=Decimal('15.00')
+        )
+        self.pos_a = PointOfSale.objects.create(name="Summary Store A", code="SUM_A")
+        self.pos_b = PointOfSale.objects.create(name="Summary Store B", code="SUM_B")
+
+    def summary(self):
+        return ProductStockSummary.objects.get(product=self.product)
+
+    def assertSummaryMatchesInventory(self):
+        expected = StockLedger.refresh_summaries([self.product.pk])[0]
+        summary = self.summary()
+        for field in ('total_quantity', 'pos_count', 'min_reorder_level', 'low_stock_count', 'in_stock_count', 'status'):
+            self.assertEqual(getattr(summary, field), getattr(expected, field), field)
+
+    def test_new_product_is_out_of_stock(self):
+        summary = self.summary()
+        self.assertEqual(summary.total_quantity, 0)
+        self.assertEqual(summary.status, 'out_of_stock')
+        self.assertEqual(self.product.get_stock_status(), 'out_of_stock')
+
+    def test_ledger_movements_update_summary(self):
+        Inventory.objects.create(product=self.product, point_of_sale=self.pos_a, quantity=0, reorder_level=2)
+        StockMovement.objects.create(
+            product=self.product, movement_type='entry', quantity=2,
+            from_point_of_sale=self.pos_a, user=self.user
+        )
+        self.assertEqual(self.summary().total_quantity, 2)
+        self.assertEqual(self.summary().status, 'low_stock')
+
+        StockMovement.objects.create(
+            product=self.product, movement_type='entry', quantity=1,
+            from_point_of_sale=self.pos_a, user=self.user
+        )
+        StockMovement.objects.create(
+            product=self.product, movement_type='transfer', quantity=1, is_wholesale=False,
+            from_point_of_sale=self.pos_a, to_point_of_sale=self.pos_b, user=self.user
+        )
+        summary = self.summary()
+        self.assertEqual(summary.total_quantity, 3)
+        self.assertEqual(summary.pos_count, 2)
+        self.assertSummaryMatchesInventory()
+
+        StockService().apply_movements([
+            StockMovement(product=self.product, movement_type='entry', quantity=20, from_point_of_sale=self.pos_b),
+        ])
+        self.assertEqual(self.summary().total_quantity, 23)
+        self.assertEqual(self.product.get_stock_status(), 'in_stock')
+        self.assertSummaryMatchesInventory()
+
+    def test_direct_inventory_writes_update_summary(self):
+        inventory = Inventory.objects.create(product=self.product, point_of_sale=self.pos_a, quantity=50, reorder_level=5)
+        self.assertEqual(self.summary().in_stock_count, 1)
+
+        inventory.reorder_level = 80
+        inventory.save()
+        self.assertEqual(self.summary().low_stock_count, 1)
+        self.assertEqual(self.summary().status, 'low_stock')
+
+        inventory.delete()
+        self.assertEqual(self.summary().total_quantity, 0)
+        self.assertEqual(self.summary().pos_count, 0)
+
+    def test_product_delete_cascades(self):
+        Inventory.objects.create(product=self.product, point_of_sale=self.pos_a, quantity=5)
+        self.product.delete()
+        self.assertFalse(ProductStockSummary.objects.exists())
+        self.assertFalse(Inventory.objects.exists())
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentSalesStressTests(TransactionTestCase):
+    """Concurrent tills selling the same product must not lose updates"""
+
+    workers = 8
+    sales_per_worker = 10
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Stress Category")
+        self.product = Product.objects.create(
+            name="Stress Product",
+            sku="STR-001",
+            category=self.category,
+            purchase_price=Decimal('1.00'),
+            selling_price=Decimal('2.00')
+        )
+        self.pos = PointOfSale.objects.create(name="Stress Store", code="STRESS")
+        self.inventory = Inventory.objects.create(product=self.product, point_of_sale=self.pos, quantity=1000, reorder_level=0)
+
+    def test_concurrent_exits(self):
+        errors = []
+
+        def sell():
+            try:
+                for _ in range(self.sales_per_worker):
+                    StockMovement.objects.create(
+                        product_id=self.product.id,
+                        movement_type='exit',
+                        quantity=1,
+                        from_point_of_sale_id=self.pos.id,
+                    )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sell) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 1000 - self.workers * self.sales_per_worker)
@@ -31,6 +31,9 @@ urlpatterns = [
     path('products/<int:pk>/', views.product_detail, name='product_detail'),
     path('products/import/', views.product_import, name='product_import'),
     path('products/import/template/', views.download_product_template, name='product_import_template'),
+    path('products/import/jobs/<int:pk>/', views.import_job_detail, name='import_job_detail'),
+    path('products/import/jobs/<int:pk>/status/', views.import_job_status, name='import_job_status'),
+    path('products/import/jobs/<int:pk>/retry/', views.import_job_retry, name='import_job_retry'),
     path('products/export/excel/', views.export_products_excel, name='export_products_excel'),
     path('products/export/pdf/', views.export_products_pdf, name='export_products_pdf'),
     # Inventory
@@ -85,9 +88,6 @@ urlpatterns = [
     path('quotes/<int:pk>/convert/', views.quote_convert, name='quote_convert'),
     path('quotes/<int:pk>/add_item/', views.quote_add_item, name='quote_add_item'),
     path('quotes/<int:pk>/delete_item/<int:item_pk>/', views.quote_delete_item, name='quote_delete_item'),
-    # API endpoints for charts
-    path('api/stock-evolution/', views.api_stock_evolution, name='api_stock_evolution'),
-    path('api/category-distribution/', views.api_category_distribution, name='api_category_distribution'),
     # Payments
     path('payments/', views.payment_list, name='payment_list'),
     path('invoices/<int:pk>/payment/', views.payment_create, name='payment_create'),
@@ -99,6 +99,9 @@ urlpatterns = [
     path('reports/', views.reports_view, name='reports'),
     path('reports/export/excel/', views.export_reports_excel, name='export_reports_excel'),
     path('reports/export/pdf/', views.export_reports_pdf, name='export_reports_pdf'),
+    path('reports/jobs/<int:pk>/', views.report_job_detail, name='report_job_detail'),
+    path('reports/jobs/<int:pk>/status/', views.report_job_status, name='report_job_status'),
+    path('reports/jobs/<int:pk>/download/', views.report_job_download, name='report_job_download'),
     # Points of Sale
     path('pos/', views.pos_list, name='pos_list'),
     path('pos/create/', views.pos_create, name='pos_create'),
@@ -109,6 +112,8 @@ urlpatterns = [
     # Quick Sale (POS)
     path('vendre/', views.quick_sale, name='quick_sale'),
     path('api/pos/products/', views.api_search_products, name='api_pos_search_products'),
+    path('api/pos/catalogue/', views.api_pos_catalogue, name='api_pos_catalogue'),
+    path('api/pos/stock/', views.api_pos_stock, name='api_pos_stock'),
     path('api/pos/clients/create/', views.api_create_client, name='api_pos_create_client'),
     # Bulk Stock Configuration
     path('stock/configure/', views.bulk_stock_configuration, name='bulk_stock_configuration'),
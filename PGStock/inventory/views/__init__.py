@@ -4,3 +4,6 @@ from .products import *
 from .receipts import *
 from .pos import *
 from .finance import *
+from .report_jobs import *
+from .import_jobs import *
+from .charts import *
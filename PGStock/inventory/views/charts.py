@@ -0,0 +1,209 @@
+import hashlib
+from datetime import datetime, time, timedelta
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+
+from ..models import Category, DailySalesFact, DataVersion, Invoice, StockMovement
+from ..permissions import filter_queryset_by_pos, get_user_permissions
+
+# Durée de vie d'une réponse en cache (la version change aussi à chaque écriture, voir signals.py)
+CHART_CACHE_TIMEOUT = 300
+
+# Fenêtre du graphique d'évolution du stock, en jours (par défaut et maximum)
+STOCK_EVOLUTION_DAYS = 30
+STOCK_EVOLUTION_MAX_DAYS = 365
+
+# Nombre de produits du graphique gros/détail (par défaut et maximum)
+PRODUCT_SALES_TYPE_LIMIT = 5
+PRODUCT_SALES_TYPE_MAX_LIMIT = 50
+
+ENTRY_TYPES = ['entry', 'return']
+EXIT_TYPES = ['exit', 'defective']
+
+
+def _chart_state(request):
+    """
+    Version des données, date de la dernière écriture et empreinte de la
+    demande (graphique, paramètres, rôle et POS de l'utilisateur, jour
+    courant), lues une fois par requête.
+
+    La version est celle du tableau de bord, partagée en base (DataVersion) :
+    une seule ligne lue, la même pour tous les processus.
+    """
+    state = getattr(request, '_chart_state', None)
+    if state is None:
+        permissions = get_user_permissions(request.user)
+        params = urlencode(sorted(request.GET.lists()), doseq=True)
+        version, last_write = DataVersion.get_state(DataVersion.DASHBOARD)
+        # Le jour fait partie de la clé : les fenêtres glissantes avancent sans écriture
+        fingerprint = '|'.join([
+            request.path, params, str(permissions.role), str(permissions.point_of_sale_id),
+            timezone.localdate().isoformat(),
+        ])
+        state = request._chart_state = (version, last_write, hashlib.md5(fingerprint.encode()).hexdigest())
+    return state
+
+
+def _chart_etag(request, *args, **kwargs):
+    version, _, digest = _chart_state(request)
+    return f'"chart-{version}-{digest}"'
+
+
+def _chart_last_modified(request, *args, **kwargs):
+    """Dernière écriture sur les données des graphiques, au plus tôt minuit (fenêtres glissantes)"""
+    _, last_write, _ = _chart_state(request)
+    midnight = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return max(last_write, midnight) if last_write else midnight
+
+
+def chart_api(view_func):
+    """
+    API de graphique : JSON gardé en cache par (graphique, paramètres, portée POS)
+    et revalidé par ETag / Last-Modified (304 tant que rien n'a été écrit).
+    """
+    @login_required
+    @condition(etag_func=_chart_etag, last_modified_func=_chart_last_modified)
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        version, _, digest = _chart_state(request)
+        key = f'inventory:charts:{version}:{digest}'
+        content = cache.get(key)
+        if content is not None:
+            response = HttpResponse(content, content_type='application/json')
+        else:
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.content, CHART_CACHE_TIMEOUT)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
+
+
+def _bounded_int(value, default, maximum):
+    try:
+        return min(max(int(value), 1), maximum)
+    except (TypeError, ValueError):
+        return default
+
+
+@chart_api
+def api_stock_evolution(request):
+    """API pour le graphique d'évolution du stock (entrées / sorties par jour)"""
+    days = _bounded_int(request.GET.get('days'), STOCK_EVOLUTION_DAYS, STOCK_EVOLUTION_MAX_DAYS)
+    end_date = timezone.localdate()
+    start_date = end_date - timedelta(days=days)
+
+    # Une requête groupée par jour pour toute la fenêtre
+    totals = {
+        row['day']: row
+        for row in StockMovement.objects.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(start_date, time.min)),
+        ).annotate(day=TruncDate('created_at')).values('day').annotate(
+            entries=Coalesce(Sum('quantity', filter=Q(movement_type__in=ENTRY_TYPES)), 0),
+            exits=Coalesce(Sum('quantity', filter=Q(movement_type__in=EXIT_TYPES)), 0),
+        ).order_by()
+    }
+
+    labels = []
+    entries_data = []
+    exits_data = []
+    for offset in range(days + 1):
+        day = start_date + timedelta(days=offset)
+        row = totals.get(day, {})
+        labels.append(day.strftime('%d/%m'))
+        entries_data.append(row.get('entries', 0))
+        exits_data.append(row.get('exits', 0))
+
+    return JsonResponse({
+        'labels': labels,
+        'entries': entries_data,
+        'exits': exits_data
+    })
+
+
+@chart_api
+def api_category_distribution(request):
+    """API pour le graphique de répartition du stock par catégorie"""
+    categories = Category.objects.annotate(
+        total_quantity=Sum('product__inventory__quantity')
+    ).filter(total_quantity__gt=0).order_by('-total_quantity').values('name', 'total_quantity')
+
+    return JsonResponse({
+        'labels': [cat['name'] for cat in categories],
+        'data': [cat['total_quantity'] for cat in categories]
+    })
+
+
+@chart_api
+def api_monthly_revenue(request):
+    """API pour l'évolution mensuelle des revenus sur 12 mois"""
+    twelve_months_ago = timezone.now() - timedelta(days=365)
+
+    revenue_data = Invoice.objects.filter(
+        status='paid',
+        date_issued__gte=twelve_months_ago
+    ).annotate(
+        month=TruncMonth('date_issued')
+    ).values('month').annotate(
+        total=Sum('total_amount')
+    ).order_by('month')
+
+    return JsonResponse({
+        'labels': [item['month'].strftime('%b %Y') for item in revenue_data],
+        'data': [float(item['total']) for item in revenue_data]
+    })
+
+
+@chart_api
+def api_product_sales_type(request):
+    """
+    API pour comparer les ventes en gros vs détail des top produits.
+    Paramètres : ?limit= (5 par défaut), ?pos=, ?start_date= / ?end_date= ou ?date=
+    """
+    limit = _bounded_int(request.GET.get('limit'), PRODUCT_SALES_TYPE_LIMIT, PRODUCT_SALES_TYPE_MAX_LIMIT)
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    specific_date = request.GET.get('date')
+    if specific_date:
+        start_date = end_date = specific_date
+
+    # Ventes journalières payées, limitées au point de vente de l'utilisateur STAFF
+    facts = filter_queryset_by_pos(DailySalesFact.objects.all(), request.user, 'point_of_sale')
+    pos_id = request.GET.get('pos')
+    if pos_id:
+        facts = facts.filter(point_of_sale_id=pos_id) if pos_id.isdigit() else facts.none()
+    try:
+        if start_date:
+            facts = facts.filter(date__gte=datetime.strptime(start_date, '%Y-%m-%d').date())
+        if end_date:
+            facts = facts.filter(date__lte=datetime.strptime(end_date, '%Y-%m-%d').date())
+    except ValueError:
+        return JsonResponse({'error': 'Date invalide (AAAA-MM-JJ attendu)'}, status=400)
+
+    # Top N par quantité totale, détail et gros en une seule requête groupée par produit
+    top_products = facts.values('product_id', 'product__name').annotate(
+        total_qty=Sum('quantity'),
+        retail_qty=Coalesce(Sum('quantity', filter=Q(is_wholesale=False)), 0),
+        wholesale_qty=Coalesce(Sum('quantity', filter=Q(is_wholesale=True)), 0)
+    ).order_by('-total_qty', 'product_id')[:limit]
+
+    data = {
+        'labels': [],
+        'retail': [],
+        'wholesale': []
+    }
+    for row in top_products:
+        data['labels'].append(row['product__name'])
+        data['retail'].append(int(row['retail_qty']))
+        data['wholesale'].append(int(row['wholesale_qty']))
+
+    return JsonResponse(data)
@@ -8,12 +8,13 @@ from datetime import datetime
 from ..models import Expense, ExpenseCategory, PointOfSale, MonthlyProfitReport
 from ..forms import ExpenseForm, ExpenseCategoryForm
 from ..services import FinanceService
+from ..permissions import is_superuser_or_admin
 
 @login_required
 def expense_list(request):
     """Affiche la liste des dépenses"""
     # Vérifier les permissions
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé. Cette page est réservée aux administrateurs.")
         return redirect('inventory:dashboard')
     
@@ -25,7 +26,7 @@ def expense_list(request):
 @login_required
 def expense_detail(request, pk):
     """Affiche les détails d'une dépense"""
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé.")
         return redirect('inventory:dashboard')
     
@@ -38,7 +39,7 @@ def expense_detail(request, pk):
 def expense_add(request):
     """Ajouter une nouvelle dépense"""
     # Vérifier les permissions
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé. Cette page est réservée aux administrateurs.")
         return redirect('inventory:dashboard')
     
@@ -70,7 +71,7 @@ def expense_add(request):
 @login_required
 def expense_category_list(request):
     """Affiche la liste des catégories de dépenses"""
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé.")
         return redirect('inventory:dashboard')
     
@@ -82,7 +83,7 @@ def expense_category_list(request):
 @login_required
 def expense_category_add(request):
     """Ajouter une catégorie de dépense"""
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé.")
         return redirect('inventory:dashboard')
     
@@ -103,7 +104,7 @@ def expense_category_add(request):
 @login_required
 def expense_category_edit(request, pk):
     """Modifier une catégorie de dépense"""
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé.")
         return redirect('inventory:dashboard')
     
@@ -126,7 +127,7 @@ def expense_category_edit(request, pk):
 @login_required
 def expense_category_delete(request, pk):
     """Supprimer une catégorie de dépense"""
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé.")
         return redirect('inventory:dashboard')
     
@@ -140,7 +141,7 @@ def expense_category_delete(request, pk):
 @login_required
 def expense_edit(request, pk):
     """Modifier une dépense existante"""
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé.")
         return redirect('inventory:dashboard')
     
@@ -164,7 +165,7 @@ def expense_edit(request, pk):
 @login_required
 def expense_delete(request, pk):
     """Supprimer une dépense"""
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé.")
         return redirect('inventory:dashboard')
     
@@ -179,7 +180,7 @@ def expense_delete(request, pk):
 def profit_report(request):
     """Affiche le rapport de profit mensuel"""
     # Vérifier les permissions
-    if not request.user.is_superuser and not request.user.groups.filter(name__in=['SUPERUSER', 'Admin']).exists():
+    if not is_superuser_or_admin(request.user):
         messages.error(request, "⛔ Accès refusé. Cette page est réservée aux administrateurs.")
         return redirect('inventory:dashboard')
     
@@ -187,17 +188,15 @@ def profit_report(request):
     month = int(request.GET.get('month', today.month))
     year = int(request.GET.get('year', today.year))
     
-    # Mettre à jour les rapports pour le mois demandé
-    FinanceService.update_all_reports_for_month(month, year)
+    # Rapports tenus à jour par les signaux ; seuls les rapports périmés sont recalculés
+    reports = FinanceService.get_month_reports(month, year)
     
-    reports = MonthlyProfitReport.objects.filter(month=month, year=year)
-    
-    # Totaux globaux
-    global_sales_brut = reports.aggregate(t=Sum('total_sales_brut'))['t'] or 0
-    global_discounts = reports.aggregate(t=Sum('total_discounts'))['t'] or 0
+    # Totaux globaux (calculés sur les rapports déjà chargés)
+    global_sales_brut = sum(report.total_sales_brut for report in reports)
+    global_discounts = sum(report.total_discounts for report in reports)
     global_net_sales = global_sales_brut - global_discounts
     
-    global_profit = reports.aggregate(t=Sum('net_interest'))['t'] or 0
+    global_profit = sum(report.net_interest for report in reports)
     
     # Données pour le graphique (Jan-Déc)
     monthly_data = MonthlyProfitReport.objects.filter(year=year).values('month').annotate(
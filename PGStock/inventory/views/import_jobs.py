@@ -0,0 +1,50 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib import messages
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+
+from ..models import ImportJob
+from ..services import ImportJobService
+from ..services.base import ServiceException
+from ..permissions import superuser_required
+
+
+@superuser_required
+def import_job_detail(request, pk):
+    """Suivi d'une importation de produits"""
+    job = get_object_or_404(ImportJob, pk=pk)
+    return render(request, 'inventory/product/import_job_detail.html', {
+        'job': job,
+    })
+
+
+@superuser_required
+def import_job_status(request, pk):
+    """Progression d'une importation (JSON, pour le rafraîchissement de la page de suivi)"""
+    job = get_object_or_404(ImportJob, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progress': job.progress_percent,
+        'rows_done': job.rows_done,
+        'total_rows': job.total_rows,
+        'created': job.created_count,
+        'updated': job.updated_count,
+        'error_count': job.error_count,
+        'error': job.error,
+    })
+
+
+@superuser_required
+@require_POST
+def import_job_retry(request, pk):
+    """Relancer une importation en échec (reprise après le dernier lot validé)"""
+    job = get_object_or_404(ImportJob, pk=pk)
+    try:
+        ImportJobService().retry(job)
+    except ServiceException as e:
+        messages.error(request, str(e))
+    else:
+        messages.info(request, f"🔁 L'importation reprendra à la ligne {job.last_line + 1}.")
+    return redirect('inventory:import_job_detail', pk=job.pk)
@@ -20,9 +20,9 @@ from django.core.paginator import Paginator
 
 from django.core.exceptions import ValidationError
 
-from django.db.models import F, Q, Sum, Count, Prefetch
+from django.db.models import F, Q, Sum, Count, Prefetch, OuterRef, Subquery
 
-from django.db.models.functions import Coalesce, TruncMonth
+from django.db.models.functions import Coalesce
 
 from django.db.models.deletion import ProtectedError
 from django.db import transaction
@@ -34,6 +34,7 @@ from django.utils import translation
 from django.urls import reverse
 
 from datetime import datetime, timedelta
+from itertools import chain
 
 from decimal import Decimal
 
@@ -73,7 +74,12 @@ from django.conf import settings
 
 from django.utils.crypto import get_random_string
 
-from ..models import UserProfile
+from ..models import UserProfile, ImportJob, DailySalesFact
+from .report_jobs import enqueue_pdf_report
+from ..services.dashboard_service import DashboardService, CountedPaginator
+from ..services.invoice_service import InvoiceService, PENDING_STATUSES
+from ..services.import_job_service import ImportJobService
+from ..services.base import ServiceException
 
 
 
@@ -394,14 +400,6 @@ def password_reset_confirm(request):
 
 
 
-def is_admin(user):
-
-    """Vérifie si l'utilisateur est un administrateur"""
-
-    return user.is_superuser or user.groups.filter(name='Admin').exists()
-
-
-
 @admin_required
 
 def user_list(request):
@@ -666,105 +664,19 @@ def user_delete(request, pk):
 def dashboard(request):
 
     """Tableau de bord principal"""
+    # Tuiles (compteurs, valeurs, statistiques) : instantané en cache par (rôle, POS)
+    snapshot = DashboardService.get_snapshot(request.user)
+    show_finances = can_view_finances(request.user)
 
-    # Statistiques générales
-
-    total_products = Product.objects.count()
-
-    total_categories = Category.objects.count()
-
-    total_suppliers = Supplier.objects.count()
-
-    total_clients = Client.objects.count()
-
-    
-
-    # Stock
-
-    low_stock_count = Inventory.objects.filter(quantity__lte=F('reorder_level'), quantity__gt=0).count()
-
-    out_of_stock_count = Inventory.objects.filter(quantity=0).count()
-
-    total_stock_value = Product.objects.aggregate(
-
-        total=Sum(F('selling_price') * F('inventory__quantity'))
-
-    )['total'] or Decimal('0.00')
-
-    
-
-    # Bénéfice estimé
-    total_estimated_profit = Decimal('0.00')
-    if can_view_finances(request.user):
-        total_estimated_profit = Product.objects.aggregate(
-            total=Sum((F('selling_price') - F('purchase_price')) * F('inventory__quantity'))
-        )['total'] or Decimal('0.00')
-    
-    # Ventes
-    invoices_qs = Invoice.objects.all()
-    invoices_qs = filter_queryset_by_pos(invoices_qs, request.user, 'point_of_sale')
-    
-    total_sales = invoices_qs.filter(status='paid').aggregate(
-        total=Sum('total_amount')
-    )['total'] or Decimal('0.00')
-    
-    pending_orders = invoices_qs.filter(status='sent').count()
-    
-    # Mouvements récents
-    movements_qs = StockMovement.objects.all()
-    movements_qs = filter_queryset_by_pos(movements_qs, request.user, 'from_point_of_sale')
-    recent_movements = movements_qs.select_related('product', 'user').order_by('-created_at')[:10]
-    
-    # Produits en stock faible
-    inventory_qs = Inventory.objects.all()
-    inventory_qs = filter_queryset_by_pos(inventory_qs, request.user, 'point_of_sale')
-    
-    low_stock_products = inventory_qs.filter(
-        quantity__lte=F('reorder_level'),
-        quantity__gt=0
-    ).select_related('product')[:10]
-
-    # Produits retournés (derniers 10)
-
-    returned_products = StockMovement.objects.filter(
-
-        movement_type='return'
-
-    ).select_related('product').order_by('-created_at')[:10]
-
-    
-
-    invoice_stats = []
-
-    statuses = [
-
-        ('paid', 'Payées', 'bg-emerald-100 text-emerald-800 dark:bg-emerald-900 dark:text-emerald-200'),
-
-        ('sent', 'Envoyées', 'bg-blue-100 text-blue-800 dark:bg-blue-900 dark:text-blue-200'),
-
-        ('cancelled', 'Annulées', 'bg-red-100 text-red-800 dark:bg-red-900 dark:text-red-200'),
-
-        ('draft', 'Brouillon', 'bg-gray-100 text-gray-800 dark:bg-gray-700 dark:text-gray-300')
+    invoices_qs = filter_queryset_by_pos(Invoice.objects.all(), request.user, 'point_of_sale')
+    movements_qs = filter_queryset_by_pos(StockMovement.objects.all(), request.user, 'from_point_of_sale')
+    inventory_qs = filter_queryset_by_pos(Inventory.objects.all(), request.user, 'point_of_sale')
 
+    invoice_stats = [
+        {**stat, 'total': stat['total'] if show_finances else Decimal('0.00')}
+        for stat in snapshot['invoice_stats']
     ]
 
-    
-
-    for status, label, css_class in statuses:
-        stats = invoices_qs.filter(status=status).aggregate(
-            count=Count('id'),
-            total=Coalesce(Sum('total_amount'), Decimal('0.00'))
-        )
-        invoice_stats.append({
-            'label': label,
-            'status': status,
-            'css_class': css_class,
-            'count': stats['count'],
-            'total': stats['total'] if can_view_finances(request.user) else Decimal('0.00')
-        })
-
-    
-
     # Produits défectueux (derniers 10)
     defective_products = movements_qs.filter(
         movement_type='defective'
@@ -782,19 +694,18 @@ def dashboard(request):
     low_stock_products_list = inventory_qs.filter(
         quantity__lte=F('reorder_level'),
         quantity__gt=0
-    ).select_related('product', 'point_of_sale')
+    ).select_related('product', 'point_of_sale').order_by('pk')
 
     # Produits retournés
     returned_products_list = movements_qs.filter(
         movement_type='return'
     ).select_related('product').order_by('-created_at')
 
-    # Pagination for all lists
-    p_sales = Paginator(recent_sales_list, 5)
-
-    p_movements = Paginator(recent_movements_list, 5)
-    p_low_stock = Paginator(low_stock_products_list, 5)
-    p_returns = Paginator(returned_products_list, 5)
+    # Pagination (les totaux viennent de l'instantané : pas de COUNT par liste)
+    p_sales = CountedPaginator(recent_sales_list, 5, snapshot['recent_sales_count'])
+    p_movements = CountedPaginator(recent_movements_list, 5, snapshot['recent_movements_count'])
+    p_low_stock = CountedPaginator(low_stock_products_list, 5, snapshot['low_stock_list_count'])
+    p_returns = CountedPaginator(returned_products_list, 5, snapshot['returned_products_count'])
 
     page_sales = request.GET.get('page_sales', 1)
     page_movements = request.GET.get('page_movements', 1)
@@ -806,52 +717,26 @@ def dashboard(request):
     low_stock_products = p_low_stock.get_page(page_low_stock)
     returned_products = p_returns.get_page(page_returns)
 
-    # Répartition du stock par point de vente
-    stock_by_pos = PointOfSale.objects.annotate(
-        total_items=Coalesce(Sum('inventory__quantity'), 0),
-        total_value=Coalesce(Sum(F('inventory__quantity') * F('inventory__product__selling_price')), Decimal('0.00')),
-        total_profit=Coalesce(Sum(F('inventory__quantity') * (F('inventory__product__selling_price') - F('inventory__product__purchase_price'))), Decimal('0.00'))
-    ).filter(is_active=True)
-    
-    if not is_admin(request.user) and not request.user.is_superuser:
-        user_pos = get_user_pos(request.user)
-        if user_pos:
-            stock_by_pos = stock_by_pos.filter(id=user_pos.id)
-        else:
-            stock_by_pos = PointOfSale.objects.none()
-
-    # Répartition par catégorie
-    category_data = Category.objects.annotate(
-        count=Count('product')
-    ).values('name', 'count').order_by('-count')
-
-    top_selling_items = InvoiceItem.objects.values(
-        'product__id', 'product__name', 'product__sku', 'product__image'
-    ).annotate(
-        total_sold=Sum('quantity'),
-        total_revenue=Sum(F('quantity') * F('unit_price'))
-    ).order_by('-total_sold')[:5]
-
     context = {
-        'total_products': total_products,
-        'total_categories': total_categories,
-        'total_suppliers': total_suppliers,
-        'total_clients': total_clients,
-        'low_stock_count': low_stock_count,
-        'out_of_stock_count': out_of_stock_count,
-        'total_stock_value': total_stock_value if can_view_finances(request.user) else Decimal('0.00'),
-        'total_sales': total_sales if can_view_finances(request.user) else Decimal('0.00'),
-        'pending_orders': pending_orders,
+        'total_products': snapshot['total_products'],
+        'total_categories': snapshot['total_categories'],
+        'total_suppliers': snapshot['total_suppliers'],
+        'total_clients': snapshot['total_clients'],
+        'low_stock_count': snapshot['low_stock_count'],
+        'out_of_stock_count': snapshot['out_of_stock_count'],
+        'total_stock_value': snapshot['total_stock_value'] if show_finances else Decimal('0.00'),
+        'total_sales': snapshot['total_sales'] if show_finances else Decimal('0.00'),
+        'pending_orders': snapshot['pending_orders'],
         'recent_movements': recent_movements,
         'low_stock_products': low_stock_products,
         'returned_products': returned_products,
         'invoice_stats': invoice_stats,
         'defective_products': defective_products,
         'recent_sales': recent_sales,
-        'stock_by_pos': stock_by_pos,
-        'total_estimated_profit': total_estimated_profit if can_view_finances(request.user) else Decimal('0.00'),
-        'category_data': list(category_data),
-        'top_selling_items': top_selling_items,
+        'stock_by_pos': snapshot['stock_by_pos'],
+        'total_estimated_profit': snapshot['total_estimated_profit'] if show_finances else Decimal('0.00'),
+        'category_data': snapshot['category_data'],
+        'top_selling_items': snapshot['top_selling_items'],
     }
     
     return render(request, 'inventory/dashboard.html', context)
@@ -1405,7 +1290,7 @@ def product_list(request):
         'inventory_set__point_of_sale'
 
     ).annotate(
-        total_stock_annotated=Coalesce(Sum('inventory__quantity'), 0)
+        total_stock_annotated=Coalesce(F('stock_summary__total_quantity'), 0)
     ).all()
     
     # Filtrage par point de vente pour STAFF (Visibilité: Point de Vente uniquement)
@@ -1687,7 +1572,7 @@ def product_detail(request, pk):
     movements = paginator.get_page(page)
     
     # Récupérer les paramètres pour la devise
-    company_settings = Settings.objects.first()
+    company_settings = Settings.get_current()
     
     return render(request, 'inventory/product/product_detail.html', {
         'product': product,
@@ -1779,11 +1664,12 @@ def inventory_list(request):
     product_ids = inventories.values_list('product_id', flat=True).distinct()
     
     # On prépare le queryset de base des produits
-    products_qs = Product.objects.filter(id__in=product_ids).select_related('category').prefetch_related(
+    # Totaux lus dans le résumé de stock (pas de GROUP BY sur Inventory)
+    products_qs = Product.objects.filter(id__in=product_ids).select_related('category', 'stock_summary').prefetch_related(
         Prefetch('inventory_set', queryset=inventories, to_attr='filtered_inventories')
     ).annotate(
-        total_quantity=Sum('inventory__quantity'),
-        pos_count=Count('inventory__point_of_sale', distinct=True)
+        total_quantity=F('stock_summary__total_quantity'),
+        pos_count=F('stock_summary__pos_count')
     )
 
     # Filtre par statut (appliqué sur la quantité totale ou le statut spécifique)
@@ -1792,12 +1678,12 @@ def inventory_list(request):
         # Pour les filtres de statut, on doit parfois regarder au niveau global du produit
         if status_filter == 'low_stock':
             # Un produit est en stock faible s'il a au moins un inventaire en stock faible
-            products_qs = products_qs.filter(inventory__quantity__lte=F('inventory__reorder_level'), inventory__quantity__gt=0).distinct()
+            products_qs = products_qs.filter(stock_summary__low_stock_count__gt=0)
         elif status_filter == 'out_of_stock':
             # Un produit est en rupture s'il n'a pas de stock du tout (ou 0 sur les filtres actuels)
-            products_qs = products_qs.filter(total_quantity=0)
+            products_qs = products_qs.filter(stock_summary__total_quantity=0)
         elif status_filter == 'in_stock':
-            products_qs = products_qs.filter(inventory__quantity__gt=F('inventory__reorder_level')).distinct()
+            products_qs = products_qs.filter(stock_summary__in_stock_count__gt=0)
 
     # Récupération des options pour les filtres
     categories = Category.objects.all().order_by('name')
@@ -1828,7 +1714,8 @@ def inventory_list(request):
 @staff_required
 def export_inventory_excel(request):
     """Exporter l'inventaire en Excel"""
-    from ..excel_utils import export_to_excel
+    from ..excel_utils import export_to_excel, queryset_rows
+    from ..models import stock_analysis
     
     # Récupérer les filtres de la requête
     query = request.GET.get('q', '')
@@ -1836,7 +1723,7 @@ def export_inventory_excel(request):
     category_id = request.GET.get('category', '')
     pos_id = request.GET.get('pos', '')
     
-    inventories = Inventory.objects.select_related('product', 'product__category', 'point_of_sale').all()
+    inventories = Inventory.objects.all()
     inventories = filter_queryset_by_pos(inventories, request.user, 'point_of_sale')
     
     if query:
@@ -1863,91 +1750,45 @@ def export_inventory_excel(request):
         inventories = inventories.filter(point_of_sale_id=pos_id)
         
     headers = ['Produit', 'SKU', 'Catégorie', 'Qté Totale', 'Colis', 'Unités', 'Analyse', 'Seuil', 'Emplacement', 'Point de Vente', 'Statut']
-    data = []
+    fields = [
+        'product__name', 'product__sku', 'product__category__name', 'quantity',
+        'product__units_per_box', 'reorder_level', 'location', 'point_of_sale__name'
+    ]
     
-    for item in inventories:
-        status_label = 'En stock'
-        if item.quantity == 0:
-            status_label = 'Rupture'
-        elif item.quantity <= item.reorder_level:
-            status_label = 'Stock faible'
+    def build_rows(chunk):
+        rows = []
+        for name, sku, category, quantity, units_per_box, reorder_level, location, pos_name in chunk:
+            status_label = 'En stock'
+            if quantity == 0:
+                status_label = 'Rupture'
+            elif quantity <= reorder_level:
+                status_label = 'Stock faible'
             
-        analysis_data = item.get_analysis_data()
+            analysis_data = stock_analysis(quantity, units_per_box)
             
-        data.append([
-            item.product.name,
-            item.product.sku or '-',
-            item.product.category.name if item.product.category else '-',
-            item.quantity,
-            analysis_data['colis'],
-            analysis_data['unites'],
-            analysis_data['analysis'],
-            item.reorder_level,
-            item.location or '-',
-            item.point_of_sale.name,
-            status_label
-        ])
-    
-    return export_to_excel(headers, data, "Inventaire", "Inventaire")
+            rows.append([
+                name,
+                sku or '-',
+                category or '-',
+                quantity,
+                analysis_data['colis'],
+                analysis_data['unites'],
+                analysis_data['analysis'],
+                reorder_level,
+                location or '-',
+                pos_name,
+                status_label
+            ])
+        return rows
+    
+    rows = queryset_rows(inventories, fields, build_rows)
+    return export_to_excel(headers, rows, "Inventaire", "Inventaire")
 
 
 @staff_required
 def export_inventory_pdf(request):
-    """Exporter l'inventaire en PDF"""
-    import sys
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-            
-        # Récupérer les filtres
-        query = request.GET.get('q', '')
-        status_filter = request.GET.get('status', '')
-        category_id = request.GET.get('category', '')
-        pos_id = request.GET.get('pos', '')
-        
-        inventories = Inventory.objects.select_related('product', 'product__category', 'point_of_sale').all()
-        inventories = filter_queryset_by_pos(inventories, request.user, 'point_of_sale')
-        
-        if query:
-            inventories = inventories.filter(
-                Q(product__name__icontains=query) | 
-                Q(product__sku__icontains=query) |
-                Q(location__icontains=query) |
-                Q(product__description__icontains=query) |
-                Q(product__category__name__icontains=query)
-            )
-        if status_filter:
-            if status_filter == 'low_stock':
-                inventories = inventories.filter(quantity__lte=F('reorder_level'), quantity__gt=0)
-            elif status_filter == 'out_of_stock':
-                inventories = inventories.filter(quantity=0)
-            elif status_filter == 'in_stock':
-                inventories = inventories.filter(quantity__gt=F('reorder_level'))
-        if category_id:
-            inventories = inventories.filter(product__category_id=category_id)
-        if pos_id:
-            inventories = inventories.filter(point_of_sale_id=pos_id)
-            
-        context = {
-            'report_title': "Rapport d'Inventaire",
-            'inventories': inventories[:500],
-            'company_settings': Settings.objects.first(),
-            'generated_at': timezone.now(),
-        }
-        
-        template = get_template('inventory/reports_pdf/inventory_list_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Inventaire_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
-    finally:
-        if lxml_backup: sys.modules['lxml'] = lxml_backup
-        elif 'lxml' in sys.modules: del sys.modules['lxml']
+    """Exporter l'inventaire en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'inventory')
 
 
 
@@ -2032,7 +1873,7 @@ def inventory_detail(request, pk):
     movements = StockMovement.objects.filter(product=inventory.product).order_by('-created_at')[:20]
     
     # Récupérer les paramètres pour la devise
-    company_settings = Settings.objects.first()
+    company_settings = Settings.get_current()
     
     return render(request, 'inventory/inventory/inventory_detail.html', {
         'inventory': inventory,
@@ -2415,7 +2256,7 @@ def invoice_detail(request, pk):
 
     items = invoice.invoiceitem_set.select_related('product').all()
     
-    company_settings = Settings.objects.first()
+    company_settings = Settings.get_current()
 
     
 
@@ -2443,7 +2284,7 @@ def invoice_receipt(request, pk):
 
     items = invoice.invoiceitem_set.select_related('product').all()
 
-    settings = Settings.objects.first()
+    settings = Settings.get_current()
 
     
 
@@ -3049,240 +2890,9 @@ def quote_delete_item(request, pk, item_pk):
 
 
 
+# ==================== API VIEWS ====================
 
-
-# ==================== API VIEWS FOR CHARTS ====================
-
-
-
-@login_required
-
-def api_stock_evolution(request):
-
-    """API pour l'évolution des mouvements de stock"""
-
-    days = int(request.GET.get('days', 30))
-
-    end_date = timezone.now()
-
-    start_date = end_date - timedelta(days=days)
-
-    
-
-    movements = StockMovement.objects.filter(
-
-        created_at__gte=start_date
-
-    ).values('created_at__date', 'movement_type').annotate(
-
-        total=Sum('quantity')
-
-    ).order_by('created_at__date')
-
-    
-
-    data = {
-
-        'labels': [],
-
-        'entries': [],
-
-        'exits': []
-
-    }
-
-    
-
-    # Process data
-
-    date_dict = {}
-
-    for movement in movements:
-
-        date_str = movement['created_at__date'].strftime('%Y-%m-%d')
-
-        if date_str not in date_dict:
-
-            date_dict[date_str] = {'entry': 0, 'exit': 0}
-
-        
-
-        if movement['movement_type'] in ['entry', 'return']:
-
-            date_dict[date_str]['entry'] += movement['total']
-
-        elif movement['movement_type'] in ['exit', 'transfer', 'defective']:
-
-            date_dict[date_str]['exit'] += movement['total']
-
-    
-
-    for date_str in sorted(date_dict.keys()):
-
-        data['labels'].append(date_str)
-
-        data['entries'].append(date_dict[date_str]['entry'])
-
-        data['exits'].append(date_dict[date_str]['exit'])
-
-        
-
-    return JsonResponse(data)
-
-
-
-
-
-@login_required
-
-def api_category_distribution(request):
-
-    """API pour la distribution des produits par catégorie"""
-
-    categories = Category.objects.annotate(
-
-        total_quantity=Coalesce(Sum('product__inventory__quantity'), 0)
-
-    ).values('name', 'total_quantity')
-
-    
-
-    data = {
-
-        'labels': [cat['name'] for cat in categories],
-
-        'data': [cat['total_quantity'] for cat in categories]
-
-    }
-
-    
-
-    return JsonResponse(data)
-
-
-
-
-
-@login_required
-
-def api_monthly_revenue(request):
-
-    """API pour l'évolution mensuelle des revenus sur 12 mois"""
-
-    twelve_months_ago = timezone.now() - timedelta(days=365)
-
-    
-
-    revenue_data = Invoice.objects.filter(
-
-        status='paid',
-
-        date_issued__gte=twelve_months_ago
-
-    ).annotate(
-
-        month=TruncMonth('date_issued')
-
-    ).values('month').annotate(
-
-        total=Sum('total_amount')
-
-    ).order_by('month')
-
-    
-
-    data = {
-
-        'labels': [item['month'].strftime('%b %Y') for item in revenue_data],
-
-        'data': [float(item['total']) for item in revenue_data]
-
-    }
-
-    
-
-    return JsonResponse(data)
-
-
-
-
-
-@login_required
-
-def api_product_sales_type(request):
-
-    """API pour comparer les ventes en gros vs détail des top produits"""
-
-    # Top 5 produits par quantité totale vendue
-
-    top_products = InvoiceItem.objects.values('product__name').annotate(
-
-        total_qty=Sum('quantity')
-
-    ).order_by('-total_qty')[:5]
-
-    
-
-    product_names = [p['product__name'] for p in top_products]
-
-    
-
-    retail_data = []
-
-    wholesale_data = []
-
-    
-
-    for name in product_names:
-
-        retail_qty = InvoiceItem.objects.filter(
-
-            product__name=name, 
-
-            is_wholesale=False,
-
-            invoice__status='paid'
-
-        ).aggregate(total=Coalesce(Sum('quantity'), 0))['total']
-
-        
-
-        wholesale_qty = InvoiceItem.objects.filter(
-
-            product__name=name, 
-
-            is_wholesale=True,
-
-            invoice__status='paid'
-
-        ).aggregate(total=Coalesce(Sum('quantity'), 0))['total']
-
-        
-
-        retail_data.append(int(retail_qty))
-
-        wholesale_data.append(int(wholesale_qty))
-
-        
-
-    data = {
-
-        'labels': product_names,
-
-        'retail': retail_data,
-
-        'wholesale': wholesale_data
-
-    }
-
-    
-
-    return JsonResponse(data)
-
-
-
-
-
+# Les API des graphiques sont dans views/charts.py
 
 
 
@@ -3457,11 +3067,11 @@ def reports_view(request):
 
     # This matches the logic in Product.get_stock_status()
 
-    products_with_zero_stock = Product.objects.annotate(
+    products_with_zero_stock = Product.objects.filter(
 
-        total_quantity=Coalesce(Sum('inventory__quantity'), 0)
+        stock_summary__total_quantity=0
 
-    ).filter(total_quantity=0).select_related('category', 'supplier')
+    ).select_related('category', 'supplier').prefetch_related('inventory_set__point_of_sale')
 
     
 
@@ -3479,7 +3089,7 @@ def reports_view(request):
 
         # Get all inventory records for this product (even if they're all 0)
 
-        inventories = product.inventory_set.select_related('point_of_sale').all()
+        inventories = product.inventory_set.all()
 
         if inventories:
 
@@ -3515,43 +3125,41 @@ def reports_view(request):
 
     
 
-    # Sales stats (Filtered)
+    # Sales stats (Filtered) - une seule requête pour tous les statuts
 
-    total_sales = invoices.filter(status='paid').aggregate(
+    invoice_stats = InvoiceService.get_statistics(invoices)
 
-        total=Sum('total_amount')
+    total_sales = invoice_stats['paid']['total']
 
-    )['total'] or Decimal('0.00')
+    pending_invoices_count = invoice_stats['sent']['count']
+
+    pending_sales_amount = invoice_stats['sent']['total']
 
     
 
-    pending_invoices = invoices.filter(status='sent')
+    # Recent sales (NOT filtered by date - always show most recent)
 
-    pending_invoices_count = pending_invoices.count()
+    recent_sales = Invoice.objects.filter(status='paid').select_related('client').order_by('-date_issued')[:10]
 
-    pending_sales_amount = pending_invoices.aggregate(
+    
 
-        total=Sum('total_amount')
+    # Top products by sales (Filtered) - lus dans les ventes journalières, pas dans les lignes de facture
 
-    )['total'] or Decimal('0.00')
+    sales_facts = DailySalesFact.objects.all()
 
-    
-
-    # Recent sales (NOT filtered by date - always show most recent)
-
-    recent_sales = Invoice.objects.filter(status='paid').select_related('client').order_by('-date_issued')[:10]
+    if start_date:
 
-    
+        sales_facts = sales_facts.filter(date__gte=start_date)
 
-    # Top products by sales (Filtered)
+    if end_date:
 
-    # Note: We need to filter InvoiceItems based on the filtered Invoices
+        sales_facts = sales_facts.filter(date__lte=end_date)
 
-    top_products = InvoiceItem.objects.filter(invoice__in=invoices.filter(status='paid')).values('product__name').annotate(
+    top_products = sales_facts.values('product__name').annotate(
 
         total_quantity=Sum('quantity'),
 
-        total_revenue=Sum('total')
+        total_revenue=Sum(F('gross') - F('discount'))
 
     ).order_by('-total_revenue')[:5]
 
@@ -3565,200 +3173,90 @@ def reports_view(request):
 
     # --- DAILY STATISTICS ---
 
-    
+    # Une requête groupée (jour, point de vente) par source, fusionnées en une seule passe
 
-    # 1. Global Daily Stats
+    receipts = Receipt.objects.filter(status='validated')
 
-    daily_sales_qs = invoices.filter(status='paid').values('date_issued').annotate(
+    if start_date:
 
-        total=Coalesce(Sum('total_amount'), Decimal('0.00'))
+        receipts = receipts.filter(date_received__gte=start_date)
 
-    ).order_by('-date_issued')
+    if end_date:
 
-    
+        receipts = receipts.filter(date_received__lte=end_date)
 
-    daily_purchases_qs = Receipt.objects.filter(status='validated', date_received__gte=start_date if start_date else '1900-01-01').values('date_received').annotate(
+    daily_sales_rows = invoices.filter(status='paid').order_by().values_list(
 
-        total=Coalesce(Sum('total_amount'), Decimal('0.00'))
+        'date_issued', 'point_of_sale_id'
 
-    ).order_by('-date_received')
+    ).annotate(total=Sum('total_amount'))
 
-    
+    daily_purchase_rows = receipts.order_by().values_list(
 
-    if end_date:
+        'date_received', 'point_of_sale_id'
 
-        daily_purchases_qs = daily_purchases_qs.filter(date_received__lte=end_date)
+    ).annotate(total=Sum('total_amount'))
 
-        
+    points_of_sale = list(PointOfSale.objects.filter(is_active=True))
 
-    # Merge into a single dictionary by date
+    active_pos_ids = {pos.pk for pos in points_of_sale}
 
     daily_stats = {}
 
-    
-
-    for sale in daily_sales_qs:
+    pos_daily = {pos_id: {} for pos_id in active_pos_ids}
 
-        date_str = sale['date_issued'].strftime('%Y-%m-%d')
+    total_purchases_amount = Decimal('0.00')
 
-        if date_str not in daily_stats:
+    for key, rows in (('sales', daily_sales_rows), ('purchases', daily_purchase_rows)):
 
-            daily_stats[date_str] = {'date': sale['date_issued'], 'sales': Decimal('0.00'), 'purchases': Decimal('0.00'), 'profit': Decimal('0.00')}
+        for day, pos_id, total in rows:
 
-        daily_stats[date_str]['sales'] = sale['total']
+            total = total or Decimal('0.00')
 
-        
-
-    for purchase in daily_purchases_qs:
+            if key == 'purchases':
 
-        date_str = purchase['date_received'].strftime('%Y-%m-%d')
+                total_purchases_amount += total
 
-        if date_str not in daily_stats:
+            # 1. Global Daily Stats
 
-            daily_stats[date_str] = {'date': purchase['date_received'], 'sales': Decimal('0.00'), 'purchases': Decimal('0.00'), 'profit': Decimal('0.00')}
+            stats = daily_stats.setdefault(day, {'date': day, 'sales': Decimal('0.00'), 'purchases': Decimal('0.00'), 'profit': Decimal('0.00')})
 
-        daily_stats[date_str]['purchases'] = purchase['total']
+            stats[key] += total
 
-    
+            stats['profit'] = stats['sales'] - stats['purchases']
 
-    # Calculate profit for each day
+            # 2. Per POS Daily Stats (points de vente actifs)
 
-    for date_str, stats in daily_stats.items():
+            if pos_id in active_pos_ids:
 
-        stats['profit'] = stats['sales'] - stats['purchases']
+                pos_stats_day = pos_daily[pos_id].setdefault(day, {'date': day, 'sales': Decimal('0.00'), 'purchases': Decimal('0.00')})
 
-        
+                pos_stats_day[key] += total
 
     # Convert to sorted list
 
     daily_stats_list = sorted(daily_stats.values(), key=lambda x: x['date'], reverse=True)
 
-    
-
-    # 2. Per POS Daily Stats
-
     pos_stats = []
 
-    points_of_sale = PointOfSale.objects.filter(is_active=True)
-
-    
-
     for pos in points_of_sale:
 
-        # Sales for this POS
-
-        pos_sales = invoices.filter(status='paid', point_of_sale=pos).values('date_issued').annotate(
-
-            total=Coalesce(Sum('total_amount'), Decimal('0.00'))
-
-        )
-
-        
-
-        # Purchases for this POS
-
-        pos_receipts = Receipt.objects.filter(
-
-            status='validated', 
-
-            point_of_sale=pos,
-
-            date_received__gte=start_date if start_date else '1900-01-01'
-
-        )
-
-        if end_date:
-
-            pos_receipts = pos_receipts.filter(date_received__lte=end_date)
-
-            
-
-        pos_purchases = pos_receipts.values('date_received').annotate(
-
-            total=Coalesce(Sum('total_amount'), Decimal('0.00'))
-
-        )
-
-        
-
-        # Merge for this POS
-
-        pos_daily = {}
-
-        total_sales_pos = Decimal('0.00')
-
-        total_purchases_pos = Decimal('0.00')
-
-        
-
-        for sale in pos_sales:
-
-            date_str = sale['date_issued'].strftime('%Y-%m-%d')
-
-            if date_str not in pos_daily:
-
-                pos_daily[date_str] = {'date': sale['date_issued'], 'sales': Decimal('0.00'), 'purchases': Decimal('0.00')}
-
-            pos_daily[date_str]['sales'] = sale['total']
-
-            total_sales_pos += sale['total']
-
-            
-
-        for purchase in pos_purchases:
-
-            date_str = purchase['date_received'].strftime('%Y-%m-%d')
-
-            if date_str not in pos_daily:
-
-                pos_daily[date_str] = {'date': purchase['date_received'], 'sales': Decimal('0.00'), 'purchases': Decimal('0.00')}
-
-            pos_daily[date_str]['purchases'] = purchase['total']
-
-            total_purchases_pos += purchase['total']
-
-            
+        days = pos_daily[pos.pk]
 
-        if pos_daily: # Only add if there is data
+        if days: # Only add if there is data
 
             pos_stats.append({
 
                 'pos': pos,
 
-                'daily_data': sorted(pos_daily.values(), key=lambda x: x['date'], reverse=True),
+                'daily_data': sorted(days.values(), key=lambda x: x['date'], reverse=True),
 
-                'total_sales': total_sales_pos,
+                'total_sales': sum((day['sales'] for day in days.values()), Decimal('0.00')),
 
-                'total_purchases': total_purchases_pos
+                'total_purchases': sum((day['purchases'] for day in days.values()), Decimal('0.00'))
 
             })
 
-            
-
-    # Calculate Grand Totals (Purchases) - Sales is already 'total_sales' variable
-
-    total_purchases = Receipt.objects.filter(
-
-        status='validated',
-
-        date_received__gte=start_date if start_date else '1900-01-01'
-
-    )
-
-    if end_date:
-
-        total_purchases = total_purchases.filter(date_received__lte=end_date)
-
-        
-
-    total_purchases_amount = total_purchases.aggregate(
-
-        total=Coalesce(Sum('total_amount'), Decimal('0.00'))
-
-    )['total']
-
-    
-
     total_gross_profit = total_sales - total_purchases_amount
 
     
@@ -3970,7 +3468,7 @@ def settings_view(request):
 
     # Get or create the singleton settings object
 
-    settings_obj = Settings.objects.first()
+    settings_obj = Settings.get_current()
 
     if not settings_obj:
 
@@ -4228,128 +3726,8 @@ def export_reports_excel(request):
 
 @login_required
 def export_reports_pdf(request):
-    """Exporter les rapports en PDF"""
-    import sys
-    from io import BytesIO
-    
-    # Hack: Bypass broken lxml
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-        
-        # Date filtering
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        
-        if start_date in [None, '', 'None']:
-            start_date = None
-        if end_date in [None, '', 'None']:
-            end_date = None
-        
-        # Format dates for display
-        formatted_start_date = start_date if start_date else "Début"
-        formatted_end_date = end_date if end_date else "Fin"
-        
-        # Base querysets
-        invoices_qs = Invoice.objects.select_related('client').all()
-        inventories_qs = Inventory.objects.select_related('product', 'product__category').all()
-        
-        if start_date:
-            invoices_qs = invoices_qs.filter(date_issued__gte=start_date)
-        
-        if end_date:
-            invoices_qs = invoices_qs.filter(date_issued__lte=end_date)
-        
-        # Préparer les données d'inventaire avec tous les calculs en Python
-        inventories_data = []
-        for inventory in inventories_qs[:50]:  # Limiter à 50 pour le PDF
-            unit_price = float(inventory.product.selling_price)
-            quantity = int(inventory.quantity)
-            total_value = unit_price * quantity
-            
-            inventories_data.append({
-                'product_name': str(inventory.product.name),
-                'category_name': str(inventory.product.category.name) if inventory.product.category else '',
-                'quantity': quantity,
-                'unit_price': f"{unit_price:.2f}".replace('.', ','),
-                'total_value': f"{total_value:.2f}".replace('.', ','),
-            })
-        
-        # Préparer les données de factures avec tous les calculs en Python
-        invoices_data = []
-        status_map = {
-            'paid': 'Payée',
-            'sent': 'Envoyée',
-            'cancelled': 'Annulée',
-            'draft': 'Brouillon',
-            'partial': 'Partielle'
-        }
-        
-        for invoice in invoices_qs[:20]:  # Limiter à 20 pour le PDF
-            invoice_date = invoice.date_issued.strftime('%d/%m/%Y') if invoice.date_issued else ''
-            total_amount = float(invoice.total_amount)
-            
-            invoices_data.append({
-                'invoice_date': invoice_date,
-                'invoice_number': str(invoice.invoice_number),
-                'client_name': str(invoice.client.name),
-                'total_amount': f"{total_amount:.2f}".replace('.', ','),
-                'status_display': status_map.get(invoice.status, invoice.status),
-            })
-        
-        # Calculer les stats
-        total_stock_value = float(Product.objects.aggregate(
-            total=Sum(F('selling_price') * F('inventory__quantity'))
-        )['total'] or Decimal('0.00'))
-        
-        total_products = Product.objects.count()
-        
-        total_sales = float(invoices_qs.filter(status='paid').aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0.00'))
-        
-        pending_sales_amount = float(invoices_qs.filter(status='sent').aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0.00'))
-        
-        # Générer le contexte
-        generated_at = datetime.now().strftime('%d/%m/%Y %H:%M')
-        
-        context = {
-            'start_date': formatted_start_date,
-            'end_date': formatted_end_date,
-            'generated_at': generated_at,
-            'invoices': invoices_data,
-            'inventories': inventories_data,
-            'total_stock_value': f"{total_stock_value:.2f}".replace('.', ','),
-            'total_products': total_products,
-            'total_sales': f"{total_sales:.2f}".replace('.', ','),
-            'pending_sales_amount': f"{pending_sales_amount:.2f}".replace('.', ','),
-        }
-        
-        template_path = 'inventory/reports_pdf.html'
-        template = get_template(template_path)
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Rapport_Stock_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        
-        pisa_status = pisa.CreatePDF(
-            html, dest=response
-        )
-        
-        if pisa_status.err:
-            return HttpResponse('We had some errors <pre>' + html + '</pre>')
-        return response
-    finally:
-        if lxml_backup:
-            sys.modules['lxml'] = lxml_backup
-        else:
-            if 'lxml' in sys.modules:
-                del sys.modules['lxml']
+    """Exporter les rapports en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'reports')
 
 
 
@@ -4956,124 +4334,6 @@ def bulk_stock_configuration(request):
 
 
 
-# ==================== API VIEWS FOR CHARTS ====================
-
-
-
-@login_required
-
-def api_stock_evolution(request):
-
-    """API pour le graphique d'évolution du stock"""
-
-    days = int(request.GET.get('days', 30))
-
-    end_date = timezone.now()
-
-    start_date = end_date - timedelta(days=days)
-
-    
-
-    # Initialiser les données
-
-    labels = []
-
-    entries_data = []
-
-    exits_data = []
-
-    
-
-    current_date = start_date
-
-    while current_date <= end_date:
-
-        date_str = current_date.strftime('%d/%m')
-
-        labels.append(date_str)
-
-        
-
-        # Début et fin de la journée
-
-        day_start = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        day_end = current_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-
-        
-
-        # Calculer les entrées
-
-        entries = StockMovement.objects.filter(
-
-            created_at__range=(day_start, day_end),
-
-            movement_type__in=['entry', 'return']
-
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-
-        entries_data.append(entries)
-
-        
-
-        # Calculer les sorties
-
-        exits = StockMovement.objects.filter(
-
-            created_at__range=(day_start, day_end),
-
-            movement_type__in=['exit', 'defective']
-
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-
-        exits_data.append(exits)
-
-        
-
-        current_date += timedelta(days=1)
-
-    
-
-    return JsonResponse({
-
-        'labels': labels,
-
-        'entries': entries_data,
-
-        'exits': exits_data
-
-    })
-
-
-
-@login_required
-
-def api_category_distribution(request):
-
-    """API pour le graphique de répartition par catégorie"""
-
-    categories = Category.objects.annotate(
-
-        total_quantity=Sum('product__inventory__quantity')
-
-    ).filter(total_quantity__gt=0).order_by('-total_quantity')
-
-    
-
-    labels = [cat.name for cat in categories]
-
-    data = [cat.total_quantity for cat in categories]
-
-    
-
-    return JsonResponse({
-
-        'labels': labels,
-
-        'data': data
-
-    })
-
 # ==================== PRODUCT IMPORT VIEWS ====================
 
 
@@ -5130,373 +4390,123 @@ def product_import(request):
 
             try:
 
-                # Parser le fichier Excel
+                # Import en arrière-plan (voir process_import_jobs)
 
-                workbook = openpyxl.load_workbook(excel_file)
+                job = ImportJobService().enqueue(excel_file, request.user)
 
-                sheet = workbook.active
+            except ServiceException as e:
 
-                
+                messages.error(request, f"❌ {e}")
 
-                # Vérifier les en-têtes
+                return redirect('inventory:product_import')
 
-                expected_headers = ['name', 'sku', 'description', 'category', 'supplier', 'purchase_price', 'margin', 'selling_price']
+            
 
-                headers = [cell.value.lower().strip() if cell.value else '' for cell in sheet[1]]
+            messages.info(request, "📥 Le fichier est enregistré, l'importation est en cours.")
 
-                
+            return redirect('inventory:import_job_detail', pk=job.pk)
 
-                if not all(h in headers for h in ['name', 'sku']):
+    else:
 
-                    messages.error(request, "❌ Le fichier Excel doit contenir au minimum les colonnes 'name' et 'sku'")
+        form = ProductImportForm()
 
-                    return redirect('inventory:product_import')
+    
 
-                
+    # Dernières importations (erreurs consultables sur leur page de suivi)
 
-                # Statistiques
+    recent_jobs = ImportJob.objects.filter(requested_by=request.user)[:5]
 
-                created_count = 0
+    
 
-                updated_count = 0
+    return render(request, 'inventory/product/product_import.html', {
 
-                error_count = 0
+        'form': form,
 
-                errors = []
+        'recent_jobs': recent_jobs
 
-                
+    })
 
-                # Traiter chaque ligne
 
-                with transaction.atomic():
 
-                    for idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
 
-                        if not any(row):  # Ignorer les lignes vides
 
-                            continue
+@superuser_required
 
-                        
+def download_product_template(request):
 
-                        try:
+    """Télécharger un modèle Excel pour l'importation de produits"""
 
-                            # Créer un dictionnaire des données
+    from openpyxl import Workbook
 
-                            row_data = dict(zip(headers, row))
+    from openpyxl.styles import Font, PatternFill, Alignment
 
-                            
+    
 
-                            # Extraire les données
+    # Créer un nouveau workbook
 
-                            name = row_data.get('name', '').strip() if row_data.get('name') else None
+    wb = Workbook()
 
-                            sku = row_data.get('sku', '').strip() if row_data.get('sku') else None
+    ws = wb.active
 
-                            
+    ws.title = "Produits"
 
-                            if not name or not sku:
+    
 
-                                errors.append(f"Ligne {idx}: 'name' et 'sku' sont obligatoires")
+    # En-têtes
 
-                                error_count += 1
+    headers = ['name', 'sku', 'description', 'category', 'supplier', 'purchase_price', 'margin', 'selling_price']
 
-                                continue
+    header_names = ['Nom*', 'SKU', 'Description', 'Catégorie', 'Fournisseur', 'Prix d\'achat', 'Marge (GNF)', 'Prix de vente']
 
-                            
+    
 
-                            # Préparer les données du produit
+    # Style pour les en-têtes
 
-                            product_data = {
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
 
-                                'name': name,
+    header_font = Font(bold=True, color="FFFFFF")
 
-                                'sku': sku,
+    header_alignment = Alignment(horizontal="center", vertical="center")
 
-                                'description': row_data.get('description', '').strip() if row_data.get('description') else '',
+    
 
-                            }
+    # Ajouter les en-têtes
 
-                            
+    for col_num, (header, header_name) in enumerate(zip(headers, header_names), 1):
 
-                            # Gérer la catégorie
+        cell = ws.cell(row=1, column=col_num)
 
-                            category_name = row_data.get('category', '').strip() if row_data.get('category') else None
+        cell.value = header_name
 
-                            if category_name:
+        cell.fill = header_fill
 
-                                category, _ = Category.objects.get_or_create(
+        cell.font = header_font
 
-                                    name=category_name,
+        cell.alignment = header_alignment
 
-                                    defaults={'description': f'Catégorie créée automatiquement lors de l\'importation'}
+    
 
-                                )
+    # Ajouter des exemples
 
-                                product_data['category'] = category
+    examples = [
 
-                            else:
+        ['Ordinateur Portable Dell', 'DELL-LAP-001', 'Ordinateur portable 15 pouces', 'Électronique', 'Dell Inc', 800.00, 25.00, 1000.00],
 
-                                # Si aucune catégorie n'est fournie, utiliser une catégorie par défaut
+        ['Souris sans fil Logitech', 'LOG-MOU-001', 'Souris optique sans fil', 'Accessoires', 'Logitech', 15.00, 50.00, 22.50],
 
-                                default_category, _ = Category.objects.get_or_create(
+        ['Clavier mécanique RGB', 'KEY-RGB-001', 'Clavier gaming RGB', 'Accessoires', '', 45.00, 40.00, 63.00],
 
-                                    name='Non classé',
+    ]
 
-                                    defaults={'description': 'Catégorie par défaut pour les produits sans catégorie'}
+    
 
-                                )
+    for row_num, example in enumerate(examples, 2):
 
-                                product_data['category'] = default_category
+        for col_num, value in enumerate(example, 1):
 
-                            
+            ws.cell(row=row_num, column=col_num, value=value)
 
-                            # Gérer le fournisseur
-
-                            supplier_name = row_data.get('supplier', '').strip() if row_data.get('supplier') else None
-
-                            if supplier_name:
-
-                                try:
-
-                                    supplier = Supplier.objects.get(name=supplier_name)
-
-                                    product_data['supplier'] = supplier
-
-                                except Supplier.DoesNotExist:
-
-                                    errors.append(f"Ligne {idx}: Fournisseur '{supplier_name}' introuvable")
-
-                            
-
-                            # Gérer les prix
-
-                            try:
-
-                                if row_data.get('purchase_price'):
-
-                                    product_data['purchase_price'] = Decimal(str(row_data['purchase_price']))
-
-                                
-
-                                if row_data.get('margin'):
-
-                                    product_data['margin'] = Decimal(str(row_data['margin']))
-
-                                
-
-                                if row_data.get('selling_price'):
-
-                                    product_data['selling_price'] = Decimal(str(row_data['selling_price']))
-
-                                elif product_data.get('purchase_price') and product_data.get('margin'):
-
-                                    # Calculer le prix de vente automatiquement: PV = PA + marge (montant)
-
-                                    purchase_price = product_data['purchase_price']
-
-                                    margin = product_data['margin']
-
-                                    product_data['selling_price'] = purchase_price + margin
-
-                                else:
-
-                                    # Si aucun prix de vente n'est fourni et qu'on ne peut pas le calculer,
-
-                                    # utiliser une valeur par défaut minimale (0.01 est le minimum requis par le modèle)
-
-                                    product_data['selling_price'] = Decimal('0.01')
-
-                                    errors.append(f"Ligne {idx}: Prix de vente manquant - valeur par défaut (0.01 GNF) appliquée")
-
-                            except (ValueError, TypeError, InvalidOperation) as e:
-
-                                errors.append(f"Ligne {idx}: Erreur de prix - {str(e)}")
-
-                                error_count += 1
-
-                                continue
-
-                            
-
-                            # Créer ou mettre à jour le produit
-
-                            product, created = Product.objects.update_or_create(
-
-                                sku=sku,
-
-                                defaults=product_data
-
-                            )
-
-                            
-
-                            if created:
-
-                                created_count += 1
-
-                                # Créer des inventaires pour tous les points de vente actifs
-
-                                for pos in PointOfSale.objects.filter(is_active=True):
-
-                                    Inventory.objects.create(
-
-                                        product=product,
-
-                                        point_of_sale=pos,
-
-                                        quantity=0,
-
-                                        reorder_level=10
-
-                                    )
-
-                            else:
-
-                                updated_count += 1
-
-                        
-
-                        except Exception as e:
-
-                            errors.append(f"Ligne {idx}: {str(e)}")
-
-                            error_count += 1
-
-                
-
-                # Afficher les résultats
-
-                if created_count > 0:
-
-                    messages.success(request, f"✅ {created_count} produit(s) créé(s) avec succès!")
-
-                if updated_count > 0:
-
-                    messages.info(request, f"ℹ️ {updated_count} produit(s) mis à jour")
-
-                if error_count > 0:
-
-                    messages.warning(request, f"⚠️ {error_count} erreur(s) détectée(s)")
-
-                
-
-                # Stocker les erreurs dans la session pour affichage
-
-                if errors:
-
-                    request.session['import_errors'] = errors[:50]  # Limiter à 50 erreurs
-
-                
-
-                return redirect('inventory:product_import')
-
-                
-
-            except Exception as e:
-
-                messages.error(request, f"❌ Erreur lors de la lecture du fichier: {str(e)}")
-
-    else:
-
-        form = ProductImportForm()
-
-    
-
-    # Récupérer les erreurs de la session
-
-    import_errors = request.session.pop('import_errors', [])
-
-    
-
-    return render(request, 'inventory/product/product_import.html', {
-
-        'form': form,
-
-        'import_errors': import_errors
-
-    })
-
-
-
-
-
-@superuser_required
-
-def download_product_template(request):
-
-    """Télécharger un modèle Excel pour l'importation de produits"""
-
-    from openpyxl import Workbook
-
-    from openpyxl.styles import Font, PatternFill, Alignment
-
-    
-
-    # Créer un nouveau workbook
-
-    wb = Workbook()
-
-    ws = wb.active
-
-    ws.title = "Produits"
-
-    
-
-    # En-têtes
-
-    headers = ['name', 'sku', 'description', 'category', 'supplier', 'purchase_price', 'margin', 'selling_price']
-
-    header_names = ['Nom*', 'SKU*', 'Description', 'Catégorie', 'Fournisseur', 'Prix d\'achat', 'Marge (GNF)', 'Prix de vente']
-
-    
-
-    # Style pour les en-têtes
-
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-
-    header_font = Font(bold=True, color="FFFFFF")
-
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    
-
-    # Ajouter les en-têtes
-
-    for col_num, (header, header_name) in enumerate(zip(headers, header_names), 1):
-
-        cell = ws.cell(row=1, column=col_num)
-
-        cell.value = header_name
-
-        cell.fill = header_fill
-
-        cell.font = header_font
-
-        cell.alignment = header_alignment
-
-    
-
-    # Ajouter des exemples
-
-    examples = [
-
-        ['Ordinateur Portable Dell', 'DELL-LAP-001', 'Ordinateur portable 15 pouces', 'Électronique', 'Dell Inc', 800.00, 25.00, 1000.00],
-
-        ['Souris sans fil Logitech', 'LOG-MOU-001', 'Souris optique sans fil', 'Accessoires', 'Logitech', 15.00, 50.00, 22.50],
-
-        ['Clavier mécanique RGB', 'KEY-RGB-001', 'Clavier gaming RGB', 'Accessoires', '', 45.00, 40.00, 63.00],
-
-    ]
-
-    
-
-    for row_num, example in enumerate(examples, 2):
-
-        for col_num, value in enumerate(example, 1):
-
-            ws.cell(row=row_num, column=col_num, value=value)
-
-    
+    
 
     # Ajuster la largeur des colonnes
 
@@ -5617,7 +4627,6 @@ def reset_data(request):
 def advanced_reports_view(request):
     """Vue principale pour les rapports avancés"""
     from datetime import datetime, timedelta
-    from django.utils import timezone
     
     # Récupérer les paramètres de filtrage
     start_date = request.GET.get('start_date')
@@ -5636,7 +4645,7 @@ def advanced_reports_view(request):
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     # Récupérer les paramètres de l'entreprise
-    company_settings = Settings.objects.first()
+    company_settings = Settings.get_current()
     if not company_settings:
         company_settings = Settings.objects.create()
     
@@ -5648,19 +4657,16 @@ def advanced_reports_view(request):
         sales_activities = sales_activities.filter(invoice__date_issued__lte=end_date)
     sales_activities = sales_activities.order_by('-invoice__date_issued')[:50]
     
-    # 2. État des factures
-    invoices_paid = Invoice.objects.filter(status='paid')
-    invoices_pending = Invoice.objects.filter(status__in=['draft', 'sent'])
-    invoices_overdue = Invoice.objects.filter(status__in=['draft', 'sent'], date_due__lt=timezone.now().date())
-    
+    # 2. État des factures (compteurs en une requête, puis les 10 dernières par état)
+    invoices = Invoice.objects.select_related('client')
     if start_date:
-        invoices_paid = invoices_paid.filter(date_issued__gte=start_date)
-        invoices_pending = invoices_pending.filter(date_issued__gte=start_date)
-        invoices_overdue = invoices_overdue.filter(date_issued__gte=start_date)
+        invoices = invoices.filter(date_issued__gte=start_date)
     if end_date:
-        invoices_paid = invoices_paid.filter(date_issued__lte=end_date)
-        invoices_pending = invoices_pending.filter(date_issued__lte=end_date)
-        invoices_overdue = invoices_overdue.filter(date_issued__lte=end_date)
+        invoices = invoices.filter(date_issued__lte=end_date)
+    
+    invoice_stats = InvoiceService.get_statistics(invoices)
+    invoices_paid = invoices.filter(status='paid')[:10] if invoice_stats['paid']['count'] else []
+    invoices_pending = invoices.filter(status__in=PENDING_STATUSES)[:10] if invoice_stats['pending']['count'] else []
     
     # 3. Répartition du stock par magasin
     stock_by_pos = Inventory.objects.select_related('product', 'point_of_sale').values(
@@ -5700,9 +4706,9 @@ def advanced_reports_view(request):
         'report_type': report_type,
         'company_settings': company_settings,
         'sales_activities': sales_activities,
+        'invoice_stats': invoice_stats,
         'invoices_paid': invoices_paid,
         'invoices_pending': invoices_pending,
-        'invoices_overdue': invoices_overdue,
         'stock_by_pos': stock_by_pos,
         'low_stock_products': low_stock_products,
         'stock_movements': stock_movements,
@@ -5715,7 +4721,7 @@ def advanced_reports_view(request):
 @staff_required
 def export_sales_activities_excel(request):
     """Exporter les activités de vente en Excel"""
-    from ..excel_utils import export_to_excel
+    from ..excel_utils import export_to_excel, queryset_rows
     
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
@@ -5725,7 +4731,7 @@ def export_sales_activities_excel(request):
         start_date = specific_date
         end_date = specific_date
     
-    sales_activities = InvoiceItem.objects.select_related('invoice', 'invoice__client', 'product').all()
+    sales_activities = InvoiceItem.objects.all()
     if start_date:
         sales_activities = sales_activities.filter(invoice__date_issued__gte=start_date)
     if end_date:
@@ -5733,72 +4739,40 @@ def export_sales_activities_excel(request):
     sales_activities = sales_activities.order_by('-invoice__date_issued')
     
     headers = ['Date', 'N° Facture', 'Client', 'Produit', 'Quantité', 'Prix Unitaire', 'Total']
-    data = []
+    fields = [
+        'invoice__date_issued', 'invoice__invoice_number', 'invoice__client__name',
+        'product__name', 'quantity', 'unit_price', 'total'
+    ]
     
-    for item in sales_activities:
-        data.append([
-            item.invoice.date_issued.strftime('%d/%m/%Y'),
-            item.invoice.invoice_number,
-            item.invoice.client.name,
-            item.product.name,
-            item.quantity,
-            float(item.unit_price),
-            float(item.total)
-        ])
+    def build_rows(chunk):
+        return [
+            [
+                date_issued.strftime('%d/%m/%Y'),
+                invoice_number,
+                client_name,
+                product_name,
+                quantity,
+                float(unit_price),
+                float(total)
+            ]
+            for date_issued, invoice_number, client_name, product_name, quantity, unit_price, total in chunk
+        ]
     
-    return export_to_excel(headers, data, "Activités de Vente", "Activites_Ventes")
+    rows = queryset_rows(sales_activities, fields, build_rows)
+    return export_to_excel(headers, rows, "Activités de Vente", "Activites_Ventes")
 
 
 @staff_required
 def export_sales_activities_pdf(request):
-    """Exporter les activités de vente en PDF"""
-    import sys
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-        
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        
-        sales_activities = InvoiceItem.objects.select_related('invoice', 'invoice__client', 'product').all()
-        if start_date:
-            sales_activities = sales_activities.filter(invoice__date_issued__gte=start_date)
-        if end_date:
-            sales_activities = sales_activities.filter(invoice__date_issued__lte=end_date)
-        sales_activities = sales_activities.order_by('-invoice__date_issued')[:100]
-        
-        company_settings = Settings.objects.first()
-        context = {
-            'report_title': 'Activités Récentes des Ventes',
-            'sales_activities': sales_activities,
-            'start_date': start_date,
-            'end_date': end_date,
-            'company_settings': company_settings,
-            'generated_at': timezone.now(),
-        }
-        
-        template = get_template('inventory/reports_pdf/sales_activities_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Activites_Ventes_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
-    finally:
-        if lxml_backup:
-            sys.modules['lxml'] = lxml_backup
-        else:
-            if 'lxml' in sys.modules:
-                del sys.modules['lxml']
+    """Exporter les activités de vente en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'sales_activities')
 
 
 @superuser_required
 def export_invoice_status_excel(request):
     """Exporter l'état des factures en Excel"""
-    from ..excel_utils import export_to_excel
+    from ..excel_utils import export_to_excel, queryset_rows, choice_labels
+    from decimal import ROUND_HALF_UP
     
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
@@ -5811,7 +4785,7 @@ def export_invoice_status_excel(request):
     query = request.GET.get('q', '') or request.GET.get('search', '')
     status_filter = request.GET.get('status', '')
     
-    invoices = Invoice.objects.select_related('client').all()
+    invoices = Invoice.objects.all()
     
     # Filtrage par point de vente (Sécurité)
     invoices = filter_queryset_by_pos(invoices, request.user, 'point_of_sale')
@@ -5830,141 +4804,57 @@ def export_invoice_status_excel(request):
     if end_date:
         invoices = invoices.filter(date_issued__lte=end_date)
     
-    headers = ['N° Facture', 'Client', 'Date Émission', 'Date Échéance', 'Statut', 'Montant Total', 'Montant Payé', 'Solde']
-    data = []
+    # Montant payé calculé en SQL (équivalent de get_amount_paid() sans requête par facture)
+    paid_subquery = Payment.objects.filter(invoice=OuterRef('pk')).order_by().values('invoice').annotate(
+        total=Sum('amount')
+    ).values('total')
+    invoices = invoices.annotate(amount_paid=Subquery(paid_subquery))
     
-    for invoice in invoices:
-        data.append([
-            invoice.invoice_number,
-            invoice.client.name,
-            invoice.date_issued.strftime('%d/%m/%Y'),
-            invoice.date_due.strftime('%d/%m/%Y'),
-            invoice.get_status_display(),
-            float(invoice.total_amount),
-            float(invoice.get_amount_paid()),
-            float(invoice.get_remaining_amount())
-        ])
-    
-    # Calculate totals
-    total_amount_sum = sum(invoice.total_amount for invoice in invoices)
-    total_paid_sum = sum(invoice.get_amount_paid() for invoice in invoices)
-    total_remaining_sum = sum(invoice.get_remaining_amount() for invoice in invoices)
-    
-    # Add totals row
-    data.append(['', '', '', '', 'TOTAL GÉNÉRAL', float(total_amount_sum), float(total_paid_sum), float(total_remaining_sum)])
-    
-    return export_to_excel(headers, data, "État des Factures", "Etat_Factures")
+    headers = ['N° Facture', 'Client', 'Date Émission', 'Date Échéance', 'Statut', 'Montant Total', 'Montant Payé', 'Solde']
+    fields = ['invoice_number', 'client__name', 'date_issued', 'date_due', 'status', 'total_amount', 'amount_paid']
+    status_labels = choice_labels(Invoice, 'status')
+    totals = {'amount': Decimal('0.00'), 'paid': Decimal('0.00'), 'remaining': Decimal('0.00')}
+    
+    def build_rows(chunk):
+        rows = []
+        for invoice_number, client_name, date_issued, date_due, status, total_amount, amount_paid in chunk:
+            paid = Decimal(str(amount_paid or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            # Même règle que Invoice.get_remaining_amount()
+            remaining = Decimal('0.00')
+            if status != 'paid':
+                remaining = Decimal(str(total_amount - paid)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+                if abs(remaining) < Decimal('0.01'):
+                    remaining = Decimal('0.00')
+            
+            totals['amount'] += total_amount
+            totals['paid'] += paid
+            totals['remaining'] += remaining
+            
+            rows.append([
+                invoice_number,
+                client_name,
+                date_issued.strftime('%d/%m/%Y'),
+                date_due.strftime('%d/%m/%Y'),
+                status_labels.get(status, status),
+                float(total_amount),
+                float(paid),
+                float(remaining)
+            ])
+        return rows
+    
+    def totals_row():
+        # Évalué après la dernière ligne, quand les totaux sont complets
+        yield ['', '', '', '', 'TOTAL GÉNÉRAL', float(totals['amount']), float(totals['paid']), float(totals['remaining'])]
+    
+    rows = chain(queryset_rows(invoices, fields, build_rows), totals_row())
+    return export_to_excel(headers, rows, "État des Factures", "Etat_Factures")
 
 
 @staff_required
 @superuser_required
 def export_invoice_status_pdf(request):
-    """Exporter l'état des factures en PDF"""
-    import sys
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-        
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        specific_date = request.GET.get('date')
-
-        if specific_date:
-            start_date = specific_date
-            end_date = specific_date
-        specific_date = request.GET.get('date')
-        query = request.GET.get('q', '') or request.GET.get('search', '')
-        status_filter = request.GET.get('status', '')
-
-        if specific_date:
-            start_date = specific_date
-            end_date = specific_date
-        
-        invoices_qs = Invoice.objects.select_related('client').all()
-        
-        # Filtrage par point de vente (Sécurité)
-        invoices_qs = filter_queryset_by_pos(invoices_qs, request.user, 'point_of_sale')
-        
-        if query:
-            invoices_qs = invoices_qs.filter(
-                Q(invoice_number__icontains=query) | 
-                Q(client__name__icontains=query)
-            )
-        
-        if status_filter:
-            invoices_qs = invoices_qs.filter(status=status_filter)
-
-        if start_date:
-            invoices_qs = invoices_qs.filter(date_issued__gte=start_date)
-        if end_date:
-            invoices_qs = invoices_qs.filter(date_issued__lte=end_date)
-        invoices_qs = invoices_qs.order_by('-date_issued')
-        
-        # Pré-calculer toutes les données pour le PDF
-        status_map = {
-            'paid': 'Payée',
-            'sent': 'Envoyée',
-            'cancelled': 'Annulée',
-            'draft': 'Brouillon',
-            'partial': 'Partielle'
-        }
-        
-        invoices_data = []
-        total_amount_sum = 0
-        total_remaining_sum = 0
-        
-        for invoice in invoices_qs:
-            total_amount = float(invoice.total_amount)
-            remaining = float(invoice.get_remaining_amount())
-            
-            total_amount_sum += total_amount
-            total_remaining_sum += remaining
-            
-            invoices_data.append({
-                'invoice_number': invoice.invoice_number,
-                'client_name': invoice.client.name,
-                'date_issued': invoice.date_issued,
-                'date_due': invoice.date_due,
-                'status_display': status_map.get(invoice.status, invoice.status),
-                'status': invoice.status,
-                'total_amount': total_amount,
-                'remaining_amount': remaining,
-            })
-        
-        company_settings = Settings.objects.first()
-        
-        # Formater les dates
-        formatted_start_date = start_date if start_date else None
-        formatted_end_date = end_date if end_date else None
-        generated_at = datetime.now().strftime('%d/%m/%Y à %H:%M')
-        
-        context = {
-            'report_title': 'État des Factures',
-            'invoices': invoices_data,
-            'start_date': start_date,
-            'end_date': end_date,
-            'company_settings': company_settings,
-            'generated_at': datetime.now(),
-            'total_amount_sum': total_amount_sum,
-            'total_remaining_sum': total_remaining_sum,
-        }
-        
-        template = get_template('inventory/reports_pdf/invoice_status_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Etat_Factures_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
-    finally:
-        if lxml_backup:
-            sys.modules['lxml'] = lxml_backup
-        else:
-            if 'lxml' in sys.modules:
-                del sys.modules['lxml']
+    """Exporter l'état des factures en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'invoice_status')
 
 
 @superuser_required
@@ -5997,127 +4887,42 @@ def export_stock_distribution_excel(request):
 
 @superuser_required
 def export_stock_distribution_pdf(request):
-    """Exporter la répartition du stock par magasin en PDF"""
-    import sys
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-        
-        stock_by_pos = Inventory.objects.select_related('product', 'point_of_sale').values(
-            'point_of_sale__name', 'point_of_sale__code'
-        ).annotate(
-            total_products=Count('product', distinct=True),
-            total_quantity=Sum('quantity'),
-            total_value=Sum(F('quantity') * F('product__purchase_price'))
-        ).order_by('point_of_sale__name')
-        
-        company_settings = Settings.objects.first()
-        # Pré-calculer/formatter les valeurs pour un rendu PDF fiable
-        stock_by_pos_list = []
-        for item in stock_by_pos:
-            total_products = item.get('total_products') or 0
-            total_quantity = item.get('total_quantity') or 0
-            total_value = float(item.get('total_value') or 0)
-            stock_by_pos_list.append({
-                'point_of_sale_name': item.get('point_of_sale__name') or '',
-                'point_of_sale_code': item.get('point_of_sale__code') or '',
-                'total_products': int(total_products),
-                'total_quantity': int(total_quantity),
-                'total_value': f"{total_value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.' ) + f" {getattr(company_settings, 'currency', 'GNF')}",
-            })
-
-        context = {
-            'report_title': 'Répartition du Stock par Magasin',
-            'stock_by_pos': stock_by_pos_list,
-            'company_settings': company_settings,
-            'generated_at': timezone.now(),
-        }
-        
-        template = get_template('inventory/reports_pdf/stock_distribution_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Repartition_Stock_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
-    finally:
-        if lxml_backup:
-            sys.modules['lxml'] = lxml_backup
-        else:
-            if 'lxml' in sys.modules:
-                del sys.modules['lxml']
+    """Exporter la répartition du stock par magasin en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'stock_distribution')
 
 
 @staff_required
 def export_low_stock_excel(request):
     """Exporter les produits en stock faible en Excel"""
-    from ..excel_utils import export_to_excel
+    from ..excel_utils import export_to_excel, queryset_rows
     
-    low_stock = Inventory.objects.select_related('product', 'point_of_sale').filter(
+    low_stock = Inventory.objects.filter(
         quantity__lte=F('reorder_level')
     ).order_by('quantity')
     
     headers = ['Produit', 'SKU', 'Point de Vente', 'Quantité Actuelle', 'Seuil de Réapprovisionnement', 'Emplacement']
-    data = []
+    fields = ['product__name', 'product__sku', 'point_of_sale__name', 'quantity', 'reorder_level', 'location']
     
-    for item in low_stock:
-        data.append([
-            item.product.name,
-            item.product.sku or '-',
-            item.point_of_sale.name,
-            item.quantity,
-            item.reorder_level,
-            item.location or '-'
-        ])
+    def build_rows(chunk):
+        return [
+            [name, sku or '-', pos_name, quantity, reorder_level, location or '-']
+            for name, sku, pos_name, quantity, reorder_level, location in chunk
+        ]
     
-    return export_to_excel(headers, data, "Stock Faible", "Stock_Faible")
+    rows = queryset_rows(low_stock, fields, build_rows)
+    return export_to_excel(headers, rows, "Stock Faible", "Stock_Faible")
 
 
 @staff_required
 def export_low_stock_pdf(request):
-    """Exporter les produits en stock faible en PDF"""
-    import sys
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-        
-        low_stock = Inventory.objects.select_related('product', 'point_of_sale').filter(
-            quantity__lte=F('reorder_level')
-        ).order_by('quantity')[:100]
-        
-        company_settings = Settings.objects.first()
-        context = {
-            'report_title': 'Produits en Stock Faible',
-            'low_stock_products': low_stock,
-            'company_settings': company_settings,
-            'generated_at': timezone.now(),
-        }
-        
-        template = get_template('inventory/reports_pdf/low_stock_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Stock_Faible_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
-    finally:
-        if lxml_backup:
-            sys.modules['lxml'] = lxml_backup
-        else:
-            if 'lxml' in sys.modules:
-                del sys.modules['lxml']
+    """Exporter les produits en stock faible en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'low_stock')
 
 
 @staff_required
 def export_stock_movements_excel(request):
     """Exporter les mouvements de stock en Excel"""
-    from ..excel_utils import export_to_excel
+    from ..excel_utils import export_to_excel, queryset_rows, choice_labels
     
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
@@ -6131,7 +4936,7 @@ def export_stock_movements_excel(request):
         start_date = specific_date
         end_date = specific_date
     
-    movements = StockMovement.objects.select_related('product', 'from_point_of_sale', 'user').all()
+    movements = StockMovement.objects.all()
     
     # Filtre par point de vente pour STAFF
     movements = filter_queryset_by_pos(movements, request.user, 'from_point_of_sale')
@@ -6160,90 +4965,42 @@ def export_stock_movements_excel(request):
     movements = movements.order_by('-created_at')
     
     headers = ['Date', 'Produit', 'Type', 'Quantité', 'Point de Vente', 'Référence', 'Utilisateur', 'Notes']
-    data = []
-    
-    for movement in movements:
-        data.append([
-            movement.created_at.strftime('%d/%m/%Y %H:%M'),
-            movement.product.name,
-            movement.get_movement_type_display(),
-            movement.quantity,
-            movement.from_point_of_sale.name,
-            movement.reference or '-',
-            movement.user.username if movement.user else '-',
-            movement.notes or '-'
-        ])
-    
-    return export_to_excel(headers, data, "Mouvements de Stock", "Mouvements_Stock")
+    # 'id' garde le distinct() de la recherche équivalent à celui sur les objets
+    fields = [
+        'id', 'created_at', 'product__name', 'movement_type', 'quantity',
+        'from_point_of_sale__name', 'reference', 'user__username', 'notes'
+    ]
+    type_labels = choice_labels(StockMovement, 'movement_type')
+    
+    def build_rows(chunk):
+        return [
+            [
+                created_at.strftime('%d/%m/%Y %H:%M'),
+                product_name,
+                type_labels.get(movement_type, movement_type),
+                quantity,
+                pos_name,
+                reference or '-',
+                username or '-',
+                notes or '-'
+            ]
+            for _, created_at, product_name, movement_type, quantity, pos_name, reference, username, notes in chunk
+        ]
+    
+    rows = queryset_rows(movements, fields, build_rows)
+    return export_to_excel(headers, rows, "Mouvements de Stock", "Mouvements_Stock")
 
 
 @staff_required
 def export_stock_movements_pdf(request):
-    """Exporter les mouvements de stock en PDF"""
-    import sys
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from xhtml2pdf import pisa
-        from django.template.loader import get_template
-
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        search_query = request.GET.get('search', '')
-        movement_type = request.GET.get('type', '')
-        user_id = request.GET.get('user')
-        product_id = request.GET.get('product')
-
-        movements = StockMovement.objects.select_related('product', 'from_point_of_sale', 'user').all()
-        movements = filter_queryset_by_pos(movements, request.user, 'from_point_of_sale')
-
-        if search_query:
-            movements = movements.filter(
-                Q(product__name__icontains=search_query) | 
-                Q(product__sku__icontains=search_query) |
-                Q(reference__icontains=search_query) |
-                Q(notes__icontains=search_query)
-            ).distinct()
-
-        if movement_type: movements = movements.filter(movement_type=movement_type)
-        if user_id: movements = movements.filter(user_id=user_id)
-        if product_id: movements = movements.filter(product_id=product_id)
-        
-        if start_date:
-            try: movements = movements.filter(created_at__gte=datetime.strptime(start_date, '%Y-%m-%d'))
-            except: pass
-        if end_date:
-            try: movements = movements.filter(created_at__lte=datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1))
-            except: pass
-        
-        movements = movements.order_by('-created_at')[:1000]
-        
-        context = {
-            'movements': movements,
-            'company_settings': Settings.objects.first(),
-            'report_title': "Mouvements de Stock",
-            'generated_at': timezone.now()
-        }
-        
-        template = get_template('inventory/reports_pdf/movement_list_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename=Mouvements_Stock_{timezone.now().strftime("%Y%m%d_%H%M")}.pdf'
-        
-        pisa_status = pisa.CreatePDF(html, dest=response)
-        if pisa_status.err: return HttpResponse(f"Error generating PDF: {pisa_status.err}")
-        return response
-    finally:
-        if lxml_backup: sys.modules['lxml'] = lxml_backup
-        elif 'lxml' in sys.modules: del sys.modules['lxml']
+    """Exporter les mouvements de stock en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'stock_movements')
 
 
 @staff_required
 def export_returned_products_excel(request):
     """Exporter les produits retournés en Excel"""
-    from ..excel_utils import export_to_excel
+    from ..excel_utils import export_to_excel, queryset_rows
     
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
@@ -6253,7 +5010,7 @@ def export_returned_products_excel(request):
         start_date = specific_date
         end_date = specific_date
     
-    returned = StockMovement.objects.select_related('product', 'from_point_of_sale', 'user').filter(
+    returned = StockMovement.objects.filter(
         movement_type='return'
     )
     if start_date:
@@ -6263,141 +5020,78 @@ def export_returned_products_excel(request):
     returned = returned.order_by('-created_at')
     
     headers = ['Date', 'Produit', 'Quantité', 'Point de Vente', 'Référence', 'Utilisateur', 'Notes']
-    data = []
-    
-    for item in returned:
-        data.append([
-            item.created_at.strftime('%d/%m/%Y %H:%M'),
-            item.product.name,
-            item.quantity,
-            item.from_point_of_sale.name,
-            item.reference or '-',
-            item.user.username if item.user else '-',
-            item.notes or '-'
-        ])
-    
-    return export_to_excel(headers, data, "Produits Retournés", "Produits_Retournes")
+    fields = ['created_at', 'product__name', 'quantity', 'from_point_of_sale__name', 'reference', 'user__username', 'notes']
+    
+    def build_rows(chunk):
+        return [
+            [
+                created_at.strftime('%d/%m/%Y %H:%M'),
+                product_name,
+                quantity,
+                pos_name,
+                reference or '-',
+                username or '-',
+                notes or '-'
+            ]
+            for created_at, product_name, quantity, pos_name, reference, username, notes in chunk
+        ]
+    
+    rows = queryset_rows(returned, fields, build_rows)
+    return export_to_excel(headers, rows, "Produits Retournés", "Produits_Retournes")
 
 
 @staff_required
 def export_returned_products_pdf(request):
-    """Exporter les produits retournés en PDF"""
-    import sys
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-        
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        specific_date = request.GET.get('date')
-
-        if specific_date:
-            start_date = specific_date
-            end_date = specific_date
-        
-        returned = StockMovement.objects.select_related('product', 'from_point_of_sale', 'user').filter(
-            movement_type='return'
-        )
-        if start_date:
-            returned = returned.filter(created_at__date__gte=start_date)
-        if end_date:
-            returned = returned.filter(created_at__date__lte=end_date)
-        returned = returned.order_by('-created_at')[:100]
-        
-        company_settings = Settings.objects.first()
-        context = {
-            'report_title': 'Produits Retournés',
-            'returned_products': returned,
-            'start_date': start_date,
-            'end_date': end_date,
-            'company_settings': company_settings,
-            'generated_at': timezone.now(),
-        }
-        
-        template = get_template('inventory/reports_pdf/returned_products_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Produits_Retournes_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
-    finally:
-        if lxml_backup:
-            sys.modules['lxml'] = lxml_backup
-        else:
-            if 'lxml' in sys.modules:
-                del sys.modules['lxml']
+    """Exporter les produits retournés en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'returned_products')
 
 
 
 @staff_required
 def export_products_excel(request):
     """Exporter tous les produits en Excel"""
-    from ..excel_utils import export_to_excel
+    from ..excel_utils import export_to_excel, queryset_rows
+    from ..models import stock_analysis
     
     # Récupérer tous les produits avec leur stock total
     products = Product.objects.annotate(
-        total_stock=Sum('inventory__quantity')
-    ).select_related('category').order_by('name')
+        total_stock=F('stock_summary__total_quantity')
+    ).order_by('name')
     
     headers = ['Nom', 'SKU', 'Catégorie', 'Stock Total', 'Colis', 'Unités', 'Analyse', 'Prix Achat', 'Prix Vente', 'Marge', 'Description']
-    data = []
-    
-    for product in products:
-        total_stock = product.total_stock or 0
-        margin = float(product.selling_price - product.purchase_price) if product.selling_price and product.purchase_price else 0
-        analysis_data = product.get_analysis_data()
-        
-        data.append([
-            product.name,
-            product.sku or '-',
-            product.category.name if product.category else '-',
-            total_stock,
-            analysis_data['colis'],
-            analysis_data['unites'],
-            analysis_data['analysis'],
-            float(product.purchase_price) if product.purchase_price else 0,
-            float(product.selling_price) if product.selling_price else 0,
-            margin,
-            product.description or '-'
-        ])
+    fields = [
+        'name', 'sku', 'category__name', 'total_stock', 'units_per_box',
+        'purchase_price', 'selling_price', 'description'
+    ]
     
-    return export_to_excel(headers, data, "Liste des Produits", "Liste_Produits")
+    def build_rows(chunk):
+        rows = []
+        for name, sku, category, total_stock, units_per_box, purchase_price, selling_price, description in chunk:
+            total_stock = total_stock or 0
+            margin = float(selling_price - purchase_price) if selling_price and purchase_price else 0
+            # Le stock total vient de l'annotation (pas de requête par produit)
+            analysis_data = stock_analysis(total_stock, units_per_box)
+            
+            rows.append([
+                name,
+                sku or '-',
+                category or '-',
+                total_stock,
+                analysis_data['colis'],
+                analysis_data['unites'],
+                analysis_data['analysis'],
+                float(purchase_price) if purchase_price else 0,
+                float(selling_price) if selling_price else 0,
+                margin,
+                description or '-'
+            ])
+        return rows
+    
+    rows = queryset_rows(products, fields, build_rows)
+    return export_to_excel(headers, rows, "Liste des Produits", "Liste_Produits")
 
 
 @staff_required
 def export_products_pdf(request):
-    """Exporter tous les produits en PDF"""
-    import sys
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-        
-        # Récupérer tous les produits avec leur stock total (limité à 200 pour le PDF)
-        products = Product.objects.annotate(
-            total_stock=Sum('inventory__quantity')
-        ).select_related('category').order_by('name')[:200]
-        
-        context = {
-            'report_title': 'Liste des Produits',
-            'products': products,
-            'company_settings': Settings.objects.first(),
-            'generated_at': timezone.now(),
-        }
-        
-        template = get_template('inventory/reports_pdf/products_list_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Liste_Produits_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
-    finally:
-        if lxml_backup: sys.modules['lxml'] = lxml_backup
-        elif 'lxml' in sys.modules: del sys.modules['lxml']
+    """Exporter tous les produits en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'products')
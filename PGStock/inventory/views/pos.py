@@ -2,15 +2,28 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db import transaction, models
+from django.http import JsonResponse, HttpResponse
+from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from decimal import Decimal
 import json
 
-from ..models import Product, Client, Invoice, InvoiceItem, PointOfSale, StockMovement, Category
+from ..models import (
+    Product, Client, PointOfSale, Category, Inventory, ProductStockSummary
+)
 from ..forms import ClientForm
-from ..permissions import staff_required
+from ..permissions import staff_required, get_user_permissions
+from ..services.catalogue_service import CatalogueService
+from ..services.checkout_service import CheckoutService
+
+# Nombre maximum de produits renvoyés par la recherche POS
+SEARCH_RESULTS_LIMIT = 15
+
+# Nombre maximum de produits par demande de stock en direct
+STOCK_LOOKUP_LIMIT = 100
 
 @staff_required
 def quick_sale(request):
@@ -38,47 +51,17 @@ def quick_sale(request):
             if not items:
                 return JsonResponse({'success': False, 'message': 'Le panier est vide.'})
             
-            with transaction.atomic():
-                client = get_object_or_404(Client, id=client_id)
-                
-                # Créer la facture
-                invoice = Invoice.objects.create(
-                    client=client,
-                    invoice_type=invoice_type,
-                    point_of_sale=pos,
-                    apply_tax=apply_tax,
-                    date_issued=timezone.now().date(),
-                    date_due=timezone.now().date(),
-                    status='paid', # Vente rapide est généralement payée immédiatement
-                    discount_amount=discount,
-                    created_by=request.user
-                )
-                invoice.invoice_number = invoice.generate_invoice_number()
-                invoice.save()
-                
-                # Créer les items et les mouvements de stock
-                for item_data in items:
-                    product = get_object_or_404(Product, id=item_data['product_id'])
-                    qty = int(item_data['quantity'])
-                    is_wholesale = item_data.get('is_wholesale', False)
-                    
-                    price = product.wholesale_selling_price if is_wholesale else product.selling_price
-                    
-                    InvoiceItem.objects.create(
-                        invoice=invoice,
-                        product=product,
-                        quantity=qty,
-                        unit_price=price,
-                        is_wholesale=is_wholesale,
-                        total=price * qty
-                    )
-                
-                # Calculer les totaux
-                invoice.calculate_totals()
-                
-                # Note: deduct_stock() est déjà appelé par update_status() ou manuellement
-                invoice.deduct_stock()
-                
+            client = get_object_or_404(Client, id=client_id)
+            invoice = CheckoutService().checkout(
+                client=client,
+                point_of_sale=pos,
+                user=request.user,
+                lines=items,
+                invoice_type=invoice_type,
+                apply_tax=apply_tax,
+                discount=discount
+            )
+            
             return JsonResponse({
                 'success': True, 
                 'message': 'Vente enregistrée avec succès!',
@@ -102,57 +85,104 @@ def api_search_products(request):
     query = request.GET.get('q', '').strip()
     category_id = request.GET.get('category', '').strip()
     
-    # Récupérer le point de vente actuel de l'utilisateur
-    user_pos = None
-    if hasattr(request.user, 'profile') and request.user.profile.point_of_sale:
-        user_pos = request.user.profile.point_of_sale
+    # Point de vente de l'utilisateur (permissions en cache, pas de requête profil)
+    user_pos_id = get_user_permissions(request.user).point_of_sale_id
     
-    # Optimiser la requête avec select_related
-    products = Product.objects.select_related('category')
-    
-    if query:
-        products = products.filter(
-            models.Q(name__icontains=query) | 
-            models.Q(sku__icontains=query)
-        )
+    products = Product.objects.all()
     
     if category_id:
         products = products.filter(category_id=category_id)
     
-    products = products.order_by(
+    # Stock calculé dans la même requête : stock local du dépôt de l'utilisateur,
+    # sinon stock total (résumé par produit)
+    if user_pos_id:
+        local_stock = Inventory.objects.filter(
+            product=models.OuterRef('pk'), point_of_sale_id=user_pos_id
+        ).values('quantity')[:1]
+        products = products.annotate(current_stock=Coalesce(models.Subquery(local_stock), 0))
+    else:
+        products = products.annotate(current_stock=Coalesce('stock_summary__total_quantity', 0))
+    
+    ordering = (
         models.Case(
             models.When(sku__iexact=query, then=0),
             models.When(name__istartswith=query, then=1),
             default=2
         ),
         'name'
-    )[:15]
+    )
+    fields = ('id', 'name', 'sku', 'selling_price', 'wholesale_selling_price', 'units_per_box', 'image', 'current_stock')
     
-    data = []
-    for p in products:
-        # Calculer le stock pour le point de vente spécifique de l'utilisateur
-        if user_pos:
-            local_inventory = p.inventory_set.filter(point_of_sale=user_pos).first()
-            current_stock = local_inventory.quantity if local_inventory else 0
-        else:
-            # Fallback sur le stock total si aucun POS n'est assigné
-            current_stock = p.inventory_set.aggregate(
-                total=models.Sum('quantity')
-            )['total'] or 0
-        
-        data.append({
-            'id': p.id,
-            'name': p.name,
-            'sku': p.sku,
-            'price': float(p.selling_price),
-            'wholesale_price': float(p.wholesale_selling_price),
-            'units_per_box': p.units_per_box,
-            'stock': current_stock,
-            'image_url': p.image.url if p.image else None,
-        })
+    results = []
+    if query:
+        # 1) SKU exact ou début du nom : servis par les index de recherche.
+        # Ces résultats sont classés en tête, la liste est complète s'il y en a assez.
+        results = list(products.filter(
+            models.Q(sku__iexact=query) |
+            models.Q(name__istartswith=query)
+        ).order_by(*ordering).values(*fields)[:SEARCH_RESULTS_LIMIT])
+    
+    if len(results) < SEARCH_RESULTS_LIMIT:
+        # 2) Recherche complète « contient » sur le nom et le SKU
+        if query:
+            products = products.filter(
+                models.Q(name__icontains=query) | 
+                models.Q(sku__icontains=query)
+            )
+        results = list(products.order_by(*ordering).values(*fields)[:SEARCH_RESULTS_LIMIT])
+    
+    image_storage = Product._meta.get_field('image').storage
+    data = [
+        {
+            'id': p['id'],
+            'name': p['name'],
+            'sku': p['sku'],
+            'price': float(p['selling_price']),
+            'wholesale_price': float(p['wholesale_selling_price']),
+            'units_per_box': p['units_per_box'],
+            'stock': p['current_stock'],
+            'image_url': image_storage.url(p['image']) if p['image'] else None,
+        }
+        for p in results
+    ]
     
     return JsonResponse({'results': data})
 
+def _catalogue_etag(request):
+    return f'"catalogue-{CatalogueService.get_version()}"'
+
+@staff_required
+@condition(etag_func=_catalogue_etag)
+def api_pos_catalogue(request):
+    """
+    Catalogue compact des produits pour la recherche locale du POS.
+    Revalidé par ETag : 304 tant qu'aucun produit n'a changé.
+    """
+    catalogue = CatalogueService.get_catalogue()
+    response = HttpResponse(catalogue.encode(), content_type='application/json')
+    response['ETag'] = catalogue.etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@staff_required
+def api_pos_stock(request):
+    """Stock en direct des produits affichés (dépôt de l'utilisateur, sinon stock total)"""
+    product_ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip().isdigit()]
+    product_ids = product_ids[:STOCK_LOOKUP_LIMIT]
+    
+    user_pos_id = get_user_permissions(request.user).point_of_sale_id
+    if user_pos_id:
+        stock = Inventory.objects.filter(
+            product_id__in=product_ids, point_of_sale_id=user_pos_id
+        ).values_list('product_id', 'quantity')
+    else:
+        stock = ProductStockSummary.objects.filter(
+            product_id__in=product_ids
+        ).values_list('product_id', 'total_quantity')
+    
+    stock = dict(stock)
+    return JsonResponse({'stock': {str(pk): stock.get(pk, 0) for pk in product_ids}})
+
 @staff_required
 def api_create_client(request):
     """API de création rapide de client"""
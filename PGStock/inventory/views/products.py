@@ -1,7 +1,7 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib.messages.views import SuccessMessageMixin
 from django.urls import reverse_lazy
-from django.db.models import Count, Q, Sum, F
+from django.db.models import Count, Q, F
 from django.db.models.functions import Coalesce
 from django.shortcuts import redirect
 from django.contrib import messages
@@ -22,7 +22,7 @@ class ProductListView(StaffRequiredMixin, ListView):
             'inventory_set', 
             'inventory_set__point_of_sale'
         ).annotate(
-            total_stock_annotated=Coalesce(Sum('inventory__quantity'), 0)
+            total_stock_annotated=Coalesce(F('stock_summary__total_quantity'), 0)
         ).order_by('name')
 
         search_query = self.request.GET.get('search')
@@ -2,18 +2,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Sum, F
+from django.db.models import Q, F
 from django.db import transaction
-from django.http import HttpResponse
 from django.utils import timezone
-from datetime import datetime
-import sys
 
 from ..models import Receipt, ReceiptItem, Supplier, PointOfSale, Product, StockMovement
 from ..forms import ReceiptForm, ReceiptItemForm
 from ..services.receipt_service import ReceiptService
 from ..services.base import ServiceException
 from ..permissions import staff_required, superuser_required
+from .report_jobs import enqueue_pdf_report
 
 @staff_required
 def receipt_list(request):
@@ -65,9 +63,11 @@ def receipt_create(request):
             if not receipt.point_of_sale and hasattr(request.user, 'profile') and request.user.profile.point_of_sale:
                 receipt.point_of_sale = request.user.profile.point_of_sale
             
-            if not receipt.receipt_number:
-                receipt.receipt_number = receipt.generate_receipt_number()
-            receipt.save()
+            # Numéro réservé dans la transaction de l'enregistrement (sans trou)
+            with transaction.atomic():
+                if not receipt.receipt_number:
+                    receipt.receipt_number = receipt.generate_receipt_number()
+                receipt.save()
             messages.success(request, 'Bon de réception créé avec succès!')
             return redirect('inventory:receipt_detail', pk=receipt.pk)
     else:
@@ -252,7 +252,7 @@ def receipt_validate(request, pk):
 @staff_required
 def export_receipt_list_excel(request):
     """Exporter la liste des bons de réception en Excel"""
-    from ..excel_utils import export_to_excel
+    from ..excel_utils import export_to_excel, queryset_rows, choice_labels
     
     # Récupérer les filtres
     query = request.GET.get('q', '').strip()
@@ -265,7 +265,7 @@ def export_receipt_list_excel(request):
         start_date = specific_date
         end_date = specific_date
     
-    receipts = Receipt.objects.select_related('supplier', 'created_by').all().order_by('-date_received', '-created_at')
+    receipts = Receipt.objects.all().order_by('-date_received', '-created_at')
     
     if query:
         receipts = receipts.filter(
@@ -283,87 +283,30 @@ def export_receipt_list_excel(request):
         receipts = receipts.filter(date_received__lte=end_date)
         
     headers = ['Numéro', 'Fournisseur', 'Référence Fournisseur', 'Date', 'Statut', 'Total', 'Créé par']
-    data = []
+    fields = [
+        'receipt_number', 'supplier__name', 'supplier_reference', 'date_received',
+        'status', 'total_amount', 'created_by__username'
+    ]
+    status_labels = choice_labels(Receipt, 'status')
     
-    for receipt in receipts:
-        data.append([
-            receipt.receipt_number,
-            receipt.supplier.name if receipt.supplier else '-',
-            receipt.supplier_reference or '-',
-            receipt.date_received.strftime('%d/%m/%Y') if receipt.date_received else '-',
-            receipt.get_status_display(),
-            float(receipt.total_amount),
-            receipt.created_by.username if receipt.created_by else ''
-        ])
-        
-    return export_to_excel(headers, data, "Bons de Réception", "Liste_Receptions")
+    def build_rows(chunk):
+        return [
+            [
+                receipt_number,
+                supplier_name or '-',
+                supplier_reference or '-',
+                date_received.strftime('%d/%m/%Y') if date_received else '-',
+                status_labels.get(status, status),
+                float(total_amount),
+                username or ''
+            ]
+            for receipt_number, supplier_name, supplier_reference, date_received, status, total_amount, username in chunk
+        ]
+    
+    rows = queryset_rows(receipts, fields, build_rows)
+    return export_to_excel(headers, rows, "Bons de Réception", "Liste_Receptions")
 
 @staff_required
 def export_receipt_list_pdf(request):
-    """Exporter la liste des bons de réception en PDF"""
-    # Hack: Bypass broken lxml
-    lxml_backup = sys.modules.get('lxml')
-    sys.modules['lxml'] = None
-    
-    try:
-        from django.template.loader import get_template
-        from xhtml2pdf import pisa
-        from ..models import Settings
-        
-        # Récupérer les filtres
-        query = request.GET.get('q', '')
-        status_filter = request.GET.get('status', '')
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        specific_date = request.GET.get('date')
-
-        if specific_date:
-            start_date = specific_date
-            end_date = specific_date
-        
-        receipts = Receipt.objects.select_related('supplier', 'created_by').all().order_by('-date_received', '-created_at')
-        
-        if query:
-            receipts = receipts.filter(
-                Q(receipt_number__icontains=query) | 
-                Q(supplier__name__icontains=query) |
-                Q(supplier_reference__icontains=query)
-            )
-        
-        if status_filter:
-            receipts = receipts.filter(status=status_filter)
-
-        if start_date:
-            receipts = receipts.filter(date_received__gte=start_date)
-        if end_date:
-            receipts = receipts.filter(date_received__lte=end_date)
-            
-        # Calculer le total
-        total_amount_sum = receipts.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        company_settings = Settings.objects.first()
-        
-        context = {
-            'receipts': receipts,
-            'company_settings': company_settings,
-            'generated_at': datetime.now(),
-            'report_title': 'Liste des Bons de Réception',
-            'query': query,
-            'status_filter': status_filter,
-            'start_date': start_date,
-            'end_date': end_date,
-            'total_amount_sum': total_amount_sum,
-        }
-        
-        template = get_template('inventory/reports_pdf/receipt_list_pdf.html')
-        html = template.render(context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Liste_Receptions_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf"'
-        pisa.CreatePDF(html, dest=response)
-        return response
-    finally:
-        if lxml_backup:
-            sys.modules['lxml'] = lxml_backup
-        else:
-            if 'lxml' in sys.modules:
-                del sys.modules['lxml']
+    """Exporter la liste des bons de réception en PDF (généré en arrière-plan, voir process_report_jobs)"""
+    return enqueue_pdf_report(request, 'receipts')
@@ -0,0 +1,71 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+
+from ..models import ReportJob
+from ..services import ReportJobService
+from ..services.base import ServiceException
+from ..permissions import is_superuser_or_admin
+
+
+def enqueue_pdf_report(request, report_type):
+    """Mettre un rapport PDF en file d'attente et rediriger vers son suivi"""
+    try:
+        job = ReportJobService().enqueue(report_type, request.GET.dict(), request.user)
+    except ServiceException as e:
+        messages.error(request, str(e))
+        return redirect('inventory:reports')
+
+    messages.info(request, "📄 Le rapport PDF est en cours de génération.")
+    return redirect('inventory:report_job_detail', pk=job.pk)
+
+
+def _get_user_job(request, pk):
+    """Récupérer une tâche visible par l'utilisateur (demandeur ou administrateur)"""
+    job = get_object_or_404(ReportJob, pk=pk)
+    if job.requested_by_id != request.user.pk and not is_superuser_or_admin(request.user):
+        raise Http404("Rapport introuvable")
+    return job
+
+
+@login_required
+def report_job_detail(request, pk):
+    """Suivi de la génération d'un rapport PDF"""
+    job = _get_user_job(request, pk)
+    return render(request, 'inventory/report_job_detail.html', {
+        'job': job,
+    })
+
+
+@login_required
+def report_job_status(request, pk):
+    """État d'un rapport PDF (JSON, pour le rafraîchissement de la page de suivi)"""
+    job = _get_user_job(request, pk)
+    download_url = None
+    if job.status == 'done':
+        download_url = reverse('inventory:report_job_download', args=[job.pk])
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'download_url': download_url,
+        'error': job.error,
+    })
+
+
+@login_required
+def report_job_download(request, pk):
+    """Télécharger un rapport PDF terminé"""
+    job = _get_user_job(request, pk)
+    if job.status != 'done' or not job.file:
+        messages.warning(request, "Le rapport n'est pas encore disponible.")
+        return redirect('inventory:report_job_detail', pk=job.pk)
+
+    return FileResponse(
+        job.file.open('rb'),
+        as_attachment=True,
+        filename=job.filename,
+        content_type='application/pdf',
+    )
@@ -5,13 +5,13 @@ Les modèles Order et OrderItem sont spécifiques à cette application.
 Les modèles Client, Product et PointOfSale sont importés depuis inventory.
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
 # Import des modèles depuis inventory (source unique de vérité)
-from inventory.models import Client, Product, PointOfSale
+from inventory.models import Client, Product, PointOfSale, DocumentSequence, last_document_number
 
 class Order(models.Model):
     """
@@ -102,15 +102,22 @@ class Order(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.order_number:
-            self.order_number = self.generate_order_number()
+            # Numéro réservé dans la même transaction que l'insertion (sans trou)
+            with transaction.atomic():
+                self.order_number = self.generate_order_number()
+                super().save(*args, **kwargs)
+            return
         super().save(*args, **kwargs)
 
     def generate_order_number(self):
         from datetime import datetime
         prefix = "CMD" if self.order_type == 'retail' else "GROS"
         year = datetime.now().year
-        # Logique simplifiée pour l'exemple, à robustifier en prod avec séquences
-        count = Order.objects.filter(date_created__year=year).count() + 1
+        # Séquence annuelle commune aux commandes de détail et de gros
+        count = DocumentSequence.next_value('order', year, seed=lambda: max(
+            last_document_number(Order.objects, 'order_number', f"{order_prefix}-{year}-")
+            for order_prefix in ("CMD", "GROS")
+        ))
         return f"{prefix}-{year}-{count:06d}"
 
     def update_totals(self):